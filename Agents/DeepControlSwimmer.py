@@ -55,6 +55,15 @@ parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
 sys.path.append(parent_dir)
 
 from tasks.forwards_tasks import Swim, _SWIM_SPEED
+from Agents.swimmer import Environment
+from Agents import model_cache
+
+
+def _get_physics(n_links):
+  """Returns a new dm_control swimmer `Physics`, reusing the compiled model."""
+  return model_cache.load_physics(
+    swimmer.Physics, (swimmer.__name__, n_links),
+    lambda: swimmer.get_model_and_assets(n_links))
 
 
 # An agent with 6 joints which passed into 
@@ -64,14 +73,16 @@ def swim(
   desired_speed=_SWIM_SPEED,
   time_limit=swimmer._DEFAULT_TIME_LIMIT,
   random=None,
+  observe_proximity=False,
+  per_agent=False,
   environment_kwargs={},
 ):
   '''Passed into suite.load()'''
   """Returns the Swim task for a n-link swimmer."""
-  model_string, assets = swimmer.get_model_and_assets(n_links)
-  physics = swimmer.Physics.from_xml_string(model_string, assets=assets)
-  task = Swim(desired_speed=desired_speed, random=random)
-  return control.Environment(
+  physics = _get_physics(n_links)
+  task = Swim(desired_speed=desired_speed, observe_proximity=observe_proximity,
+              per_agent=per_agent, random=random)
+  return Environment(
     physics,
     task,
     time_limit=time_limit,
@@ -85,13 +96,15 @@ def swim_12_links(
   desired_speed=_SWIM_SPEED,
   time_limit=swimmer._DEFAULT_TIME_LIMIT,
   random=None,
+  observe_proximity=False,
+  per_agent=False,
   environment_kwargs={},
 ):
   """Returns the Swim task for a n-link swimmer."""
-  model_string, assets = swimmer.get_model_and_assets(n_links)
-  physics = swimmer.Physics.from_xml_string(model_string, assets=assets)
-  task = Swim(desired_speed=desired_speed, random=random)
-  return control.Environment(
+  physics = _get_physics(n_links)
+  task = Swim(desired_speed=desired_speed, observe_proximity=observe_proximity,
+              per_agent=per_agent, random=random)
+  return Environment(
     physics,
     task,
     time_limit=time_limit,
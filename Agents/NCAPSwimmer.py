@@ -10,6 +10,7 @@ parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
 sys.path.append(parent_dir)
 
 from cust_utils.damping_utils import calculate_damping, set_joint_damping, NCAP_damping
+from cust_utils.activity_recorder import ActivityRecorder
 
 # ==================================================================================================
 ######### Define Constraints
@@ -77,18 +78,29 @@ class SwimmerModule(nn.Module):
             include_head_oscillators: bool = True,
             include_speed_control: bool = False,
             include_turn_control: bool = False,
+            n_agents: int = None,
+            vectorized: bool = True,
+            activity_recorder: ActivityRecorder = None,
     ):
         super().__init__()
         self.n_joints = n_joints
         self.n_turn_joints = n_turn_joints
         self.oscillator_period = oscillator_period
+        self.use_weight_sharing = use_weight_sharing
+        self.use_weight_constraints = use_weight_constraints
         self.include_proprioception = include_proprioception
         self.include_head_oscillators = include_head_oscillators
         self.include_speed_control = include_speed_control
         self.include_turn_control = include_turn_control
 
-        # Log activity
-        self.connections_log = []
+        # Number of agents with their own weights, None to share the weights across all agents.
+        self.n_agents = n_agents
+
+        # Compute all joints in a few batched ops instead of looping over joints.
+        self.vectorized = vectorized
+
+        # Log activity (off by default, see cust_utils.activity_recorder).
+        self.recorder = activity_recorder if activity_recorder is not None else ActivityRecorder('off')
 
         # Timestep counter (for oscillations).
         self.timestep = 0
@@ -114,48 +126,73 @@ class SwimmerModule(nn.Module):
             else:
                 exc_param = inh_param = unsigned_uniform
 
-        # Learnable parameters.
+        # Learnable parameters, shape (1,) or (n_agents, 1) to broadcast over (..., n_agents, n_joints) inputs.
+        param_shape = (1,) if n_agents is None else (n_agents, 1)
         self.params = nn.ParameterDict()
         if use_weight_sharing:
             if self.include_proprioception:
-                self.params['bneuron_prop'] = exc_param()
+                self.params['bneuron_prop'] = exc_param(param_shape)
             if self.include_speed_control:
-                self.params['bneuron_speed'] = inh_param()
+                self.params['bneuron_speed'] = inh_param(param_shape)
             if self.include_turn_control:
-                self.params['bneuron_turn'] = exc_param()
+                self.params['bneuron_turn'] = exc_param(param_shape)
             if self.include_head_oscillators:
-                self.params['bneuron_osc'] = exc_param()
-            self.params['muscle_ipsi'] = exc_param()
-            self.params['muscle_contra'] = inh_param()
+                self.params['bneuron_osc'] = exc_param(param_shape)
+            self.params['muscle_ipsi'] = exc_param(param_shape)
+            self.params['muscle_contra'] = inh_param(param_shape)
         else:
             for i in range(self.n_joints):
                 if self.include_proprioception and i > 0:
-                    self.params[f'bneuron_d_prop_{i}'] = exc_param()
-                    self.params[f'bneuron_v_prop_{i}'] = exc_param()
+                    self.params[f'bneuron_d_prop_{i}'] = exc_param(param_shape)
+                    self.params[f'bneuron_v_prop_{i}'] = exc_param(param_shape)
 
                 if self.include_speed_control:
-                    self.params[f'bneuron_d_speed_{i}'] = inh_param()
-                    self.params[f'bneuron_v_speed_{i}'] = inh_param()
+                    self.params[f'bneuron_d_speed_{i}'] = inh_param(param_shape)
+                    self.params[f'bneuron_v_speed_{i}'] = inh_param(param_shape)
 
                 if self.include_turn_control and i < self.n_turn_joints:
-                    self.params[f'bneuron_d_turn_{i}'] = exc_param()
-                    self.params[f'bneuron_v_turn_{i}'] = exc_param()
+                    self.params[f'bneuron_d_turn_{i}'] = exc_param(param_shape)
+                    self.params[f'bneuron_v_turn_{i}'] = exc_param(param_shape)
 
                 if self.include_head_oscillators and i == 0:
-                    self.params[f'bneuron_d_osc_{i}'] = exc_param()
-                    self.params[f'bneuron_v_osc_{i}'] = exc_param()
-
-                self.params[f'muscle_d_d_{i}'] = exc_param()
-                self.params[f'muscle_d_v_{i}'] = inh_param()
-                self.params[f'muscle_v_v_{i}'] = exc_param()
-                self.params[f'muscle_v_d_{i}'] = inh_param()
+                    self.params[f'bneuron_d_osc_{i}'] = exc_param(param_shape)
+                    self.params[f'bneuron_v_osc_{i}'] = exc_param(param_shape)
+
+                self.params[f'muscle_d_d_{i}'] = exc_param(param_shape)
+                self.params[f'muscle_d_v_{i}'] = inh_param(param_shape)
+                self.params[f'muscle_v_v_{i}'] = exc_param(param_shape)
+                self.params[f'muscle_v_d_{i}'] = inh_param(param_shape)
+
+        # Per-joint parameter names grouped by connection, in joint order.
+        self._joint_keys = {}
+        if not use_weight_sharing:
+            for key in self.params.keys():
+                self._joint_keys.setdefault(key.rpartition('_')[0], []).append(key)
+
+        # Connections that are active in every forward pass, in joint order.
+        self._activity_entries = []
+        for i in range(self.n_joints):
+            if self.include_proprioception and i > 0:
+                self._activity_entries += [('exc', f'bneuron_d_prop_{i}'), ('exc', f'bneuron_v_prop_{i}')]
+            if self.include_speed_control:
+                self._activity_entries += [('inh', f'bneuron_d_speed_{i}'), ('inh', f'bneuron_v_speed_{i}')]
+            if self.include_turn_control and i < self.n_turn_joints:
+                self._activity_entries += [('exc', f'bneuron_d_turn_{i}'), ('exc', f'bneuron_v_turn_{i}')]
+            if self.include_head_oscillators and i == 0:
+                self._activity_entries += [('exc', f'bneuron_d_osc_{i}'), ('exc', f'bneuron_v_osc_{i}')]
+        self._activity_codes = self.recorder.register(self._activity_entries)
 
     def reset(self):
         self.timestep = 0
 
     def log_activity(self, activity_type, neuron):
         """Logs an active connection between neurons."""
-        self.connections_log.append((self.timestep, activity_type, neuron))
+        self.recorder.record(self.timestep, self.recorder.register([(activity_type, neuron)]))
+
+    @property
+    def connections_log(self):
+        """Recorded `(timestep, activity_type, neuron)` tuples; use `self.recorder` for the raw arrays."""
+        return self.recorder.to_records()
 
     def forward(
             self,
@@ -171,7 +208,9 @@ class SwimmerModule(nn.Module):
         """Forward pass.
 
     Args:
-      joint_pos (torch.Tensor): Joint positions in [-1, 1], shape (..., n_joints).
+      joint_pos (torch.Tensor): Joint positions in [-1, 1], shape (..., n_joints), or (..., n_agents, n_joints)
+        for several agents.
+      proximity (float or torch.Tensor): Distance to the other agents, a scalar or one per agent, shape (..., n_agents).
       right_control (torch.Tensor): Right turn control in [0, 1], shape (..., 1).
       left_control (torch.Tensor): Left turn control in [0, 1], shape (..., 1).
       speed_control (torch.Tensor): Speed control in [0, 1], 0 stopped, 1 fastest, shape (..., 1).
@@ -194,6 +233,16 @@ class SwimmerModule(nn.Module):
             assert speed_control is not None
             speed_control = 1 - speed_control.clamp(min=0, max=1)
 
+        # All connections of a forward pass are logged as one block.
+        if log_activity and self.recorder.enabled:
+            self.recorder.record(self.timestep, self._activity_codes)
+
+        if self.vectorized:
+            out = self._forward_vectorized(
+                joint_pos_d, joint_pos_v, proximity, right_control, left_control, speed_control, timesteps)
+            self.timestep += 1
+            return out
+
         joint_torques = []  # [shape (..., 1)]
         for i in range(self.n_joints):
             bneuron_d = bneuron_v = torch.zeros_like(joint_pos[..., 0, None])  # shape (..., 1)
@@ -204,8 +253,6 @@ class SwimmerModule(nn.Module):
                     ..., i - 1, None] * exc(self.params[ws(f'bneuron_d_prop_{i}', 'bneuron_prop')])
                 bneuron_v = bneuron_v + joint_pos_v[
                     ..., i - 1, None] * exc(self.params[ws(f'bneuron_v_prop_{i}', 'bneuron_prop')])
-                self.log_activity('exc', f'bneuron_d_prop_{i}')
-                self.log_activity('exc', f'bneuron_v_prop_{i}')
 
             # Speed control unit modulates all B-neurons.
             if self.include_speed_control:
@@ -215,8 +262,6 @@ class SwimmerModule(nn.Module):
                 bneuron_v = bneuron_v + speed_control * inh(
                     self.params[ws(f'bneuron_v_speed_{i}', 'bneuron_speed')]
                 )
-                self.log_activity('inh', f'bneuron_d_speed_{i}')
-                self.log_activity('inh', f'bneuron_v_speed_{i}')
 
             # Turn control units modulate head B-neurons.
             if self.include_turn_control and i < self.n_turn_joints:
@@ -230,30 +275,10 @@ class SwimmerModule(nn.Module):
                 bneuron_v = bneuron_v + turn_control_v * exc(
                     self.params[ws(f'bneuron_v_turn_{i}', 'bneuron_turn')]
                 )
-                self.log_activity('exc', f'bneuron_d_turn_{i}')
-                self.log_activity('exc', f'bneuron_v_turn_{i}')
 
             # Oscillator units modulate first B-neurons.
             if self.include_head_oscillators and i == 0:
-                if timesteps is not None:
-                    phase = timesteps.round().remainder(self.oscillator_period)
-                    mask = phase < self.oscillator_period // 2
-                    oscillator_d = torch.zeros_like(timesteps)  # shape (..., 1)
-                    oscillator_v = torch.zeros_like(timesteps)  # shape (..., 1)
-                    oscillator_d[mask] = 1.
-                    oscillator_v[~mask] = 1.
-                else:
-                    phase = self.timestep % self.oscillator_period  # in [0, oscillator_period)
-                    if phase < self.oscillator_period // 2:
-                        oscillator_d, oscillator_v = 1.0, 0.0
-                    else:
-                        oscillator_d, oscillator_v = 0.0, 1.0
-                
-                # added damping
-                freq = 1/self.oscillator_period
-                oscillator_d = oscillator_d-(2*np.pi*freq)*NCAP_damping(delt=1, proximity=proximity)*oscillator_d 
-                oscillator_v = oscillator_v-(2*np.pi*freq)*NCAP_damping(delt=1, proximity=proximity)*oscillator_d
-
+                oscillator_d, oscillator_v = self._oscillators(timesteps, proximity)
                 bneuron_d = bneuron_d + oscillator_d * exc(
                     self.params[ws(f'bneuron_d_osc_{i}', 'bneuron_osc')]
                 )
@@ -261,9 +286,6 @@ class SwimmerModule(nn.Module):
                     self.params[ws(f'bneuron_v_osc_{i}', 'bneuron_osc')]
                 )
 
-                self.log_activity('exc', f'bneuron_d_osc_{i}')
-                self.log_activity('exc', f'bneuron_v_osc_{i}')
-
             # B-neuron activation.
             bneuron_d = graded(bneuron_d)
             bneuron_v = graded(bneuron_v)
@@ -285,4 +307,111 @@ class SwimmerModule(nn.Module):
         self.timestep += 1
 
         out = torch.cat(joint_torques, -1)  # shape (..., n_joints)
-        return out
\ No newline at end of file
+        return out
+
+    def _oscillators(self, timesteps, proximity):
+        """Returns the damped dorsal and ventral head oscillator signals."""
+        if timesteps is not None:
+            phase = timesteps.round().remainder(self.oscillator_period)
+            mask = phase < self.oscillator_period // 2
+            oscillator_d = torch.zeros_like(timesteps)  # shape (..., 1)
+            oscillator_v = torch.zeros_like(timesteps)  # shape (..., 1)
+            oscillator_d[mask] = 1.
+            oscillator_v[~mask] = 1.
+        else:
+            phase = self.timestep % self.oscillator_period  # in [0, oscillator_period)
+            if phase < self.oscillator_period // 2:
+                oscillator_d, oscillator_v = 1.0, 0.0
+            else:
+                oscillator_d, oscillator_v = 0.0, 1.0
+
+        # added damping
+        freq = 1/self.oscillator_period
+        damping = self._damping(proximity)
+        oscillator_d = oscillator_d-(2*np.pi*freq)*damping*oscillator_d
+        oscillator_v = oscillator_v-(2*np.pi*freq)*damping*oscillator_d
+        return oscillator_d, oscillator_v
+
+    @staticmethod
+    def _damping(proximity):
+        """NCAP_damping of a scalar proximity, or of a (..., n_agents) tensor as shape (..., n_agents, 1)."""
+        if not torch.is_tensor(proximity):
+            return NCAP_damping(delt=1, proximity=proximity)
+        return NCAP_damping(delt=1, proximity=proximity)[..., None]
+
+    def _joint_weights(self, name, shared_name, constraint):
+        """Returns the constrained weights of a connection for all joints that have it, shape (..., n)."""
+        if self.use_weight_sharing:
+            return constraint(self.params[shared_name])  # shape (1,), broadcast over joints
+        return constraint(torch.cat([self.params[key] for key in self._joint_keys[name]], -1))
+
+    def _pad_joints(self, x, start, stop):
+        """Broadcasts `x` over joints [start, stop) and zero-pads it to shape (..., n_joints)."""
+        x = x.expand(*x.shape[:-1], stop - start)
+        return nn.functional.pad(x, (start, self.n_joints - stop))
+
+    def _forward_vectorized(
+            self,
+            joint_pos_d,
+            joint_pos_v,
+            proximity,
+            right_control,
+            left_control,
+            speed_control,
+            timesteps,
+    ):
+        """Computes the torques of all joints at once, matching the per-joint loop of `forward` exactly."""
+        exc = self.exc
+        inh = self.inh
+        n_joints = self.n_joints
+        n_turn_joints = min(self.n_turn_joints, n_joints)
+
+        bneuron_d = bneuron_v = torch.zeros_like(joint_pos_d)  # shape (..., n_joints)
+
+        # B-neurons recieve proprioceptive input from previous joint to propagate waves down the body.
+        if self.include_proprioception and n_joints > 1:
+            bneuron_d = bneuron_d + self._pad_joints(
+                joint_pos_d[..., :-1] * self._joint_weights('bneuron_d_prop', 'bneuron_prop', exc), 1, n_joints)
+            bneuron_v = bneuron_v + self._pad_joints(
+                joint_pos_v[..., :-1] * self._joint_weights('bneuron_v_prop', 'bneuron_prop', exc), 1, n_joints)
+
+        # Speed control unit modulates all B-neurons.
+        if self.include_speed_control:
+            bneuron_d = bneuron_d + speed_control * self._joint_weights('bneuron_d_speed', 'bneuron_speed', inh)
+            bneuron_v = bneuron_v + speed_control * self._joint_weights('bneuron_v_speed', 'bneuron_speed', inh)
+
+        # Turn control units modulate head B-neurons.
+        if self.include_turn_control and n_turn_joints > 0:
+            assert right_control is not None
+            assert left_control is not None
+            turn_control_d = right_control.clamp(min=0, max=1)  # shape (..., 1)
+            turn_control_v = left_control.clamp(min=0, max=1)
+            bneuron_d = bneuron_d + self._pad_joints(
+                turn_control_d * self._joint_weights('bneuron_d_turn', 'bneuron_turn', exc), 0, n_turn_joints)
+            bneuron_v = bneuron_v + self._pad_joints(
+                turn_control_v * self._joint_weights('bneuron_v_turn', 'bneuron_turn', exc), 0, n_turn_joints)
+
+        # Oscillator units modulate first B-neurons.
+        if self.include_head_oscillators:
+            oscillator_d, oscillator_v = self._oscillators(timesteps, proximity)
+            bneuron_d = bneuron_d + self._pad_joints(
+                oscillator_d * self._joint_weights('bneuron_d_osc', 'bneuron_osc', exc), 0, 1)
+            bneuron_v = bneuron_v + self._pad_joints(
+                oscillator_v * self._joint_weights('bneuron_v_osc', 'bneuron_osc', exc), 0, 1)
+
+        # B-neuron activation.
+        bneuron_d = graded(bneuron_d)
+        bneuron_v = graded(bneuron_v)
+
+        # Muscles receive excitatory ipsilateral and inhibitory contralateral input.
+        muscle_d = graded(
+            bneuron_d * self._joint_weights('muscle_d_d', 'muscle_ipsi', exc) +
+            bneuron_v * self._joint_weights('muscle_d_v', 'muscle_contra', inh)
+        )
+        muscle_v = graded(
+            bneuron_v * self._joint_weights('muscle_v_v', 'muscle_ipsi', exc) +
+            bneuron_d * self._joint_weights('muscle_v_d', 'muscle_contra', inh)
+        )
+
+        # Joint torque from antagonistic contraction of dorsal and ventral muscles.
+        return muscle_d - muscle_v  # shape (..., n_joints)
@@ -0,0 +1,265 @@
+import sys
+import os
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils.damping_utils import NCAP_damping
+
+# ==================================================================================================
+######### Define Constraints
+
+def excitatory(w):
+    return np.maximum(w, 0)
+
+
+def inhibitory(w):
+    return np.minimum(w, 0)
+
+
+def unsigned(w):
+    return w
+
+def clip(x, lower, upper):
+    # Faster than np.clip for the small arrays of a single step.
+    return np.minimum(np.maximum(x, lower), upper)
+
+# Activation constraints.
+def graded(x):
+    return clip(x, 0, 1)
+
+# Maps joint positions to dorsal (positive) and ventral (negative) sensor values.
+_SIDE_SIGNS = np.array([[1.], [-1.]], dtype=np.float32)
+
+
+class NumpySwimmerModule:
+    """
+    Torch-free NCAP circuit, numerically equivalent to `Agents.NCAPSwimmer.SwimmerModule`.
+
+    The constructor takes the same architecture flags as `SwimmerModule`. Weights are loaded from a
+    `SwimmerModule` state_dict (torch tensors or NumPy arrays), constrained once and stored as dense
+    (dorsal, ventral) x joint arrays, so each step is a handful of elementwise NumPy ops.
+    """
+
+    def __init__(
+            self,
+            n_joints: int,
+            n_turn_joints: int = 1,
+            oscillator_period: int = 60,
+            use_weight_sharing: bool = True,
+            use_weight_constraints: bool = True,
+            include_proprioception: bool = True,
+            include_head_oscillators: bool = True,
+            include_speed_control: bool = False,
+            include_turn_control: bool = False,
+            state_dict=None,
+            dtype=np.float32,
+    ):
+        self.n_joints = n_joints
+        self.n_turn_joints = n_turn_joints
+        self.oscillator_period = oscillator_period
+        self.use_weight_sharing = use_weight_sharing
+        self.include_proprioception = include_proprioception
+        self.include_head_oscillators = include_head_oscillators
+        self.include_speed_control = include_speed_control
+        self.include_turn_control = include_turn_control
+        self.dtype = dtype
+        self.exc = excitatory if use_weight_constraints else unsigned
+        self.inh = inhibitory if use_weight_constraints else unsigned
+
+        # Timestep counter (for oscillations).
+        self.timestep = 0
+
+        self.weights = {}
+        if state_dict is not None:
+            self.load_state_dict(state_dict)
+
+    @classmethod
+    def from_torch(cls, swimmer, dtype=np.float32):
+        """Builds the NumPy circuit with the configuration and weights of a `SwimmerModule`."""
+        return cls(
+            n_joints=swimmer.n_joints,
+            n_turn_joints=swimmer.n_turn_joints,
+            oscillator_period=swimmer.oscillator_period,
+            use_weight_sharing=swimmer.use_weight_sharing,
+            use_weight_constraints=swimmer.use_weight_constraints,
+            include_proprioception=swimmer.include_proprioception,
+            include_head_oscillators=swimmer.include_head_oscillators,
+            include_speed_control=swimmer.include_speed_control,
+            include_turn_control=swimmer.include_turn_control,
+            state_dict={k: v.detach().cpu().numpy() for k, v in swimmer.state_dict().items()},
+            dtype=dtype,
+        )
+
+    def load_state_dict(self, state_dict):
+        """Loads and constrains weights from a `SwimmerModule` state_dict."""
+        params = {key[len('params.'):]: np.asarray(value, dtype=self.dtype).reshape(-1)
+                  for key, value in state_dict.items() if key.startswith('params.')}
+        if any(len(value) != 1 for value in params.values()):
+            raise ValueError('Per-agent weights (SwimmerModule with n_agents) are not supported.')
+        n_turn_joints = min(self.n_turn_joints, self.n_joints)
+
+        def joint_weights(name, shared_name, constraint, joints):
+            """Dense weight vector of shape (n_joints,), zero for joints without the connection."""
+            weights = np.zeros(self.n_joints, dtype=self.dtype)
+            for i in joints:
+                weights[i] = params[shared_name if self.use_weight_sharing else f'{name}_{i}'][0]
+            return constraint(weights)
+
+        def side_weights(name, shared_name, constraint, joints):
+            """Dorsal (row 0) and ventral (row 1) weight vectors, shape (2, n_joints)."""
+            return np.stack([joint_weights(name.format(side), shared_name, constraint, joints) for side in 'dv'])
+
+        all_joints = range(self.n_joints)
+        self.weights = {}
+        if self.include_proprioception:
+            self.weights['prop'] = side_weights('bneuron_{}_prop', 'bneuron_prop', self.exc, range(1, self.n_joints))
+        if self.include_speed_control:
+            self.weights['speed'] = side_weights('bneuron_{}_speed', 'bneuron_speed', self.inh, all_joints)
+        if self.include_turn_control:
+            self.weights['turn'] = side_weights('bneuron_{}_turn', 'bneuron_turn', self.exc, range(n_turn_joints))
+        if self.include_head_oscillators:
+            self.weights['osc'] = side_weights('bneuron_{}_osc', 'bneuron_osc', self.exc, range(1))
+        self.weights['ipsi'] = np.stack([
+            joint_weights('muscle_d_d', 'muscle_ipsi', self.exc, all_joints),
+            joint_weights('muscle_v_v', 'muscle_ipsi', self.exc, all_joints),
+        ])
+        self.weights['contra'] = np.stack([
+            joint_weights('muscle_d_v', 'muscle_contra', self.inh, all_joints),
+            joint_weights('muscle_v_d', 'muscle_contra', self.inh, all_joints),
+        ])
+        if self.include_head_oscillators:
+            self._ventral_oscillator_input = np.array([[0.], [1.]], dtype=self.dtype) * self.weights['osc']
+
+    def reset(self):
+        self.timestep = 0
+
+    def _oscillator_input(self, proximity, ventral):
+        """Returns the damped oscillator input to the B-neurons, shape (..., 2, n_joints).
+
+        Only the dorsal phase depends on the proximity, a scalar or one value per row of the inputs
+        of shape (...,), the ventral phase input is cached with the weights."""
+        # added damping
+        freq = 1/self.oscillator_period
+        damping = (2*np.pi*freq)*np.asarray(NCAP_damping(delt=1, proximity=proximity), dtype=self.dtype)
+        oscillator_d = 1-damping[..., None, None]
+        oscillator_v = -damping[..., None, None]*oscillator_d
+        dorsal = np.concatenate([oscillator_d, oscillator_v], axis=-2) * self.weights['osc']
+        return np.where(ventral, self._ventral_oscillator_input, dorsal)
+
+    def __call__(
+            self,
+            joint_pos,
+            proximity=1,
+            right_control=None,
+            left_control=None,
+            speed_control=None,
+            timesteps=None,
+    ):
+        """Forward pass, see `SwimmerModule.forward`.
+
+    Args:
+      joint_pos (np.ndarray): Joint positions in [-1, 1], shape (..., n_joints).
+      right_control (np.ndarray): Right turn control in [0, 1], shape (..., 1).
+      left_control (np.ndarray): Left turn control in [0, 1], shape (..., 1).
+      speed_control (np.ndarray): Speed control in [0, 1], 0 stopped, 1 fastest, shape (..., 1).
+      timesteps (np.ndarray): Timesteps in [0, max_env_steps], shape (..., 1).
+      proximity (float or np.ndarray): Distance to the nearest other swimmer, a scalar or shape (...,).
+
+    Returns:
+      (np.ndarray): Joint torques in [-1, 1], shape (..., n_joints).
+    """
+        weights = self.weights
+
+        # Dorsal (row 0) and ventral (row 1) sensor values in [0, 1], shape (..., 2, n_joints).
+        joint_pos = np.asarray(joint_pos, dtype=self.dtype)
+        joint_pos = clip(joint_pos[..., None, :] * _SIDE_SIGNS, 0, 1)
+
+        bneuron = np.zeros(joint_pos.shape, dtype=self.dtype)
+
+        # B-neurons recieve proprioceptive input from previous joint to propagate waves down the body.
+        if self.include_proprioception:
+            bneuron[..., 1:] = joint_pos[..., :-1] * weights['prop'][:, 1:]
+
+        # Speed control unit modulates all B-neurons.
+        if self.include_speed_control:
+            if speed_control is None:
+                raise ValueError('speed_control is required when include_speed_control is set.')
+            speed_control = 1 - clip(np.asarray(speed_control, dtype=self.dtype), 0, 1)
+            bneuron += speed_control[..., None] * weights['speed']
+
+        # Turn control units modulate head B-neurons.
+        if self.include_turn_control:
+            if right_control is None or left_control is None:
+                raise ValueError('right_control and left_control are required when include_turn_control is set.')
+            turn_control = np.concatenate([right_control, left_control], -1)[..., None]  # shape (..., 2, 1)
+            bneuron += clip(turn_control, 0, 1) * weights['turn']
+
+        # Oscillator units modulate first B-neurons.
+        if self.include_head_oscillators:
+            if timesteps is not None:
+                phase = np.remainder(np.round(timesteps), self.oscillator_period)
+                ventral = (phase >= self.oscillator_period // 2)[..., None]  # shape (..., 1, 1)
+            else:
+                ventral = self.timestep % self.oscillator_period >= self.oscillator_period // 2
+            bneuron += self._oscillator_input(proximity, ventral)
+
+        # B-neuron activation.
+        bneuron = graded(bneuron)
+
+        # Muscles receive excitatory ipsilateral and inhibitory contralateral input.
+        muscle = graded(bneuron * weights['ipsi'] + bneuron[..., ::-1, :] * weights['contra'])
+
+        self.timestep += 1
+
+        # Joint torque from antagonistic contraction of dorsal and ventral muscles.
+        return muscle[..., 0, :] - muscle[..., 1, :]
+
+
+class NumpySwimmerActor:
+    """Torch-free counterpart of `wrappers.ActorNCAP.SwimmerActor` returning deterministic actions."""
+
+    def __init__(self, swimmer, action_size, timestep_transform=(-1, 1, 0, 1000), proximity_index=None):
+        self.swimmer = swimmer
+        self.action_size = action_size
+        self.timestep_transform = timestep_transform
+
+        # Position of the proximity feature in the observations, as for `SwimmerActor`.
+        self.proximity_index = proximity_index
+
+        # Normalize joint positions by max joint angle (in radians).
+        self.joint_limit = 2 * np.pi / (action_size + 1)  # In dm_control, calculated with n_bodies.
+
+    @classmethod
+    def from_torch(cls, actor, dtype=np.float32):
+        """Builds the NumPy actor with the swimmer, action size and observation layout of a `SwimmerActor`.
+
+        The controller of the actor, a torch module producing the turn and speed controls, is not
+        exported, so actors with a controller raise a ValueError."""
+        if actor.controller is not None:
+            raise ValueError('SwimmerActor controllers cannot be exported to NumPy, '
+                             'got a {}.'.format(type(actor.controller).__name__))
+        return cls(NumpySwimmerModule.from_torch(actor.swimmer, dtype), actor.action_size,
+                   timestep_transform=actor.timestep_transform, proximity_index=actor.proximity_index)
+
+    def __call__(self, observations, proximity=1):
+        observations = np.asarray(observations, dtype=self.swimmer.dtype)
+        joint_pos = clip(observations[..., :self.action_size] / self.joint_limit, -1, 1)
+        timesteps = observations[..., -1, None]
+
+        # Proximity to the other swimmers, observed from the physics.
+        if self.proximity_index is not None:
+            proximity = observations[..., self.proximity_index]
+
+        # Convert normalized time signal into timestep.
+        if self.timestep_transform:
+            low_in, high_in, low_out, high_out = self.timestep_transform
+            timesteps = (timesteps - low_in) / (high_in - low_in) * (high_out - low_out) + low_out
+
+        return self.swimmer(joint_pos, proximity=proximity, timesteps=timesteps)
+
+    def test_step(self, observations, steps=None):
+        return self(observations)
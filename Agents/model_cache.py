@@ -0,0 +1,83 @@
+"""Cache of compiled MuJoCo models for fast environment construction.
+
+Compiling the generated swimmer MJCF dominates environment startup. Compiled models
+are memoized per process under a caller-provided key, and optionally saved as binary
+MJB files that other processes (e.g. `tonic.environments.distribute` workers) load
+directly. Every physics gets its own copy of the compiled model, since tasks modify
+the model.
+
+The on-disk cache is opt-in: it is used when a `cache_dir` is passed, or when the
+`SWIMMER_MODEL_CACHE` environment variable names a directory, e.g.
+`~/.cache/social-agents/models`. Worker processes inherit the variable.
+"""
+import copy
+import hashlib
+import os
+
+import mujoco
+from dm_control.mujoco import wrapper
+
+CACHE_DIR_VARIABLE = 'SWIMMER_MODEL_CACHE'
+
+_COMPILED_MODELS = {}
+
+
+def clear_memory_cache():
+  """Forgets the compiled models of this process, the on-disk cache is kept."""
+  _COMPILED_MODELS.clear()
+
+
+def default_cache_dir():
+  """Returns the directory named by `SWIMMER_MODEL_CACHE`, or None if the on-disk cache is off."""
+  cache_dir = os.environ.get(CACHE_DIR_VARIABLE)
+  return os.path.expanduser(cache_dir) if cache_dir else None
+
+
+def model_digest(model_xml, assets):
+  """Returns a hash of the model XML, its assets and the MuJoCo version."""
+  digest = hashlib.sha1(mujoco.__version__.encode())
+  for content in [model_xml] + [assets[name] for name in sorted(assets)]:
+    digest.update(content if isinstance(content, bytes) else content.encode())
+  return digest.hexdigest()
+
+
+def _compile(model_xml, assets, cache_dir):
+  """Loads the compiled model from `cache_dir` if present, otherwise compiles and saves it."""
+  if not cache_dir:
+    return wrapper.MjModel.from_xml_string(model_xml, assets=assets)
+  path = os.path.join(cache_dir, model_digest(model_xml, assets) + '.mjb')
+  if os.path.exists(path):
+    try:
+      return wrapper.MjModel.from_binary_path(path)
+    except Exception:  # pylint: disable=broad-except
+      pass  # Truncated or incompatible file, compile again.
+  model = wrapper.MjModel.from_xml_string(model_xml, assets=assets)
+  os.makedirs(cache_dir, exist_ok=True)
+  # Write to a private file and rename it, so concurrent workers never read a partial file.
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  model.save_binary(tmp_path)
+  os.replace(tmp_path, path)
+  return model
+
+
+def load_physics(physics_cls, key, get_model_and_assets, cache_dir=None):
+  """Returns a new `physics_cls` instance built from a cached compiled model.
+
+  Args:
+    physics_cls: A `dm_control.mujoco.Physics` subclass.
+    key: A hashable identifying the model within this process, e.g. `(n_bodies, scene)`.
+    get_model_and_assets: A callable returning `(model_xml, assets)`, only called on a cache miss.
+    cache_dir: Directory of the on-disk MJB cache. Defaults to `default_cache_dir()`,
+      an empty string only caches in memory.
+
+  Returns:
+    A `physics_cls` instance with its own copy of the compiled model.
+  """
+  model = _COMPILED_MODELS.get(key)
+  if model is None:
+    if cache_dir is None:
+      cache_dir = default_cache_dir()
+    model_xml, assets = get_model_and_assets()
+    model = _compile(model_xml, assets, cache_dir)
+    _COMPILED_MODELS[key] = model
+  return physics_cls.from_model(copy.copy(model))
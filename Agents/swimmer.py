@@ -15,9 +15,12 @@
 
 """Procedurally generated Swimmer domain."""
 import collections
+import functools
 import os
+import re
 
 from dm_control import mujoco
+from dm_env import specs
 from dm_control.rl import control
 from dm_control.suite import base
 from dm_control.suite import common
@@ -27,24 +30,58 @@ from dm_control.utils import rewards
 from lxml import etree
 import numpy as np
 
+from . import model_cache
+
 _DEFAULT_TIME_LIMIT = 30
 _CONTROL_TIMESTEP = .03  # (Seconds)
+_DEFAULT_SCENE = 'swimmer.xml'
+_MAX_PROXIMITY = 10.  # Reported for a swimmer without neighbours, beyond any damping threshold.
+_HEAD_NAME = re.compile(r'^head(\d*)$')
+_LAYOUTS = ('line', 'grid', 'circle')
+
+# Spec of a generated scene with `n_swimmers` heads, usable wherever a scene file name is.
+SwimmerScene = collections.namedtuple(
+    'SwimmerScene', ['n_swimmers', 'layout', 'spacing', 'lights', 'cameras'],
+    defaults=('line', .5, False, False))
 
 SUITE = containers.TaggedTasks()
 
+_MODEL_LAYOUTS = {}
+
 
-def get_model_and_assets(n_joints):
+def get_model_and_assets(n_joints, scene=_DEFAULT_SCENE):
   """Returns a tuple containing the model XML string and a dict of assets.
 
   Args:
     n_joints: An integer specifying the number of joints in the swimmer.
+    scene: File name of the scene in `resources` defining the swimmer heads, or
+      a `SwimmerScene` to generate the heads.
 
   Returns:
     A tuple `(model_xml_string, assets)`, where `assets` is a dict consisting of
     `{filename: contents_string}` pairs.
   """
-  print('importing')
-  return _make_model(n_joints), common.ASSETS
+  return _make_model(n_joints, scene), common.ASSETS
+
+
+def get_physics(n_joints, scene=_DEFAULT_SCENE, cache_dir=None):
+  """Returns a new `Physics` for the swimmer, reusing the compiled model.
+
+  Args:
+    n_joints: An integer specifying the number of joints in the swimmer.
+    scene: File name of the scene in `resources`, or a `SwimmerScene`.
+    cache_dir: Directory of the on-disk compiled model cache, see
+      `model_cache.load_physics`. Defaults to `SWIMMER_MODEL_CACHE`.
+  """
+  key = (__name__, n_joints, scene)
+  physics = model_cache.load_physics(
+      Physics, key, lambda: get_model_and_assets(n_joints, scene),
+      cache_dir=cache_dir)
+  # Resolve the layout once per model, all physics of the model share it.
+  if key not in _MODEL_LAYOUTS:
+    _MODEL_LAYOUTS[key] = SwimmerLayout(physics.model)
+  physics._layout = _MODEL_LAYOUTS[key]  # pylint: disable=protected-access
+  return physics
 
 
 @SUITE.add('benchmarking')
@@ -64,36 +101,39 @@ def swimmer15(time_limit=_DEFAULT_TIME_LIMIT, random=None,
 
 
 def swimmer(n_links=3, time_limit=_DEFAULT_TIME_LIMIT,
-            random=None, environment_kwargs=None):
-  """Returns a swimmer with n links."""
+            random=None, environment_kwargs=None, scene=_DEFAULT_SCENE,
+            per_agent=False):
+  """Returns a swimmer with n links, with one reward per swimmer if `per_agent`."""
   return _make_swimmer(n_links, time_limit, random=random,
-                       environment_kwargs=environment_kwargs)
+                       environment_kwargs=environment_kwargs, scene=scene,
+                       per_agent=per_agent)
 
 
 def _make_swimmer(n_joints, time_limit=_DEFAULT_TIME_LIMIT, random=None,
-                  environment_kwargs=None):
+                  environment_kwargs=None, scene=_DEFAULT_SCENE,
+                  per_agent=False):
   """Returns a swimmer control environment."""
-  model_string, assets = get_model_and_assets(n_joints)
-  physics = Physics.from_xml_string(model_string, assets=assets)
-  task = Swimmer(random=random)
+  physics = get_physics(n_joints, scene)
+  task = Swimmer(per_agent=per_agent, random=random)
   environment_kwargs = environment_kwargs or {}
-  return control.Environment(
+  return Environment(
       physics, task, time_limit=time_limit, control_timestep=_CONTROL_TIMESTEP,
       **environment_kwargs)
 
 
-def _make_model(n_bodies):
-  """Generates an xml string defining a swimmer with `n_bodies` bodies."""
+@functools.lru_cache(maxsize=None)
+def _make_model(n_bodies, scene=_DEFAULT_SCENE):
+  """Generates an xml string defining a swimmer with `n_bodies` bodies.
+
+  The result is memoized per `(n_bodies, scene)`.
+  """
   if n_bodies < 3:
     raise ValueError('At least 3 bodies required. Received {}'.format(n_bodies))
-  script_dir = os.path.dirname(__file__)  # Get the directory of the current script
-  resources_dir = os.path.join(script_dir, 'resources')  # Go to resources directory
-  file_path = os.path.join(resources_dir, 'swimmer.xml')
+  if isinstance(scene, SwimmerScene):
+    mjcf = _make_scene(scene)
+  else:
+    mjcf = _read_scene(scene)
 
-  # Read the swimmer.xml file
-  with open(file_path, 'r') as file:
-      mjcf = etree.parse(file)
-  
   root = mjcf.getroot()  # Get the root element
 
   head_bodies = root.findall('./worldbody/body')
@@ -130,9 +170,125 @@ def _make_model(n_bodies):
       new_pos = ' '.join([str(float(dim) * scale) for dim in old_pos])
       cam.set('pos', new_pos)
 
-  print('Two Bodies Imported')
+  return etree.tostring(mjcf)
+
+
+def _read_scene(file_name):
+  """Parses a scene file from the `resources` directory."""
+  script_dir = os.path.dirname(__file__)  # Get the directory of the current script
+  resources_dir = os.path.join(script_dir, 'resources')  # Go to resources directory
+  with open(os.path.join(resources_dir, file_name), 'r') as file:
+    return etree.parse(file)
+
+
+def spawn_positions(n_swimmers, layout='line', spacing=.5):
+  """Returns the x,y spawn positions of `n_swimmers` heads, shape (n_swimmers, 2).
+
+  Args:
+    n_swimmers: Number of swimmers.
+    layout: 'line' along y (as in `swimmer.xml`), 'grid' of rows along x, or
+      'circle' around the origin.
+    spacing: Distance between neighbouring heads.
+  """
+  if n_swimmers < 1:
+    raise ValueError('At least 1 swimmer required. Received {}'.format(n_swimmers))
+  index = np.arange(n_swimmers)
+  if layout == 'line':
+    return np.stack([np.zeros(n_swimmers), index * spacing], axis=1)
+  if layout == 'grid':
+    columns = int(np.ceil(np.sqrt(n_swimmers)))
+    return np.stack([index % columns, index // columns], axis=1) * float(spacing)
+  if layout == 'circle':
+    if n_swimmers == 1:
+      return np.zeros((1, 2))
+    # Chord between neighbours equals `spacing`.
+    radius = spacing / (2 * np.sin(np.pi / n_swimmers))
+    angle = 2 * np.pi * index / n_swimmers
+    return np.stack([np.cos(angle), np.sin(angle)], axis=1) * radius
+  raise ValueError('Unknown layout {!r}, expected one of {}.'.format(layout, _LAYOUTS))
+
+
+def _make_head(k, x, y, lights, cameras):
+  """Generates the head body of swimmer `k` (1-based), as written in `swimmer.xml`."""
+  head = etree.Element('body', {'name': 'head{}'.format(k), 'pos': '{!r} {!r} .05'.format(float(x), float(y)),
+                                'childclass': 'swimmer'})
+  if lights:
+    etree.SubElement(head, 'light', {'name': 'light{}_1'.format(k), 'diffuse': '.8 .8 .8',
+                                     'pos': '0 0 1.5'})
+  etree.SubElement(head, 'geom', {'name': 'head{}'.format(k), 'type': 'ellipsoid',
+                                  'size': '.02 .04 .017', 'pos': '0 -.022 0',
+                                  'material': 'self', 'mass': '0'})
+  etree.SubElement(head, 'geom', {'name': 'nose{}'.format(k), 'type': 'sphere',
+                                  'pos': '0 -.06 0', 'size': '.004',
+                                  'material': 'effector', 'mass': '0'})
+  etree.SubElement(head, 'geom', {'name': 'eyes{}'.format(k), 'type': 'capsule',
+                                  'fromto': '-.006 -.054 .005 .006 -.054 .005',
+                                  'size': '.004', 'material': 'eye', 'mass': '0'})
+  if cameras:
+    etree.SubElement(head, 'camera', {'name': 'tracking{}1'.format(k), 'pos': '0 -.2 .5',
+                                      'xyaxes': '1 0 0 0 1 1', 'mode': 'trackcom',
+                                      'fovy': '60'})
+    etree.SubElement(head, 'camera', {'name': 'tracking{}2'.format(k), 'pos': '-.9 .5 .15',
+                                      'xyaxes': '0 -1 0 .3 0 1', 'mode': 'trackcom',
+                                      'fovy': '60'})
+    etree.SubElement(head, 'camera', {'name': 'eyes{}'.format(k), 'pos': '0 -.058 .005',
+                                      'xyaxes': '-1 0 0 0 0 1'})
+  for axis, (joint_type, direction) in zip('xyz', [('slide', '1 0 0'), ('slide', '0 1 0'),
+                                                    ('hinge', '0 0 1')]):
+    etree.SubElement(head, 'joint', {'name': 'root{}{}'.format(axis, k), 'class': 'free',
+                                     'type': joint_type, 'axis': direction,
+                                     'pos': '0 -.05 0'})
+  etree.SubElement(head, 'geom', {'name': 'inertial{}'.format(k), 'class': 'inertial'})
+  etree.SubElement(head, 'geom', {'name': 'visual{}'.format(k), 'class': 'visual'})
+  etree.SubElement(head, 'site', {'name': 'head{}'.format(k)})
+  return head
+
+
+def _make_scene(scene):
+  """Generates the `swimmer.xml` scene with the heads described by a `SwimmerScene`.
+
+  Heads are named `head1` ... `headK` in spawn order. The scene sensors are
+  `target_pos` followed by `nose{k}_pos`, `head{k}_xaxis`, `head{k}_yaxis`,
+  `head{k}_vel` and `head{k}_gyro` for each swimmer in order; `_make_model`
+  appends the segment sensors after them. Without per-agent cameras, a fixed
+  `overview` camera is added so that camera 0 still exists.
+  """
+  mjcf = _read_scene(_DEFAULT_SCENE)
+  root = mjcf.getroot()
+  worldbody = root.find('./worldbody')
+  for head in worldbody.findall('./body'):
+    worldbody.remove(head)
+  for sensor in root.findall('./sensor'):
+    root.remove(sensor)
+
+  positions = spawn_positions(scene.n_swimmers, scene.layout, scene.spacing)
+  target = worldbody.find("./geom[@name='target']")
+  for k, (x, y) in enumerate(positions, start=1):
+    target.addprevious(_make_head(k, x, y, scene.lights, scene.cameras))
+
+  # Grow the ground and the overview camera with the extent of the layout.
+  extent = max(2., float(np.abs(positions).max()) + 1.)
+  worldbody.find("./geom[@name='ground']").set('size', '{:g} {:g} 0.1'.format(extent, extent))
+  if not scene.cameras:
+    center = positions.mean(axis=0)
+    worldbody.insert(0, etree.Element('camera', {
+        'name': 'overview', 'mode': 'fixed', 'xyaxes': '1 0 0 0 1 0',
+        'pos': '{:g} {:g} {:g}'.format(center[0], center[1], 1.5 * extent)}))
 
-  return etree.tostring(mjcf, pretty_print=True)
+  sensor = etree.SubElement(root, 'sensor')
+  etree.SubElement(sensor, 'framepos', {'name': 'target_pos', 'objtype': 'geom',
+                                        'objname': 'target'})
+  for k in range(1, scene.n_swimmers + 1):
+    head = 'head{}'.format(k)
+    etree.SubElement(sensor, 'framepos', {'name': 'nose{}_pos'.format(k), 'objtype': 'geom',
+                                          'objname': 'nose{}'.format(k)})
+    etree.SubElement(sensor, 'framexaxis', {'name': head + '_xaxis', 'objtype': 'xbody',
+                                            'objname': head})
+    etree.SubElement(sensor, 'frameyaxis', {'name': head + '_yaxis', 'objtype': 'xbody',
+                                            'objname': head})
+    etree.SubElement(sensor, 'velocimeter', {'name': head + '_vel', 'site': head})
+    etree.SubElement(sensor, 'gyro', {'name': head + '_gyro', 'site': head})
+  return mjcf
 
 
 def _make_body(body_index, body_id):
@@ -147,42 +303,144 @@ def _make_body(body_index, body_id):
   return body
 
 
+def nearest_neighbour_distances(positions, max_distance=_MAX_PROXIMITY):
+  """Returns the distance from each of `positions`, shape (n, 3), to the nearest other one, shape (n,)."""
+  offsets = positions[:, None, :] - positions[None, :, :]
+  distances = np.sqrt(np.einsum('ijk,ijk->ij', offsets, offsets))
+  np.fill_diagonal(distances, np.inf)
+  return np.minimum(distances.min(axis=1, initial=np.inf), max_distance)
+
+
+def head_proximities(physics, head_ids):
+  """Returns each swimmer's distance to its nearest neighbour, given `SwimmerLayout.head_bodies`."""
+  return nearest_neighbour_distances(physics.data.xpos[head_ids])
+
+
+class SwimmerLayout:
+  """Index arrays locating every swimmer's elements in a compiled model.
+
+  Swimmers are ordered by head name and follow the naming of this module
+  (`head1`, `joint_0_0`, `velocimeter_0_0`, ...) or of the single dm_control
+  swimmer (`head`, `joint_0`, `velocimeter_0`, ...). Body 0 of each swimmer is
+  its head, followed by its segments.
+
+  Attributes:
+    head_bodies: Body ids of the heads, shape (n_swimmers,).
+    head_geoms: Geom ids of the heads, shape (n_swimmers,).
+    nose_geoms: Geom ids of the noses, shape (n_swimmers,).
+    target_geom: Geom id of the target.
+    joint_qpos: `qpos` addresses of the internal joints, shape (n_swimmers, n_joints).
+    joint_dofs: DOF addresses of the internal joints, shape (n_swimmers, n_joints).
+    velocimeters: `sensordata` addresses of the body velocimeters, shape (n_swimmers, n_bodies, 3).
+    gyros: `sensordata` addresses of the body gyros, shape (n_swimmers, n_bodies, 3).
+    head_vel: `sensordata` addresses of the head velocimeters, shape (n_swimmers, 3).
+    body_velocity_sensors: `sensordata` addresses of each body's x,y linear and
+      z rotational velocity, shape (n_swimmers, 3 * n_bodies).
+  """
+
+  def __init__(self, model):
+    """Resolves the indices from a compiled `model` (a dm_control `MjModel`)."""
+    def ids(names, obj_type):
+      return np.array([[model.name2id(name, obj_type) for name in row] for row in names], dtype=int)
+
+    bodies = [model.id2name(i, 'body') for i in range(model.nbody)]
+    suffixes = sorted((match.group(1) for match in map(_HEAD_NAME.match, bodies) if match),
+                      key=lambda suffix: int(suffix or 0))
+    if not suffixes:
+      raise ValueError('The model contains no swimmer heads.')
+    joints = [model.id2name(i, 'joint') for i in range(model.njnt)]
+    # Segment elements are prefixed by the 0-based swimmer index, except for a single dm_control swimmer.
+    prefixes = ['' if suffix == '' else '{}_'.format(int(suffix) - 1) for suffix in suffixes]
+    n_joints = sum(name.startswith('joint_' + prefixes[0]) and
+                   name[len('joint_' + prefixes[0]):].isdigit() for name in joints)
+
+    self.n_swimmers = len(suffixes)
+    self.n_joints = n_joints
+    self.head_bodies = ids([['head' + suffix for suffix in suffixes]], 'body')[0]
+    self.head_geoms = ids([['head' + suffix for suffix in suffixes]], 'geom')[0]
+    self.nose_geoms = ids([['nose' + suffix for suffix in suffixes]], 'geom')[0]
+    self.target_geom = model.name2id('target', 'geom')
+
+    joint_ids = ids([['joint_{}{}'.format(prefix, i) for i in range(n_joints)] for prefix in prefixes], 'joint')
+    self.joint_qpos = model.jnt_qposadr[joint_ids]
+    self.joint_dofs = model.jnt_dofadr[joint_ids]
+
+    def sensors(head_name, segment_name):
+      names = [['head{}_{}'.format(suffix, head_name)] +
+               ['{}_{}{}'.format(segment_name, prefix, i) for i in range(n_joints)]
+               for suffix, prefix in zip(suffixes, prefixes)]
+      return model.sensor_adr[ids(names, 'sensor')][..., None] + np.arange(3)
+
+    self.velocimeters = sensors('vel', 'velocimeter')
+    self.gyros = sensors('gyro', 'gyro')
+    self.head_vel = self.velocimeters[:, 0]
+    vx_vy_wz = np.stack([self.velocimeters[..., 0], self.velocimeters[..., 1], self.gyros[..., 2]], axis=-1)
+    self.body_velocity_sensors = vx_vy_wz.reshape(self.n_swimmers, -1)
+
+
 class Physics(mujoco.Physics):
   """Physics simulation with additional features for the swimmer domain."""
 
-  def nose_to_target(self, head_name, nose_name):
-    """Returns a vector from nose to target in local coordinate of the head."""
-    nose_to_target = (self.named.data.geom_xpos['target'] -
-                      self.named.data.geom_xpos[nose_name])
-    head_orientation = self.named.data.xmat[head_name].reshape(3, 3)
-    return nose_to_target.dot(head_orientation)[:2]
+  @property
+  def layout(self):
+    """The `SwimmerLayout` of the model, resolved on first use unless set by `get_physics`."""
+    if getattr(self, '_layout', None) is None:
+      self._layout = SwimmerLayout(self.model)
+    return self._layout
 
-  def nose_to_target_dist(self, head_name, nose_name):
-    """Returns the distance from the nose to the target."""
-    return np.linalg.norm(self.nose_to_target(head_name, nose_name))
+  def proximities(self):
+    """Returns the distance from each swimmer's head to the nearest other head, shape (n_swimmers,)."""
+    return head_proximities(self, self.layout.head_bodies)
+
+  def nose_to_target(self):
+    """Returns vectors from each nose to the target in local coordinates of the head, shape (n_swimmers, 2)."""
+    layout = self.layout
+    nose_to_target = self.data.geom_xpos[layout.target_geom] - self.data.geom_xpos[layout.nose_geoms]
+    head_orientation = self.data.xmat[layout.head_bodies].reshape(-1, 3, 3)
+    return np.einsum('ni,nij->nj', nose_to_target, head_orientation[..., :2])
+
+  def nose_to_target_dist(self):
+    """Returns the distance from each nose to the target, shape (n_swimmers,)."""
+    return np.linalg.norm(self.nose_to_target(), axis=-1)
 
   def body_velocities(self):
-    """Returns local body velocities: x,y linear, z rotational."""
-    xvel_local = self.data.sensordata[12:].reshape((-1, 6))
-    vx_vy_wz = [0, 1, 5]  # Indices for linear x,y vels and rotational z vel.
-    return xvel_local[:, vx_vy_wz].ravel()
+    """Returns local body velocities of all swimmers: x,y linear, z rotational."""
+    return self.data.sensordata[self.layout.body_velocity_sensors].ravel()
 
   def joints(self):
     """Returns all internal joint angles (excluding root joints)."""
-    return self.data.qpos[3:].copy()
+    return self.data.qpos[self.layout.joint_qpos].ravel()
+
+
+class Environment(control.Environment):
+  """A `control.Environment` whose reward spec is described by the task.
+
+  dm_control assumes a scalar reward, while per-agent swimmer tasks return one
+  reward per swimmer.
+  """
+
+  def reward_spec(self):
+    """Returns the task's `get_reward_spec(physics)`, or a scalar spec."""
+    get_reward_spec = getattr(self.task, 'get_reward_spec', None)
+    if get_reward_spec is None:
+      return super().reward_spec()
+    return get_reward_spec(self.physics)
 
 
 class Swimmer(base.Task):
   """A swimmer `Task` to reach the target or just swim."""
 
-  def __init__(self, random=None):
+  def __init__(self, per_agent=False, random=None):
     """Initializes an instance of `Swimmer`.
 
     Args:
+      per_agent: Optional, whether the reward is one reward per swimmer, shape
+        (n_swimmers,), instead of the reward of the first swimmer.
       random: Optional, either a `numpy.random.RandomState` instance, an
         integer seed for creating a new `RandomState`, or None to select a seed
         automatically (default).
     """
+    self._per_agent = per_agent
     super().__init__(random=random)
 
   def initialize_episode(self, physics):
@@ -211,14 +469,23 @@ class Swimmer(base.Task):
     """Returns an observation of joint angles, body velocities and target."""
     obs = collections.OrderedDict()
     obs['joints'] = physics.joints()
-    obs['to_target'] = physics.nose_to_target()
+    obs['to_target'] = physics.nose_to_target().ravel()
     obs['body_velocities'] = physics.body_velocities()
     return obs
 
+  def get_reward_spec(self, physics):
+    """Returns the spec of the reward, shape (n_swimmers,) with `per_agent`."""
+    if not self._per_agent:
+      return specs.Array(shape=(), dtype=float, name='reward')
+    # dm_control's swimmer Physics has no cached layout, resolve it from the model.
+    layout = getattr(physics, 'layout', None) or SwimmerLayout(physics.model)
+    return specs.Array(shape=(layout.n_swimmers,), dtype=float, name='reward')
+
   def get_reward(self, physics):
-    """Returns a smooth reward."""
-    target_size = physics.named.model.geom_size['target', 0]
-    return rewards.tolerance(physics.nose_to_target_dist('head1', 'nose1'),
-                             bounds=(0, target_size),
-                             margin=5*target_size,
-                             sigmoid='long_tail')
+    """Returns a smooth reward, for every swimmer at once with `per_agent`."""
+    target_size = physics.model.geom_size[physics.layout.target_geom, 0]
+    agent_rewards = rewards.tolerance(physics.nose_to_target_dist(),
+                                      bounds=(0, target_size),
+                                      margin=5*target_size,
+                                      sigmoid='long_tail')
+    return agent_rewards if self._per_agent else float(agent_rewards[0])
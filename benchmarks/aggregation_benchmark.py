@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils import log_reader
+from cust_utils.aggregation import aggregate_runs
+
+
+def _naive_aggregate(paths, n_points, n_bootstrap, seed=0):
+    """Loads every log with pandas and bootstraps the mean with a loop over resamples."""
+    frames = [pd.read_csv(os.path.join(path, 'log.csv')) for path in paths]
+    curves = [(np.cumsum(frame['test/episode_length/mean']), frame['test/episode_score/mean']) for frame in frames]
+    grid = np.geomspace(min(steps.iloc[0] for steps, _ in curves), max(steps.iloc[-1] for steps, _ in curves), n_points)
+    values = np.array([np.interp(grid, steps, scores, left=np.nan, right=np.nan) for steps, scores in curves])
+    rng = np.random.default_rng(seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Steps covered by no resampled run.
+        means = [np.nanmean(values[rng.integers(0, len(values), len(values))], axis=0) for _ in range(n_bootstrap)]
+    return np.nanmean(values, axis=0), np.nanquantile(means, [.025, .975], axis=0)
+
+
+def benchmark_aggregation(run_counts=(10, 100), n_rows=2000, n_points=200, n_bootstrap=1000, repeats=3):
+    """Times the aggregation of the performance of many runs onto a common step axis.
+
+    Parameters:
+    - run_counts (tuple of int): Numbers of runs to aggregate.
+    - n_rows (int): Logged epochs per run.
+    - n_points (int): Steps of the common axis.
+    - n_bootstrap (int): Bootstrap resamples of the confidence interval.
+    - repeats (int): Number of timed aggregations per configuration.
+
+    Returns:
+    - list of dict: One row per run count with the times in milliseconds of loading every log with
+      pandas and looping over resamples, and of `aggregate_runs` on parsed and cached logs.
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    for n_runs in run_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for run in range(n_runs):
+                paths.append(os.path.join(directory, str(run)))
+                os.makedirs(paths[-1])
+                lengths = np.full(n_rows, 1000.) + rng.integers(0, 100)
+                pd.DataFrame({'test/episode_score/mean': rng.random(n_rows).cumsum(),
+                              'test/episode_length/mean': lengths}).to_csv(
+                    os.path.join(paths[-1], 'log.csv'), index=False)
+
+            def aggregate():
+                aggregate_runs(paths, n_points, n_bootstrap=n_bootstrap, cache=True)
+
+            def from_sidecar():
+                log_reader.clear_memory_cache()
+                aggregate_runs(paths, n_points, n_bootstrap=n_bootstrap)
+
+            aggregate()  # Write the sidecars and fill the cache.
+            row = dict(n_runs=n_runs)
+            row['naive_ms'] = timeit.timeit(
+                lambda: _naive_aggregate(paths, n_points, n_bootstrap), number=repeats) / repeats * 1e3
+            row['sidecar_ms'] = timeit.timeit(from_sidecar, number=repeats) / repeats * 1e3
+            row['cached_ms'] = timeit.timeit(aggregate, number=repeats) / repeats * 1e3
+            results.append(row)
+            log_reader.clear_memory_cache()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark multi-seed aggregation of training logs.')
+    parser.add_argument('--runs', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"n_runs":>8} {"naive (ms)":>11} {"sidecar (ms)":>13} {"cached (ms)":>12}')
+    for row in benchmark_aggregation(args.runs, args.rows, repeats=args.repeats):
+        print(f'{row["n_runs"]:>8} {row["naive_ms"]:>11.1f} {row["sidecar_ms"]:>13.1f} {row["cached_ms"]:>12.1f}')
@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from Agents import DeepControlSwimmer
+from tasks.batched_environment import BatchedSwimEnvironment
+from tasks.shared_memory_environment import SharedMemorySwimEnvironment
+
+
+def steps_per_second(environment, n_environments, action_size, steps):
+    """Returns the environment steps per second summed over all environments."""
+    environment.initialize(seed=0)
+    environment.start()
+    actions = np.random.RandomState(0).uniform(-1, 1, (steps, n_environments, action_size))
+    start = time.perf_counter()
+    for action in actions:
+        environment.step(action)
+    return steps * n_environments / (time.perf_counter() - start)
+
+
+def benchmark_batched(environment_counts=(1, 4, 8, 16), n_links=6, steps=200, processes=True):
+    """Compares swimmer environment throughput of sequential, thread-pool and process stepping.
+
+    Process stepping is timed for `SharedMemorySwimEnvironment` and, if tonic is installed, for
+    `tonic.environments.distribute`, both with M worker processes.
+
+    Parameters:
+    - environment_counts (tuple of int): Numbers M of environments.
+    - n_links (int): Number of swimmer links.
+    - steps (int): Number of timed steps of all M environments.
+    - processes (bool): Also time the process workers.
+
+    Returns:
+    - list of dict: One row per M with steps per second for each method (None if not run).
+    """
+    builder = lambda: DeepControlSwimmer.swim(n_links=n_links)
+    try:
+        import tonic
+    except ImportError:
+        tonic = None
+
+    results = []
+    for n_environments in environment_counts:
+        row = dict(n_environments=n_environments)
+        for name, n_threads in [('sequential', 1), ('threads', n_environments)]:
+            environment = BatchedSwimEnvironment(builder, n_environments, n_threads)
+            row[name] = steps_per_second(environment, n_environments, n_links - 1, steps)
+            environment.close()
+        row['shared_memory'] = row['processes'] = None
+        if processes and n_environments > 1:
+            environment = SharedMemorySwimEnvironment(builder, n_environments)
+            row['shared_memory'] = steps_per_second(environment, n_environments, n_links - 1, steps)
+            environment.close()
+        if processes and tonic is not None and n_environments > 1:
+            # The `swim` task registered by DeepControlSwimmer, with the same number of links as `builder`.
+            environment = tonic.environments.distribute(
+                lambda: tonic.environments.ControlSuite(
+                    'swimmer-swim', task_kwargs=dict(n_links=n_links), time_feature=True),
+                n_environments, 1)
+            row['processes'] = steps_per_second(environment, n_environments, n_links - 1, steps)
+        results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark batched swimmer environment stepping.')
+    parser.add_argument('--environments', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--links', type=int, default=6)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--no-processes', action='store_true', help='skip the process workers')
+    args = parser.parse_args()
+
+    print(f'{"M":>4} {"sequential":>11} {"threads":>9} {"shared memory":>14} {"tonic processes":>16}  (steps/s)')
+    for row in benchmark_batched(args.environments, args.links, args.steps, not args.no_processes):
+        shared_memory, processes = ('-' if row[key] is None else f'{row[key]:.0f}'
+                                    for key in ['shared_memory', 'processes'])
+        print(f'{row["n_environments"]:>4} {row["sequential"]:>11.0f} {row["threads"]:>9.0f} '
+              f'{shared_memory:>14} {processes:>16}')
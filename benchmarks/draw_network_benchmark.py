@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils.plot import draw_network, network_layout
+
+
+def benchmark_draw_network(joint_counts=(5, 15, 50), max_networkx_joints=15, max_edges=5000, max_edge_labels=100,
+                           repeats=3):
+    """Times drawing and rendering the NCAP and MLP circuit diagrams with both backends of `draw_network`.
+
+    Parameters:
+    - joint_counts (tuple of int): Swimmer sizes to benchmark.
+    - max_networkx_joints (int): Largest size drawn with the networkx backend, which takes seconds beyond.
+    - max_edges (int): Edge decimation of the numpy backend, for the MLP rows.
+    - max_edge_labels (int): Edge label decimation of the numpy backend.
+    - repeats (int): Number of timed drawings per configuration.
+
+    Returns:
+    - list of dict: One row per mode and joint count with the edge count and times in milliseconds.
+    """
+    def draw(mode, n_joints, **kwargs):
+        fig = plt.figure(figsize=(8, 12))
+        draw_network(mode, n_joints, True, True, **kwargs)
+        fig.canvas.draw()
+        plt.close(fig)
+
+    results = []
+    for mode in ['NCAP', 'MLP']:
+        for n_joints in joint_counts:
+            draw(mode, n_joints)  # Warm up the font and layout caches.
+            row = dict(mode=mode, n_joints=n_joints, n_edges=len(network_layout(mode, n_joints, True, True).edges))
+            row['numpy_ms'] = timeit.timeit(
+                lambda: draw(mode, n_joints, max_edge_labels=max_edge_labels), number=repeats) / repeats * 1e3
+            row['decimated_ms'] = timeit.timeit(
+                lambda: draw(mode, n_joints, max_edges=max_edges, max_edge_labels=max_edge_labels),
+                number=repeats) / repeats * 1e3
+            row['networkx_ms'] = float('nan')
+            if n_joints <= max_networkx_joints:
+                row['networkx_ms'] = timeit.timeit(
+                    lambda: draw(mode, n_joints, backend='networkx'), number=1) * 1e3
+            results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark drawing swimmer circuit diagrams.')
+    parser.add_argument('--joints', type=int, nargs='+', default=[5, 15, 50])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"mode":>5} {"n_joints":>9} {"n_edges":>8} {"networkx (ms)":>14} {"numpy (ms)":>11} {"decimated (ms)":>15}')
+    for row in benchmark_draw_network(args.joints, repeats=args.repeats):
+        print(f'{row["mode"]:>5} {row["n_joints"]:>9} {row["n_edges"]:>8} {row["networkx_ms"]:>14.0f} '
+              f'{row["numpy_ms"]:>11.0f} {row["decimated_ms"]:>15.0f}')
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils import log_reader
+
+N_COLUMNS = 40  # About as many as a tonic log of an actor-critic agent.
+
+
+def _write_log(path, n_rows, header=True):
+    columns = ['test/episode_score/mean', 'test/episode_length/mean'] + [f'column_{i}' for i in range(N_COLUMNS - 2)]
+    pd.DataFrame(np.random.rand(n_rows, N_COLUMNS), columns=columns).to_csv(
+        os.path.join(path, 'log.csv'), mode='w' if header else 'a', index=False, header=header)
+
+
+def _load_curves(paths, read, max_points):
+    for path in paths:
+        log = read(path)
+        steps = np.cumsum(log['test/episode_length/mean'])
+        log_reader.downsample(steps, log['test/episode_score/mean'], max_points, log=True)
+
+
+def benchmark_refresh(n_runs=50, row_counts=(1000, 10000), new_rows=10, max_points=1000, repeats=3):
+    """Times loading the curves of `plot_performance` for many runs, as during training refreshes.
+
+    Parameters:
+    - n_runs (int): Number of experiment directories.
+    - row_counts (tuple of int): Logged epochs per run.
+    - new_rows (int): Epochs appended to every log between refreshes.
+    - max_points (int): Plotting resolution of the curves.
+    - repeats (int): Number of timed refreshes per configuration.
+
+    Returns:
+    - list of dict: One row per row count with the times in milliseconds of a full `pd.read_csv`,
+      of a first read from the sidecars in a new process and of a refresh after new epochs.
+    """
+    results = []
+    for n_rows in row_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, str(run)) for run in range(n_runs)]
+            for path in paths:
+                os.makedirs(path)
+                _write_log(path, n_rows)
+
+            def read_csv():
+                _load_curves(paths, lambda path: pd.read_csv(os.path.join(path, 'log.csv')), max_points)
+
+            def from_sidecar():
+                log_reader.clear_memory_cache()
+                _load_curves(paths, log_reader.read_log, max_points)
+
+            def refresh():
+                for path in paths:
+                    _write_log(path, new_rows, header=False)
+                start = timeit.default_timer()
+                _load_curves(paths, log_reader.read_log, max_points)
+                return timeit.default_timer() - start
+
+            from_sidecar()  # Write the sidecars.
+            row = dict(n_rows=n_rows)
+            row['read_csv_ms'] = timeit.timeit(read_csv, number=repeats) / repeats * 1e3
+            row['sidecar_ms'] = timeit.timeit(from_sidecar, number=repeats) / repeats * 1e3
+            row['refresh_ms'] = np.mean([refresh() for _ in range(repeats)]) * 1e3
+            results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark reading training logs for plot_performance.')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"n_rows":>8} {"read_csv (ms)":>14} {"sidecar (ms)":>13} {"refresh (ms)":>13}')
+    for row in benchmark_refresh(args.runs, args.rows, repeats=args.repeats):
+        print(f'{row["n_rows"]:>8} {row["read_csv_ms"]:>14.1f} {row["sidecar_ms"]:>13.1f} {row["refresh_ms"]:>13.1f}')
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+import Agents.swimmer as swimmer
+from Agents import model_cache
+
+
+def benchmark_startup(link_counts=(6, 12, 15), repeats=5):
+    """Times swimmer Physics construction without cache, from the on-disk cache and from memory.
+
+    Parameters:
+    - link_counts (tuple of int): Swimmer sizes to benchmark.
+    - repeats (int): Number of timed constructions per configuration.
+
+    Returns:
+    - list of dict: One row per link count with the construction times in milliseconds.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for n_links in link_counts:
+            def uncached():
+                swimmer._make_model.cache_clear()
+                model_string, assets = swimmer.get_model_and_assets(n_links)
+                swimmer.Physics.from_xml_string(model_string, assets=assets)
+
+            def from_disk():
+                # Fresh worker process: nothing memoized, the compiled model is on disk.
+                swimmer._make_model.cache_clear()
+                model_cache.clear_memory_cache()
+                swimmer.get_physics(n_links, cache_dir=cache_dir)
+
+            def from_memory():
+                swimmer.get_physics(n_links, cache_dir=cache_dir)
+
+            from_disk()  # Populate the caches.
+            row = dict(n_links=n_links)
+            for name, construct in [('uncached', uncached), ('disk', from_disk), ('memory', from_memory)]:
+                row[f'{name}_ms'] = timeit.timeit(construct, number=repeats) / repeats * 1e3
+            results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark swimmer environment startup.')
+    parser.add_argument('--links', type=int, nargs='+', default=[6, 12, 15])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"n_links":>8} {"uncached (ms)":>14} {"disk (ms)":>10} {"memory (ms)":>12}')
+    for row in benchmark_startup(args.links, args.repeats):
+        print(f'{row["n_links"]:>8} {row["uncached_ms"]:>14.1f} {row["disk_ms"]:>10.1f} {row["memory_ms"]:>12.1f}')
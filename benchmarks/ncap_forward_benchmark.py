@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import timeit
+
+import torch
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from Agents.NCAPSwimmer import SwimmerModule
+
+
+def time_forward(swimmer, inputs, repeats=200):
+    """Returns the mean wall-clock time of one forward + backward pass, in seconds."""
+    def step():
+        swimmer(**inputs).sum().backward()
+
+    step()  # Warm up.
+    return timeit.timeit(step, number=repeats) / repeats
+
+
+def benchmark_forward(joint_counts=(2, 5, 6, 12, 15, 30), batch_size=64, repeats=200, **swimmer_kwargs):
+    """Times the per-joint loop against the vectorized SwimmerModule forward pass.
+
+    Parameters:
+    - joint_counts (tuple of int): Swimmer sizes to benchmark.
+    - batch_size (int): Number of observations per forward pass, e.g. a PPO minibatch.
+    - repeats (int): Number of timed forward + backward passes per configuration.
+    - **swimmer_kwargs: Additional keyword arguments passed to SwimmerModule.
+
+    Returns:
+    - list of dict: One row per joint count with the loop and vectorized times in microseconds.
+    """
+    results = []
+    for n_joints in joint_counts:
+        inputs = dict(
+            joint_pos=torch.rand(batch_size, n_joints) * 2 - 1,
+            right_control=torch.rand(batch_size, 1),
+            left_control=torch.rand(batch_size, 1),
+            speed_control=torch.rand(batch_size, 1),
+            timesteps=torch.rand(batch_size, 1) * 1000,
+        )
+        times = {}
+        for vectorized in (False, True):
+            swimmer = SwimmerModule(n_joints, vectorized=vectorized, **swimmer_kwargs)
+            times[vectorized] = time_forward(swimmer, inputs, repeats)
+        results.append(dict(
+            n_joints=n_joints,
+            loop_us=times[False] * 1e6,
+            vectorized_us=times[True] * 1e6,
+            speedup=times[False] / times[True],
+        ))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the NCAP SwimmerModule forward pass.')
+    parser.add_argument('--joints', type=int, nargs='+', default=[2, 5, 6, 12, 15, 30])
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--no-weight-sharing', action='store_true')
+    parser.add_argument('--speed-control', action='store_true')
+    parser.add_argument('--turn-control', action='store_true')
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    results = benchmark_forward(
+        joint_counts=args.joints,
+        batch_size=args.batch_size,
+        repeats=args.repeats,
+        use_weight_sharing=not args.no_weight_sharing,
+        include_speed_control=args.speed_control,
+        include_turn_control=args.turn_control,
+    )
+    print(f'{"n_joints":>8} {"loop (us)":>12} {"vectorized (us)":>16} {"speedup":>8}')
+    for row in results:
+        print(f'{row["n_joints"]:>8} {row["loop_us"]:>12.1f} {row["vectorized_us"]:>16.1f} {row["speedup"]:>7.1f}x')
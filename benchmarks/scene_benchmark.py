@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import timeit
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+import Agents.swimmer as swimmer
+from tasks.forwards_tasks import Swim
+
+
+def benchmark_scenes(swimmer_counts=(1, 2, 4, 8, 16, 32, 64), n_links=6, layout='grid',
+                     per_agent_views=False, repeats=3, steps=200):
+    """Times MJCF generation, model compilation, physics steps and per-agent rewards of generated K-swimmer scenes.
+
+    Parameters:
+    - swimmer_counts (tuple of int): Numbers of swimmers K to benchmark.
+    - n_links (int): Number of links per swimmer.
+    - layout (str): Spawn layout, see `Agents.swimmer.spawn_positions`.
+    - per_agent_views (bool): Whether every swimmer carries its own light and cameras.
+    - repeats (int): Number of timed generations and compilations per K.
+    - steps (int): Number of timed physics steps and rewards per K.
+
+    Returns:
+    - list of dict: One row per K with times in milliseconds, the reward of all K swimmers in microseconds.
+    """
+    results = []
+    for n_swimmers in swimmer_counts:
+        scene = swimmer.SwimmerScene(n_swimmers, layout, lights=per_agent_views, cameras=per_agent_views)
+
+        def generate():
+            swimmer._make_model.cache_clear()
+            swimmer.get_model_and_assets(n_links, scene)
+
+        model_string, assets = swimmer.get_model_and_assets(n_links, scene)
+        physics = swimmer.Physics.from_xml_string(model_string, assets=assets)
+        task = Swim(per_agent=True, random=0)
+        task.initialize_episode(physics)
+        results.append(dict(
+            n_swimmers=n_swimmers,
+            generate_ms=timeit.timeit(generate, number=repeats) / repeats * 1e3,
+            compile_ms=timeit.timeit(lambda: swimmer.Physics.from_xml_string(model_string, assets=assets),
+                                     number=repeats) / repeats * 1e3,
+            step_ms=timeit.timeit(physics.step, number=steps) / steps * 1e3,
+            reward_us=timeit.timeit(lambda: task.get_reward(physics), number=steps) / steps * 1e6,
+        ))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark generated multi-swimmer scenes.')
+    parser.add_argument('--swimmers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--links', type=int, default=6)
+    parser.add_argument('--layout', default='grid', choices=['line', 'grid', 'circle'])
+    parser.add_argument('--per-agent-views', action='store_true',
+                        help='add a light and three cameras to every swimmer')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--steps', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{"K":>4} {"generate (ms)":>14} {"compile (ms)":>13} {"step (ms)":>10} {"reward (us)":>12}')
+    for row in benchmark_scenes(args.swimmers, args.links, args.layout, args.per_agent_views,
+                                args.repeats, args.steps):
+        print(f'{row["n_swimmers"]:>4} {row["generate_ms"]:>14.2f} {row["compile_ms"]:>13.1f} {row["step_ms"]:>10.3f} '
+              f'{row["reward_us"]:>12.1f}')
@@ -0,0 +1,357 @@
+"""
+Benchmark suite of the simulation, policy and rendering hot paths, with machine-readable results.
+
+Every case reports the latency of one call (mean, median, 90th percentile and minimum, in
+milliseconds) and the throughput of the items it processes per second, e.g. samples of a forward
+pass or environment steps. Runs on the CPU and offline: the render cases are skipped without an
+OpenGL backend, the PPO cases without tonic.
+
+Results are written as JSON and can be compared against a saved baseline, e.g.
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --compare baseline.json
+
+Cases are matched by their id and compared by median latency. The comparison exits with status 1
+if a case is slower than the baseline by more than `--threshold`.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+import Agents.swimmer as swimmer
+from Agents import DeepControlSwimmer
+from Agents.NCAPSwimmer import SwimmerModule
+
+SUITES = ('forward', 'model', 'step', 'task', 'render', 'ppo')
+
+# Flag combinations of the SwimmerModule forward cases.
+FORWARD_FLAGS = {
+    'default': {},
+    'no_weight_sharing': dict(use_weight_sharing=False),
+    'no_proprioception': dict(include_proprioception=False),
+    'no_head_oscillators': dict(include_head_oscillators=False),
+    'speed_turn_control': dict(include_speed_control=True, include_turn_control=True),
+}
+
+# Settings of each suite, the quick ones only check that every case runs.
+SETTINGS = dict(
+    forward=dict(joint_counts=(5, 11, 14), batch_sizes=(1, 64, 1024), flags=tuple(FORWARD_FLAGS), repeats=100),
+    model=dict(link_counts=(6, 12, 15), repeats=5),
+    step=dict(environments=('swim', 'swim_12_links'), steps=1000),
+    task=dict(environments=('swim', 'swim_12_links'), repeats=1000),
+    render=dict(resolutions=((240, 320), (480, 640), (720, 1280)), repeats=20),
+    ppo=dict(models=('ncap', 'mlp'), n_links=6, steps=1024, repeats=2),
+)
+QUICK_SETTINGS = dict(
+    forward=dict(joint_counts=(5,), batch_sizes=(1, 64), flags=('default', 'speed_turn_control'), repeats=5),
+    model=dict(link_counts=(6,), repeats=1),
+    step=dict(environments=('swim',), steps=20),
+    task=dict(environments=('swim',), repeats=20),
+    render=dict(resolutions=((240, 320),), repeats=2),
+    ppo=dict(models=('ncap', 'mlp'), n_links=6, steps=64, repeats=1),
+)
+
+
+def measure(function, repeats, items=1, warmup=1):
+    """
+    Times `repeats` calls of `function` one by one, after `warmup` untimed calls.
+
+    Parameters:
+    - function (callable): The timed call, without arguments.
+    - repeats (int): Number of timed calls.
+    - items (int): Number of items processed by one call, e.g. the batch size.
+    - warmup (int): Number of untimed calls, e.g. to fill caches.
+
+    Returns:
+    - dict: The 'mean_ms', 'median_ms', 'p90_ms' and 'min_ms' latencies of a call and the
+      'throughput' in items per second.
+    """
+    for _ in range(warmup):
+        function()
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times[i] = time.perf_counter() - start
+    return dict(
+        mean_ms=times.mean() * 1e3,
+        median_ms=np.median(times) * 1e3,
+        p90_ms=np.quantile(times, .9) * 1e3,
+        min_ms=times.min() * 1e3,
+        throughput=items / times.mean(),
+    )
+
+
+def _case(suite, unit, params, timing):
+    """Returns the result row of a case, identified by its suite and parameters."""
+    name = ','.join('{}={}'.format(key, value) for key, value in params.items())
+    return dict(id='{}/{}'.format(suite, name), suite=suite, params=params, unit=unit, **timing)
+
+
+def _skipped(suite, reason):
+    return dict(id='{}/skipped'.format(suite), suite=suite, skipped=reason)
+
+
+def benchmark_forward(joint_counts, batch_sizes, flags, repeats):
+    """Times inference forward passes of SwimmerModule, throughput in samples per second."""
+    results = []
+    for n_joints in joint_counts:
+        for batch_size in batch_sizes:
+            inputs = dict(
+                joint_pos=torch.rand(batch_size, n_joints) * 2 - 1,
+                right_control=torch.rand(batch_size, 1),
+                left_control=torch.rand(batch_size, 1),
+                speed_control=torch.rand(batch_size, 1),
+                timesteps=torch.rand(batch_size, 1) * 1000,
+            )
+            for flag in flags:
+                module = SwimmerModule(n_joints, **FORWARD_FLAGS[flag])
+
+                def forward():
+                    with torch.no_grad():
+                        module(**inputs)
+
+                timing = measure(forward, repeats, items=batch_size)
+                results.append(_case('forward', 'samples/s',
+                                     dict(n_joints=n_joints, batch_size=batch_size, flags=flag), timing))
+    return results
+
+
+def benchmark_model(link_counts, repeats):
+    """Times MJCF generation by `_make_model` without its cache and `Physics.from_xml_string`."""
+    results = []
+    for n_links in link_counts:
+        def make_model():
+            swimmer._make_model.cache_clear()
+            swimmer.get_model_and_assets(n_links)
+
+        model_string, assets = swimmer.get_model_and_assets(n_links)
+        compile_physics = lambda: swimmer.Physics.from_xml_string(model_string, assets=assets)
+        for stage, function in [('make_model', make_model), ('from_xml_string', compile_physics)]:
+            results.append(_case('model', 'models/s', dict(n_links=n_links, stage=stage),
+                                 measure(function, repeats)))
+    return results
+
+
+def benchmark_step(environments, steps):
+    """Times control steps of the dm_control swimmer environments with random actions."""
+    results = []
+    for name in environments:
+        environment = getattr(DeepControlSwimmer, name)(random=0)
+        spec = environment.action_spec()
+        actions = iter(np.random.RandomState(0).uniform(spec.minimum, spec.maximum, (steps + 1,) + spec.shape))
+        environment.reset()
+
+        def step():
+            if environment.step(next(actions)).last():
+                environment.reset()
+
+        results.append(_case('step', 'steps/s', dict(environment=name), measure(step, steps)))
+    return results
+
+
+def benchmark_task(environments, repeats):
+    """Times the observation and reward of the Swim task, at the state of a running episode."""
+    results = []
+    for name in environments:
+        environment = getattr(DeepControlSwimmer, name)(random=0)
+        environment.reset()
+        spec = environment.action_spec()
+        for action in np.random.RandomState(0).uniform(spec.minimum, spec.maximum, (10,) + spec.shape):
+            environment.step(action)
+        task, physics = environment.task, environment.physics
+        for stage, function in [('observation', lambda: task.get_observation(physics)),
+                                ('reward', lambda: task.get_reward(physics))]:
+            results.append(_case('task', 'calls/s', dict(environment=name, stage=stage),
+                                 measure(function, repeats)))
+    return results
+
+
+def benchmark_render(resolutions, repeats):
+    """Times offscreen renders of the first camera of the swimmer, skipped without OpenGL."""
+    environment = DeepControlSwimmer.swim(random=0)
+    environment.reset()
+    physics = environment.physics
+    # The offscreen framebuffer, created at the first render, must be as large as the frames.
+    visual = physics.model.vis.global_
+    visual.offheight = max(visual.offheight, *(height for height, _ in resolutions))
+    visual.offwidth = max(visual.offwidth, *(width for _, width in resolutions))
+    try:
+        physics.render(*resolutions[0], camera_id=0)
+    except Exception as error:  # pylint: disable=broad-except
+        return [_skipped('render', 'no OpenGL backend ({}: {})'.format(type(error).__name__, error))]
+    results = []
+    for height, width in resolutions:
+        timing = measure(lambda: physics.render(height, width, camera_id=0), repeats)
+        results.append(_case('render', 'frames/s', dict(height=height, width=width), timing))
+    return results
+
+
+def benchmark_ppo(models, n_links, steps, repeats):
+    """
+    Times PPO iterations of tonic, `steps` environment steps followed by an update, skipped without tonic.
+
+    The environment is stepped like `tonic.Trainer` does, so an iteration includes the policy steps,
+    the environment steps and the update of the actor and critic on the collected segment.
+    """
+    try:
+        from tonic import replays
+        from tonic.torch import agents
+        from wrappers.ActorCriticMLP import ppo_mlp_model
+        from wrappers.ActorNCAP import ppo_swimmer_model
+    except ImportError as error:
+        return [_skipped('ppo', 'tonic is not installed ({})'.format(error))]
+    from tasks.batched_environment import BatchedSwimEnvironment
+
+    builders = dict(ncap=lambda: ppo_swimmer_model(n_joints=n_links - 1), mlp=ppo_mlp_model)
+    results = []
+    for name in models:
+        environment = BatchedSwimEnvironment(lambda: DeepControlSwimmer.swim(n_links=n_links), 1)
+        environment.initialize(seed=0)
+        agent = agents.PPO(model=builders[name](), replay=replays.Segment(size=steps))
+        agent.initialize(environment.observation_space, environment.action_space, seed=0)
+        state = dict(observations=environment.start(), steps=0)
+
+        def iteration():
+            for _ in range(steps):
+                actions = agent.step(state['observations'], state['steps'])
+                state['observations'], infos = environment.step(actions)
+                state['steps'] += 1
+                agent.update(**infos, steps=state['steps'])
+
+        timing = measure(iteration, repeats, items=steps)
+        environment.close()
+        results.append(_case('ppo', 'steps/s', dict(model=name, n_links=n_links, segment=steps), timing))
+    return results
+
+
+BENCHMARKS = dict(forward=benchmark_forward, model=benchmark_model, step=benchmark_step,
+                  task=benchmark_task, render=benchmark_render, ppo=benchmark_ppo)
+
+
+def _metadata():
+    versions = {}
+    for module in ['numpy', 'torch', 'mujoco', 'dm_control', 'tonic']:
+        try:
+            versions[module] = getattr(__import__(module), '__version__', 'unknown')
+        except ImportError:
+            versions[module] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=parent_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        time=datetime.datetime.now().isoformat(timespec='seconds'),
+        commit=commit,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpu_count=os.cpu_count(),
+        torch_threads=torch.get_num_threads(),
+        mujoco_gl=os.environ.get('MUJOCO_GL'),
+        versions=versions,
+    )
+
+
+def run_suite(suites=SUITES, quick=False):
+    """
+    Runs the benchmarks of the given suites.
+
+    Parameters:
+    - suites (iterable of str): Names of the suites, see `SUITES`.
+    - quick (bool): Whether to run each suite with few, small cases, e.g. to check that it runs.
+
+    Returns:
+    - dict: The 'metadata' of the run and the 'results', one dict per case with its 'id', 'suite',
+      'params', 'unit' and timing, or its 'skipped' reason.
+    """
+    settings = QUICK_SETTINGS if quick else SETTINGS
+    results = []
+    for suite in suites:
+        results.extend(BENCHMARKS[suite](**settings[suite]))
+    return dict(metadata=_metadata(), results=results)
+
+
+def compare_results(results, baseline, threshold=.1):
+    """
+    Compares the median latencies of the cases of two runs of the suite.
+
+    Parameters:
+    - results, baseline (dict): Runs returned by `run_suite`, or loaded from their JSON.
+    - threshold (float): Relative change of the median latency above which a case is a regression
+      (slower) or an improvement (faster).
+
+    Returns:
+    - list of dict: One row per case with its 'id', the 'baseline_ms' and 'current_ms' median latencies,
+      their 'ratio' and its 'status': 'regression', 'improvement', 'unchanged', 'new' or 'missing'.
+    """
+    timed = lambda run: {case['id']: case['median_ms'] for case in run['results'] if 'median_ms' in case}
+    current, previous = timed(results), timed(baseline)
+    rows = []
+    for case_id in list(current) + [case_id for case_id in previous if case_id not in current]:
+        baseline_ms, current_ms = previous.get(case_id), current.get(case_id)
+        if baseline_ms is None or current_ms is None:
+            ratio, status = None, 'new' if baseline_ms is None else 'missing'
+        else:
+            ratio = current_ms / baseline_ms
+            status = ('regression' if ratio > 1 + threshold else
+                      'improvement' if ratio < 1 / (1 + threshold) else 'unchanged')
+        rows.append(dict(id=case_id, baseline_ms=baseline_ms, current_ms=current_ms, ratio=ratio, status=status))
+    return rows
+
+
+def _format_ms(value):
+    return '{:>12}'.format('-') if value is None else '{:>12.3f}'.format(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the simulation, policy and rendering hot paths.')
+    parser.add_argument('--suites', nargs='+', default=list(SUITES), choices=SUITES)
+    parser.add_argument('--quick', action='store_true', help='run few, small cases')
+    parser.add_argument('--output', help="JSON file of the results, '-' to print the JSON instead of a table")
+    parser.add_argument('--compare', help='JSON file of a baseline run to compare against')
+    parser.add_argument('--threshold', type=float, default=.1,
+                        help='relative change of the median latency reported as a regression or improvement')
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    results = run_suite(args.suites, args.quick)
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+        print(f'{"case":<60} {"median (ms)":>12} {"p90 (ms)":>12} {"throughput":>14}')
+        for case in results['results']:
+            if 'skipped' in case:
+                print(f'{case["id"]:<60} skipped: {case["skipped"]}')
+            else:
+                print(f'{case["id"]:<60} {case["median_ms"]:>12.3f} {case["p90_ms"]:>12.3f} '
+                      f'{case["throughput"]:>10.1f} {case["unit"]}')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            rows = compare_results(results, json.load(baseline_file), args.threshold)
+        report = sys.stderr if args.output == '-' else sys.stdout  # Keeps printed JSON parsable.
+        print(f'\n{"case":<60} {"baseline (ms)":>12} {"current (ms)":>12} {"ratio":>7} status', file=report)
+        for row in rows:
+            ratio = '{:>6.2f}x'.format(row['ratio']) if row['ratio'] is not None else '{:>7}'.format('-')
+            print(f'{row["id"]:<60} {_format_ms(row["baseline_ms"])} {_format_ms(row["current_ms"])} '
+                  f'{ratio} {row["status"]}', file=report)
+        if any(row['status'] == 'regression' for row in rows):
+            sys.exit(1)
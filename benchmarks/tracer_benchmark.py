@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from Agents import DeepControlSwimmer
+from cust_utils.tracer import Tracer
+
+
+def benchmark_tracer(link_counts=(6, 12), steps=2000, every=100):
+    """Times swimmer environment steps without a tracer and instrumented in each tracer mode.
+
+    Parameters:
+    - link_counts (tuple of int): Swimmer sizes to benchmark.
+    - steps (int): Number of timed environment steps per configuration.
+    - every (int): Sampling interval of the 'sample' mode.
+
+    Returns:
+    - list of dict: One row per link count with the time of a step in microseconds per mode, and the
+      span summary of the 'full' mode.
+    """
+    results = []
+    for n_links in link_counts:
+        row = dict(n_links=n_links)
+        for mode in ['none', 'off', 'sample', 'full']:
+            environment = DeepControlSwimmer.swim(n_links=n_links, random=0)
+            tracer = Tracer('off' if mode == 'none' else mode, every=every)
+            if mode != 'none':
+                tracer.instrument_environment(environment)
+            actions = np.random.RandomState(0).uniform(-1, 1, (steps, n_links - 1))
+            environment.reset()
+            start = time.perf_counter()
+            for action in actions:
+                if environment.step(action).last():
+                    environment.reset()
+            row[f'{mode}_us'] = (time.perf_counter() - start) / steps * 1e6
+            tracer.remove()
+            if mode == 'full':
+                row['spans'] = tracer.summary()
+        results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the overhead of the control loop tracer.')
+    parser.add_argument('--links', type=int, nargs='+', default=[6, 12])
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--every', type=int, default=100)
+    args = parser.parse_args()
+
+    results = benchmark_tracer(args.links, args.steps, args.every)
+    print(f'{"n_links":>8} {"none (us)":>10} {"off (us)":>10} {"sample (us)":>12} {"full (us)":>10}')
+    for row in results:
+        print(f'{row["n_links"]:>8} {row["none_us"]:>10.1f} {row["off_us"]:>10.1f} {row["sample_us"]:>12.1f} '
+              f'{row["full_us"]:>10.1f}')
+    for row in results:
+        print(f'\nSpans of the {row["n_links"]}-link swimmer (full mode):')
+        print(f'{"span":<20} {"count":>7} {"mean (us)":>10} {"p90 (us)":>10} {"total (ms)":>11}')
+        for span in row['spans']:
+            print(f'{span["name"]:<20} {span["count"]:>7} {span["mean_ms"] * 1e3:>10.1f} '
+                  f'{span["p90_ms"] * 1e3:>10.1f} {span["total_ms"]:>11.1f}')
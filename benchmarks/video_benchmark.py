@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from Agents import DeepControlSwimmer
+from cust_utils.video_utils import VideoWriter, write_video
+
+
+def record_episode(frames, steps, n_links, width, height):
+    """Steps a swimmer with random actions and appends `steps + 1` rendered frames to `frames`."""
+    environment = DeepControlSwimmer.swim(n_links=n_links)
+    environment.reset()
+    random = np.random.RandomState(0)
+    frames.append(environment.physics.render(camera_id=0, width=width, height=height))
+    for _ in range(steps):
+        environment.step(random.uniform(-1, 1, n_links - 1))
+        frames.append(environment.physics.render(camera_id=0, width=width, height=height))
+
+
+def benchmark_video(steps=300, n_links=6, width=640, height=480, queue_size=32):
+    """Compares recording an episode to a list then encoding it against streaming it to the encoder.
+
+    Parameters:
+    - steps (int): Number of environment steps of the episode.
+    - n_links (int): Number of swimmer links.
+    - width (int): Frame width in pixels.
+    - height (int): Frame height in pixels.
+    - queue_size (int): Queue size of the streaming writer.
+
+    Returns:
+    - list of dict: One row per mode with the wall-clock seconds and the peak traced memory in MB.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ['list', 'stream']:
+            filepath = os.path.join(directory, f'{mode}.mp4')
+            tracemalloc.start()
+            start = time.perf_counter()
+            if mode == 'list':
+                frames = []
+                record_episode(frames, steps, n_links, width, height)
+                write_video(filepath, frames)
+                del frames
+            else:
+                with VideoWriter(filepath, queue_size=queue_size) as writer:
+                    record_episode(writer, steps, n_links, width, height)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append(dict(mode=mode, seconds=seconds, peak_mb=peak / 2**20))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark in-memory against streamed episode videos. '
+                                                 'Set MUJOCO_GL=egl or osmesa on headless machines.')
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--links', type=int, default=6)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    print(f'{"mode":>6} {"seconds":>8} {"peak memory (MB)":>17}')
+    for row in benchmark_video(args.steps, args.links, args.width, args.height):
+        print(f'{row["mode"]:>6} {row["seconds"]:>8.2f} {row["peak_mb"]:>17.1f}')
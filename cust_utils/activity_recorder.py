@@ -0,0 +1,101 @@
+import numpy as np
+
+MODES = ('off', 'ring', 'sample', 'full')
+ACTIVITY_TYPES = ('exc', 'inh')
+
+
+class ActivityRecorder:
+    """
+    Records which NCAP connections were active at each timestep as integer-coded rows.
+
+    Each row is `(timestep, activity_type_code, neuron_code)`, where the codes index into
+    `ACTIVITY_TYPES` and the recorder's `names` table. Modes:
+
+    - 'off': nothing is recorded and `record` returns immediately.
+    - 'ring': keeps only the most recent `capacity` rows.
+    - 'sample': keeps every row of every `every`-th timestep.
+    - 'full': keeps every row; the buffer is preallocated with `capacity` rows and doubles when full.
+
+    Parameters:
+    - mode (str): One of `MODES`. Defaults to 'off'.
+    - capacity (int): Number of preallocated rows (the maximum number of rows in 'ring' mode).
+    - every (int): Sampling interval in timesteps, only used in 'sample' mode.
+    """
+
+    def __init__(self, mode='off', capacity=100000, every=100):
+        if mode not in MODES:
+            raise ValueError('Unknown recorder mode {!r}, expected one of {}.'.format(mode, MODES))
+        if capacity < 1 or every < 1:
+            raise ValueError('capacity and every must be positive. Received {} and {}'.format(capacity, every))
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.capacity = capacity
+        self.every = every if mode == 'sample' else 1
+        self.names = []
+        self._name_codes = {}
+        self._buffer = np.empty((capacity if self.enabled else 0, 3), dtype=np.int64)
+        self._size = 0
+        self._cursor = 0  # Next row to overwrite in 'ring' mode.
+
+    def register(self, entries):
+        """Adds `(activity_type, neuron)` entries to the name table and returns their codes, shape (n, 2)."""
+        codes = np.empty((len(entries), 2), dtype=np.int64)
+        for row, (activity_type, neuron) in enumerate(entries):
+            if neuron not in self._name_codes:
+                self._name_codes[neuron] = len(self.names)
+                self.names.append(neuron)
+            codes[row] = ACTIVITY_TYPES.index(activity_type), self._name_codes[neuron]
+        return codes
+
+    def record(self, timestep, codes):
+        """Records a block of registered connection codes, shape (n, 2), as active at `timestep`."""
+        if not self.enabled or timestep % self.every or not len(codes):
+            return
+        n = len(codes)
+        if self.mode == 'ring':
+            if n > self.capacity:
+                codes = codes[-self.capacity:]
+                n = self.capacity
+            rows = (self._cursor + np.arange(n)) % self.capacity
+            self._buffer[rows, 0] = timestep
+            self._buffer[rows, 1:] = codes
+            self._cursor = (self._cursor + n) % self.capacity
+            self._size = min(self._size + n, self.capacity)
+        else:
+            if self._size + n > len(self._buffer):
+                grown = np.empty((max(2 * len(self._buffer), self._size + n), 3), dtype=np.int64)
+                grown[:self._size] = self._buffer[:self._size]
+                self._buffer = grown
+            self._buffer[self._size:self._size + n, 0] = timestep
+            self._buffer[self._size:self._size + n, 1:] = codes
+            self._size += n
+
+    def clear(self):
+        self._size = 0
+        self._cursor = 0
+
+    def __len__(self):
+        return self._size
+
+    def as_array(self):
+        """Returns the recorded rows in chronological order, shape (n, 3)."""
+        if self.mode == 'ring' and self._size == self.capacity:
+            return np.concatenate([self._buffer[self._cursor:], self._buffer[:self._cursor]])
+        return self._buffer[:self._size].copy()
+
+    @property
+    def timesteps(self):
+        return self.as_array()[:, 0]
+
+    @property
+    def activity_types(self):
+        return self.as_array()[:, 1]
+
+    @property
+    def neurons(self):
+        return self.as_array()[:, 2]
+
+    def to_records(self):
+        """Returns the recorded rows as `(timestep, activity_type, neuron)` tuples of Python objects."""
+        return [(timestep, ACTIVITY_TYPES[activity_type], self.names[neuron])
+                for timestep, activity_type, neuron in self.as_array().tolist()]
@@ -0,0 +1,123 @@
+"""
+Aggregation of the test performance of many runs, e.g. the seeds of an NCAP and an MLP experiment.
+
+Runs are read one at a time and only kept as a downsampled curve, so memory does not grow with
+the length of the logs. Curves are then interpolated onto a common step axis, where the mean,
+quantiles and bootstrap confidence interval of the mean are computed for all steps at once.
+"""
+import collections
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils.log_reader import downsample, read_log
+
+# Statistics of a group of runs on the common step axis `steps`: the lower and upper bounds of the
+# confidence interval of the mean, the quantiles of the runs as {q: values} and the number of runs
+# covering each step. Steps covered by no run are NaN.
+Aggregate = collections.namedtuple('Aggregate', ['steps', 'mean', 'ci_lower', 'ci_upper', 'quantiles', 'n_runs'])
+
+
+def performance_curve(path, max_points=None, log=True, cache=True):
+    """
+    Returns the test scores of a run against the cumulative test episode lengths, as in `plot_performance`.
+
+    Rows without a test episode length, e.g. logged by `AsyncEvaluator.log` before a test finished,
+    are left out.
+
+    Parameters:
+    - path (str): Experiment directory containing 'log.csv'.
+    - max_points (int): If given, the curve is averaged down to at most `max_points` points.
+    - log (bool): Whether the curve is meant for a logarithmic step axis, see `log_reader.downsample`.
+    - cache (bool): Whether to keep the parsed log in memory, see `log_reader.read_log`.
+
+    Returns:
+    - tuple of np.ndarray: The steps and the scores.
+    """
+    columns = read_log(path, ['test/episode_score/mean', 'test/episode_length/mean'], cache=cache)
+    # Rows logged while a background test was pending have NaN lengths, they add no steps.
+    finished = ~np.isnan(columns['test/episode_length/mean'])
+    steps = np.cumsum(columns['test/episode_length/mean'][finished])
+    scores = columns['test/episode_score/mean'][finished]
+    if max_points is not None:
+        return downsample(steps, scores, max_points, log=log)
+    return steps, scores
+
+
+def bootstrap_mean_ci(values, confidence=.95, n_bootstrap=1000, seed=0):
+    """
+    Returns the bootstrap confidence interval of the mean of each column of `values`, ignoring NaNs.
+
+    Resamples of the runs are drawn as multinomial counts, so the means of all resamples at all steps
+    are two matrix products instead of a loop over resamples.
+
+    Parameters:
+    - values (np.ndarray): Shape (n_runs, n_steps), NaN where a run does not cover a step.
+    - confidence (float): Coverage of the interval.
+    - n_bootstrap (int): Number of resamples of the runs.
+    - seed (int): Seed of the resampling.
+
+    Returns:
+    - tuple of np.ndarray: The lower and upper bounds, shape (n_steps,).
+    """
+    valid = ~np.isnan(values)
+    counts = np.random.default_rng(seed).multinomial(
+        len(values), np.full(len(values), 1 / len(values)), size=n_bootstrap).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # NaN where a resample holds no run covering the step.
+        means = (counts @ np.where(valid, values, 0.)) / (counts @ valid)
+    alpha = (1 - confidence) / 2
+    bounds = np.full((2, values.shape[1]), np.nan)
+    covered = valid.any(axis=0)
+    bounds[:, covered] = np.nanquantile(means[:, covered], [alpha, 1 - alpha], axis=0)
+    return bounds[0], bounds[1]
+
+
+def aggregate_runs(paths, n_points=200, quantiles=(.25, .5, .75), confidence=.95, n_bootstrap=1000, seed=0,
+                   log_steps=True, cache=False):
+    """
+    Aligns the performance curves of several runs on a common step axis and computes their statistics.
+
+    Parameters:
+    - paths (iterable of str): Experiment directories of the runs, e.g. one per seed. Read one at a time.
+    - n_points (int): Number of steps of the common axis.
+    - quantiles (tuple of float): Quantiles of the runs to compute at each step.
+    - confidence (float): Coverage of the bootstrap confidence interval of the mean.
+    - n_bootstrap (int): Number of bootstrap resamples.
+    - seed (int): Seed of the bootstrap.
+    - log_steps (bool): Whether the steps are spaced geometrically, for a logarithmic axis.
+    - cache (bool): Whether to keep the parsed logs in memory, e.g. to refresh a plot during training.
+
+    Returns:
+    - Aggregate: The statistics at each of the `n_points` steps.
+    """
+    # Runs are reduced to a few points per step of the axis as soon as they are read.
+    curves = []
+    for path in paths:
+        steps, scores = performance_curve(path, 4 * n_points, log=log_steps, cache=cache)
+        finite = np.isfinite(steps) & np.isfinite(scores)
+        curves.append((np.array(steps[finite]), np.array(scores[finite])))
+    curves = [curve for curve in curves if len(curve[0])]
+    if not curves:
+        raise ValueError('No run has a finished test episode.')
+
+    start, stop = min(steps[0] for steps, _ in curves), max(steps[-1] for steps, _ in curves)
+    grid = np.geomspace(start, stop, n_points) if log_steps else np.linspace(start, stop, n_points)
+    # Runs only cover the steps between their first and last evaluations.
+    values = np.array([np.interp(grid, steps, scores, left=np.nan, right=np.nan) for steps, scores in curves])
+
+    n_runs = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        mean = np.nansum(values, axis=0) / n_runs
+    ci_lower, ci_upper = bootstrap_mean_ci(values, confidence, n_bootstrap, seed)
+    covered = n_runs > 0
+    quantile_values = np.full((len(quantiles), n_points), np.nan)
+    if len(quantiles):
+        quantile_values[:, covered] = np.nanquantile(values[:, covered], quantiles, axis=0)
+    return Aggregate(grid, mean, ci_lower, ci_upper, dict(zip(quantiles, quantile_values)), n_runs)
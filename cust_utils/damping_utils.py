@@ -1,5 +1,22 @@
 import numpy as np
 
+
+def _is_scalar(x):
+    return np.ndim(x) == 0 and not hasattr(x, 'detach')
+
+
+def _where(condition, x, y):
+    """Elementwise select for NumPy arrays and torch tensors."""
+    if hasattr(condition, 'detach'):
+        import torch  # Only reached with torch inputs, so NumPy-only callers never import torch.
+        return torch.where(condition, x, y)
+    return np.where(condition, x, y)
+
+
+def _exp(x):
+    return x.exp() if hasattr(x, 'detach') else np.exp(x)
+
+
 def calculate_damping(a, proximity, thres=5):
     """calculate the damping coefficient
 
@@ -7,20 +24,22 @@ def calculate_damping(a, proximity, thres=5):
     ----------
     a : float
         the effect of proximity to visicosity
-    proximity : float
-            the distance between agents
-    thres : _type_
-        _description_
+    proximity : float, np.ndarray or torch.Tensor
+            the distance between agents, a scalar or one value per agent
+    thres : float
+        the threshold distance beyond which the coefficient is 1
 
     Returns
     -------
-    _type_
-        _description_
+    float, np.ndarray or torch.Tensor
+        the damping coefficient, elementwise for array proximities
     """
-    if proximity <= thres:
-        return a*proximity
-    else:
-        return 1
+    if _is_scalar(proximity):
+        if proximity <= thres:
+            return a*proximity
+        else:
+            return 1
+    return _where(proximity <= thres, a*proximity, 1.)
 
 def set_joint_damping(physics, damping_value):
     """setting damping to the DeepMind Swimmer
@@ -32,25 +51,46 @@ def set_joint_damping(physics, damping_value):
     damping_value : float
         damping coefficient
     """
-    for joint_id in range(len(physics.model.dof_damping)):
-        physics.model.dof_damping[joint_id] = damping_value
+    physics.model.dof_damping[:] = damping_value
+
+
+def set_swimmer_damping(physics, dof_indices, damping_values):
+    """set the damping of each swimmer's internal joints in one vectorized write
+
+    Parameters
+    ----------
+    physics : mujuco.physics
+        an object describing one or several swimmers
+    dof_indices : np.ndarray
+        DOF indices of shape (n_swimmers, n_joints), e.g. `physics.layout.joint_dofs`
+    damping_values : float or np.ndarray
+        damping coefficient, a scalar or one value per swimmer of shape (n_swimmers,)
+    """
+    damping_values = np.asarray(damping_values, dtype=physics.model.dof_damping.dtype)
+    if damping_values.ndim == 1:
+        damping_values = damping_values[:, None]
+    physics.model.dof_damping[dof_indices] = damping_values
 
 
 
 def NCAP_damping(delt, a=0.0001, proximity=1, thres=5):
-        """return a damping value 
+        """return a damping value
 
         Parameters
         ----------
         a : float
             the effect of proximity to visicosity
-        proximity : float
-            the distance between agents
+        proximity : float, np.ndarray or torch.Tensor
+            the distance between agents, a scalar or one value per agent
         thres: float
-            the threshold distance where there is no effect
+            the threshold distance where there is no effect, the damping is 0 beyond it
         delt: time to where damping occurs
         """
 
-        if proximity <= thres:
-            _lamda = calculate_damping(a, proximity, thres)
-            return np.exp(-_lamda*delt)
\ No newline at end of file
+        if _is_scalar(proximity):
+            if proximity <= thres:
+                _lamda = calculate_damping(a, proximity, thres)
+                return np.exp(-_lamda*delt)
+            return 0.
+        _lamda = calculate_damping(a, proximity, thres)
+        return _where(proximity <= thres, _exp(-_lamda*delt), 0.)
@@ -0,0 +1,578 @@
+import argparse
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from wrappers.FrozenActor import ActorMean, FrozenPolicy
+
+# Scores of one evaluated snapshot: `scores` and `lengths` hold one value per seed, in seed order.
+Evaluation = collections.namedtuple('Evaluation', ['step', 'seeds', 'scores', 'lengths', 'errors'])
+
+
+def run_test_episode(policy, environment, seed, step=None):
+    """
+    Runs one deterministic test episode, like the test phase of `tonic.Trainer`.
+
+    Parameters:
+    - policy: An object with `test_step(observations, steps)`, e.g. an agent or a `FrozenPolicy`.
+    - environment: A single environment with the interface of `tonic.environments.distribute`.
+    - seed (int): Seed of the environment for this episode.
+    - step (int): Training step passed to `policy.test_step`.
+
+    Returns:
+    - tuple: The episode score and length.
+    """
+    environment.initialize(seed)
+    observations = environment.start()
+    score, length = 0., 0
+    while True:
+        actions = policy.test_step(observations, step)
+        observations, infos = environment.step(actions)
+        score += infos['rewards'][0]
+        length += 1
+        if infos['resets'][0]:
+            return score, length
+
+
+def _evaluation_worker(actor, environment_builder, tasks, results):
+    """Evaluates actor snapshots from `tasks` until it receives None."""
+    torch.set_num_threads(1)  # Leave the cores to the learner.
+    policy = FrozenPolicy(ActorMean(actor).eval())
+    environment = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        step, seed, state = task
+        try:
+            actor.load_state_dict(state)
+            if environment is None:
+                environment = environment_builder()
+            score, length = run_test_episode(policy, environment, seed, step)
+            results.put((step, seed, score, length, None))
+        except Exception as error:  # pylint: disable=broad-except
+            results.put((step, seed, np.nan, 0, repr(error)))
+
+
+class AsyncEvaluator:
+    """
+    Evaluates snapshots of an actor in background processes while training continues.
+
+    `submit` copies the current actor weights and queues one test episode per seed; it returns
+    immediately. Worker processes, forked with their own copy of the actor and environment
+    builder, run the episodes with the deterministic policy. Finished evaluations are collected
+    with `poll` or written to the tonic logger with `log`, tagged with the training step of the
+    snapshot.
+
+    Parameters:
+    - actor (nn.Module): The actor being trained, e.g. `agent.model.actor`.
+    - environment_builder (callable): Returns a single test environment with the interface of
+      `tonic.environments.distribute`, e.g. `lambda: tonic.environments.distribute(lambda: eval(env))`.
+    - seeds (list of int): Seed of each test episode of an evaluation.
+    - n_workers (int): Number of worker processes.
+    """
+
+    def __init__(self, actor, environment_builder, seeds=(0,), n_workers=1):
+        self.actor = actor
+        self.seeds = list(seeds)
+        context = multiprocessing.get_context('fork')  # Builders may be lambdas, as in train().
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        worker_actor = copy.deepcopy(actor).cpu()
+        self._workers = [
+            context.Process(target=_evaluation_worker, daemon=True,
+                            args=(worker_actor, environment_builder, self._tasks, self._results))
+            for _ in range(n_workers)]
+        for worker in self._workers:
+            worker.start()
+        self._pending = {}  # step -> {seed: (score, length, error)}
+        self._completed = collections.deque()
+
+    def submit(self, step):
+        """Snapshots the actor weights and queues their evaluation at training step `step`."""
+        state = {key: value.detach().cpu().clone() for key, value in self.actor.state_dict().items()}
+        self._pending[step] = {}
+        for seed in self.seeds:
+            self._tasks.put((step, seed, state))
+
+    @property
+    def n_pending(self):
+        return len(self._pending)
+
+    def _collect(self, timeout=None):
+        """Moves finished episodes from the workers into `_pending`, blocking up to `timeout` for the first."""
+        try:
+            result = self._results.get(timeout=timeout) if timeout != 0 else self._results.get_nowait()
+            while True:
+                step, seed, score, length, error = result
+                self._pending[step][seed] = (score, length, error)
+                result = self._results.get_nowait()
+        except queue.Empty:
+            pass
+        for step in sorted(self._pending):
+            episodes = self._pending[step]
+            if len(episodes) < len(self.seeds):
+                break  # Keep evaluations in step order.
+            scores, lengths, errors = zip(*[episodes[seed] for seed in self.seeds])
+            self._completed.append(Evaluation(step, list(self.seeds), np.array(scores), np.array(lengths),
+                                              [error for error in errors if error]))
+            del self._pending[step]
+
+    def poll(self):
+        """Returns the evaluations finished since the last call, without waiting."""
+        self._collect(timeout=0)
+        completed = list(self._completed)
+        self._completed.clear()
+        return completed
+
+    def wait(self, timeout=None):
+        """Waits until every submitted evaluation has finished and returns those not yet returned."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if remaining == 0:
+                break
+            self._collect(timeout=remaining)
+        return self.poll()
+
+    def log(self, logger, max_evaluations=1):
+        """
+        Stores the oldest finished evaluations in the tonic logger, to be written by its next dump.
+
+        'test/episode_score' and 'test/episode_length' get one value per seed and 'test/steps' the
+        training step of the evaluated snapshot. When no evaluation has finished, NaN placeholders
+        are stored so that every row of the log has the same columns.
+
+        Parameters:
+        - logger: The tonic logger module, or any object with `store(key, value, stats=False)`.
+        - max_evaluations (int): Maximum number of evaluations to store; later ones wait for the next
+          call, so one evaluation per epoch keeps a constant delay.
+        """
+        self._collect(timeout=0)
+        if not self._completed:
+            logger.store('test/episode_score', np.nan, stats=True)
+            logger.store('test/episode_length', np.nan, stats=True)
+            logger.store('test/steps', np.nan)
+            return
+        for _ in range(min(max_evaluations, len(self._completed))):
+            evaluation = self._completed.popleft()
+            for score, length in zip(evaluation.scores, evaluation.lengths):
+                logger.store('test/episode_score', score, stats=True)
+                logger.store('test/episode_length', length, stats=True)
+            logger.store('test/steps', evaluation.step)
+
+    def finish(self, logger, timeout=None):
+        """Waits for the remaining evaluations and writes each one as its own row of the log."""
+        self._completed.extend(self.wait(timeout))
+        while self._completed:
+            self.log(logger)
+            logger.dump()
+
+    def close(self):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+
+
+# Columns of the tables of `evaluate_checkpoints`, one row per checkpoint and seed.
+EVALUATION_COLUMNS = ['experiment', 'step', 'seed', 'score', 'length', 'error', 'checkpoint_hash', 'environment']
+
+# State of a batch evaluation worker process, kept between checkpoints.
+_BATCH_WORKER = {}
+
+
+def list_checkpoints(path):
+    """
+    Returns the saved checkpoints of an experiment, sorted by step.
+
+    Parameters:
+    - path (str): Experiment directory, containing the `checkpoints` directory written by `tonic.Trainer`.
+
+    Returns:
+    - dict: Maps each step to the files of its checkpoint, e.g. `{100000: ['.../step_100000.pt']}`.
+    """
+    checkpoint_path = os.path.join(path, 'checkpoints')
+    checkpoints = collections.defaultdict(list)
+    if os.path.isdir(checkpoint_path):
+        for file in os.listdir(checkpoint_path):
+            name = file.split('.')[0]
+            if name[:5] == 'step_' and name[5:].isdigit():
+                checkpoints[int(name[5:])].append(os.path.join(checkpoint_path, file))
+    return {step: sorted(checkpoints[step]) for step in sorted(checkpoints)}
+
+
+def checkpoint_hash(files):
+    """Returns a hash of the content of the files of a checkpoint."""
+    digest = hashlib.sha1()
+    for file in files:
+        digest.update(os.path.basename(file).encode())
+        with open(file, 'rb') as checkpoint_file:
+            for chunk in iter(lambda: checkpoint_file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_checkpoint_agent(path, step, observation_space, action_space):
+    """Default policy loader of `evaluate_checkpoints`, restores the agent of an experiment at `step`."""
+    from cust_utils.video_utils import load_agent
+    return load_agent(path, str(step), observation_space, action_space)
+
+
+def build_test_environment(environment):
+    """Default environment builder of `evaluate_checkpoints`, see `video_utils.build_environment`."""
+    from cust_utils.video_utils import build_environment
+    return build_environment(environment)
+
+
+def _initialize_batch_worker(environment_builder, policy_loader):
+    torch.set_num_threads(1)
+    _BATCH_WORKER.update(environment_builder=environment_builder, policy_loader=policy_loader,
+                         environments={}, policy_key=None)
+
+
+def _evaluate_checkpoint(path, step, environment, seed):
+    """Runs one test episode of a checkpoint, reusing the environment and the last agent of this worker."""
+    try:
+        environments = _BATCH_WORKER['environments']
+        if environment not in environments:
+            environments[environment] = _BATCH_WORKER['environment_builder'](environment)
+        test_environment = environments[environment]
+        if _BATCH_WORKER['policy_key'] != (path, step, environment):
+            _BATCH_WORKER['policy'] = _BATCH_WORKER['policy_loader'](
+                path, step, test_environment.observation_space, test_environment.action_space)
+            _BATCH_WORKER['policy_key'] = (path, step, environment)
+        score, length = run_test_episode(_BATCH_WORKER['policy'], test_environment, seed, step)
+        return float(score), int(length), ''
+    except Exception as error:  # pylint: disable=broad-except
+        return np.nan, 0, repr(error)
+
+
+def _read_cache(cache_path):
+    """Returns the successful results of `cache_path` as {(checkpoint_hash, environment, seed): (score, length)}."""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    cached = pd.read_csv(cache_path, keep_default_na=False, na_values=[''],
+                         dtype={'checkpoint_hash': str, 'environment': str, 'error': str})
+    cached = cached[cached['error'].isna()]  # Failed episodes are retried.
+    return {(row.checkpoint_hash, row.environment, int(row.seed)): (row.score, int(row.length))
+            for row in cached.itertuples()}
+
+
+def _append_results(cache_path, rows):
+    if cache_path and rows:
+        pd.DataFrame(rows, columns=EVALUATION_COLUMNS).to_csv(
+            cache_path, mode='a', index=False, header=not os.path.exists(cache_path))
+
+
+def _evaluation_pool(n_workers, environment_builder, policy_loader):
+    context = multiprocessing.get_context('fork')  # Builders may be lambdas, as in train().
+    return concurrent.futures.ProcessPoolExecutor(
+        n_workers, mp_context=context, initializer=_initialize_batch_worker,
+        initargs=(environment_builder, policy_loader))
+
+
+def _submit_evaluations(pool, rows):
+    """Submits the episode of each row, returns {future: row}."""
+    # Rows are ordered by checkpoint, so workers mostly reuse the agent they loaded last.
+    return {pool.submit(_evaluate_checkpoint, row['experiment'], row['step'], row['environment'], row['seed']): row
+            for row in rows}
+
+
+def _finish_evaluation(future, row):
+    row['score'], row['length'], row['error'] = future.result()
+    return row
+
+
+def _read_environment(path):
+    from cust_utils.video_utils import load_config
+    return load_config(path).environment
+
+
+def evaluate_checkpoints(paths, checkpoints='all', seeds=(0,), environment=None, n_workers=None,
+                         cache_path='evaluations.csv', environment_builder=build_test_environment,
+                         policy_loader=load_checkpoint_agent):
+    """
+    Evaluates the saved checkpoints of one or several experiments over several seeds in worker processes.
+
+    Every (checkpoint, seed) pair runs one deterministic test episode, like the test phase of
+    `tonic.Trainer`. Workers build each environment once and reuse it for all their episodes.
+    Results are appended to the CSV file `cache_path`, keyed on the content hash of the checkpoint,
+    the environment and the seed, so that re-runs only evaluate new checkpoints, seeds or
+    environments, even if an experiment directory was moved or renamed.
+
+    Parameters:
+    - paths (str or list of str): Experiment directories, containing `config.yaml` and `checkpoints`.
+    - checkpoints: 'all', 'first', 'last' or a list of steps to evaluate in each experiment.
+    - seeds (list of int): Seed of each test episode.
+    - environment (str): Environment to evaluate in, defaults to the `environment` of each `config.yaml`.
+    - n_workers (int): Number of worker processes, defaults to the CPU count.
+    - cache_path (str): CSV file of previous results, read and appended to. None disables the cache.
+    - environment_builder (callable): Returns a single test environment with the interface of
+      `tonic.environments.distribute` from an environment string.
+    - policy_loader (callable): `policy_loader(path, step, observation_space, action_space)` returns an
+      object with `test_step(observations, steps)`, by default the restored tonic agent.
+
+    Returns:
+    - pd.DataFrame: One row per experiment, checkpoint and seed with the `EVALUATION_COLUMNS`, sorted by
+      experiment, step and seed. Failed episodes have a NaN score and their error message.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    cache = _read_cache(cache_path)
+
+    rows, tasks = [], []
+    for path in paths:
+        available = list_checkpoints(path)
+        if checkpoints in ('all', 'first', 'last'):
+            steps = list(available)
+            steps = {'all': steps, 'first': steps[:1], 'last': steps[-1:]}[checkpoints]
+        else:
+            steps = [step for step in checkpoints if step in available]
+        experiment_environment = environment or _read_environment(path)
+        for step in steps:
+            digest = checkpoint_hash(available[step])
+            for seed in seeds:
+                row = dict(experiment=path, step=step, seed=seed, checkpoint_hash=digest,
+                           environment=experiment_environment)
+                if (digest, experiment_environment, seed) in cache:
+                    row['score'], row['length'] = cache[digest, experiment_environment, seed]
+                    row['error'] = ''
+                else:
+                    tasks.append(row)
+                rows.append(row)
+
+    if tasks:
+        n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+        with _evaluation_pool(n_workers, environment_builder, policy_loader) as pool:
+            futures = _submit_evaluations(pool, tasks)
+            for future in concurrent.futures.as_completed(futures):
+                # Append as episodes finish, so an interrupted run keeps its results.
+                _append_results(cache_path, [_finish_evaluation(future, futures[future])])
+
+    table = pd.DataFrame(rows, columns=EVALUATION_COLUMNS)
+    return table.sort_values(['experiment', 'step', 'seed'], ignore_index=True)
+
+
+class CheckpointWatcher:
+    """
+    Evaluates the checkpoints of a running experiment as `tonic.Trainer` saves them.
+
+    Each `poll` scans the `checkpoints` directory of the experiment, skipping the listing when the
+    directory is unchanged, and compares it with the manifest of the previous scan. Checkpoints
+    whose files kept the same size and modification time between two scans are complete; they are
+    submitted to the worker pool of the watcher, kept until `close`, one deterministic test episode
+    per seed. The workers run the episodes like those of `evaluate_checkpoints`, which uses a pool
+    of its own. Finished episodes are appended to `results_path`, which doubles as the cache of
+    `evaluate_checkpoints`, so a restarted watcher only evaluates new checkpoints.
+
+    Use `run` in a script, or `start` and `stop` to watch from a background thread of the training
+    notebook. `start` forks the workers before starting the thread, since forking from a background
+    thread can deadlock the workers on locks held by other threads.
+
+    Parameters:
+    - path (str): Experiment directory of the running training.
+    - seeds (list of int): Seed of each test episode.
+    - environment (str): Environment to evaluate in, defaults to the `environment` of `config.yaml`.
+    - n_workers (int): Number of worker processes.
+    - results_path (str): CSV file of the results, defaults to 'evaluations.csv' in the experiment directory.
+    - poll_interval (float): Seconds between scans of `run`.
+    - environment_builder, policy_loader (callable): See `evaluate_checkpoints`.
+    """
+
+    def __init__(self, path, seeds=(0,), environment=None, n_workers=1, results_path=None, poll_interval=10.,
+                 environment_builder=build_test_environment, policy_loader=load_checkpoint_agent):
+        self.path = path
+        self.seeds = list(seeds)
+        self.environment = environment
+        self.n_workers = n_workers
+        self.results_path = results_path or os.path.join(path, 'evaluations.csv')
+        self.poll_interval = poll_interval
+        self._builders = (environment_builder, policy_loader)
+        self._cache = _read_cache(self.results_path)
+        self._manifest = {}  # file -> (size, modification time) at the previous scan
+        self._directory_time = None
+        self._evaluated = set()  # Steps already submitted or read from the cache.
+        self._pool = None
+        self._futures = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def n_pending(self):
+        return len(self._futures)
+
+    def _scan(self):
+        """Returns {step: files} of the new checkpoints whose files did not change since the previous scan."""
+        checkpoint_path = os.path.join(self.path, 'checkpoints')
+        try:
+            directory_time = os.stat(checkpoint_path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if directory_time == self._directory_time and not self._manifest:
+            return {}  # No new file, and nothing left to settle.
+        self._directory_time = directory_time
+
+        manifest, files = {}, collections.defaultdict(list)
+        with os.scandir(checkpoint_path) as entries:
+            for entry in entries:
+                name = entry.name.split('.')[0]
+                if name[:5] == 'step_' and name[5:].isdigit() and int(name[5:]) not in self._evaluated:
+                    stat = entry.stat()
+                    manifest[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    files[int(name[5:])].append(entry.path)
+        settled = {step: sorted(step_files) for step, step_files in files.items()
+                   if all(self._manifest.get(file) == manifest[file] for file in step_files)}
+        self._manifest = {file: state for file, state in manifest.items()
+                          if int(os.path.basename(file).split('.')[0][5:]) not in settled}
+        return settled
+
+    def _start_pool(self):
+        """Creates the worker pool, forking its workers from the calling thread."""
+        if self._pool is None:
+            self._pool = _evaluation_pool(self.n_workers, *self._builders)
+            self._pool.submit(int).result()  # The workers are forked at the first submission.
+
+    def poll(self):
+        """
+        Submits the newly saved checkpoints and collects finished episodes, without waiting.
+
+        Returns:
+        - list of dict: The result rows finished since the last call, with the `EVALUATION_COLUMNS`.
+        """
+        finished, tasks = [], []
+        for step, files in sorted(self._scan().items()):
+            self._evaluated.add(step)
+            environment = self.environment = self.environment or _read_environment(self.path)
+            digest = checkpoint_hash(files)
+            for seed in self.seeds:
+                row = dict(experiment=self.path, step=step, seed=seed, checkpoint_hash=digest,
+                           environment=environment)
+                if (digest, environment, seed) in self._cache:
+                    row['score'], row['length'] = self._cache[digest, environment, seed]
+                    row['error'] = ''
+                    finished.append(row)
+                else:
+                    tasks.append(row)
+        if tasks:
+            self._start_pool()
+            self._futures.update(_submit_evaluations(self._pool, tasks))
+
+        evaluated = [_finish_evaluation(future, self._futures.pop(future))
+                     for future in [future for future in self._futures if future.done()]]
+        _append_results(self.results_path, evaluated)
+        return sorted(finished + evaluated, key=lambda row: (row['step'], row['seed']))
+
+    def wait(self, timeout=None):
+        """Evaluates the checkpoints saved so far and returns the result rows finished since the last `poll`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        rows = self.poll()
+        # Checkpoints still being written settle at a later scan.
+        while self._futures or self._manifest:
+            interval = self.poll_interval if deadline is None else min(self.poll_interval, deadline - time.monotonic())
+            if interval <= 0:
+                break
+            if self._futures:
+                concurrent.futures.wait(list(self._futures), interval, concurrent.futures.FIRST_COMPLETED)
+            else:
+                time.sleep(min(interval, .1))
+            rows += self.poll()
+        return sorted(rows, key=lambda row: (row['step'], row['seed']))
+
+    def run(self, idle_timeout=None):
+        """
+        Polls every `poll_interval` seconds until `stop` is called, or until no checkpoint was saved and
+        no episode was pending for `idle_timeout` seconds, then waits for the pending episodes.
+        """
+        last_activity = time.monotonic()
+        while not self._stop.is_set():
+            if self.poll() or self._futures or self._manifest:
+                last_activity = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - last_activity > idle_timeout:
+                break
+            self._stop.wait(self.poll_interval)
+        self.wait()
+
+    def start(self, idle_timeout=None):
+        """Runs `run` on a background thread."""
+        self._start_pool()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(idle_timeout,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops `run` after evaluating the checkpoints saved so far."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def results(self):
+        """Returns the evaluations of this experiment in `results_path`, sorted by step and seed."""
+        if not os.path.exists(self.results_path):
+            return pd.DataFrame(columns=EVALUATION_COLUMNS)
+        table = pd.read_csv(self.results_path, keep_default_na=False, na_values=[''], dtype={'error': str})
+        table = table[table['experiment'] == self.path]
+        return table.sort_values(['step', 'seed'], ignore_index=True)
+
+    def close(self):
+        self.stop()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate the saved checkpoints of experiments.')
+    parser.add_argument('paths', nargs='+', help='Experiment directories.')
+    parser.add_argument('--checkpoints', nargs='+', default=['all'],
+                        help="'all', 'first', 'last' or the steps to evaluate.")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--environment', default=None, help='Overrides the environment of config.yaml.')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default='evaluations.csv')
+    parser.add_argument('--output', default=None, help='Optional CSV file of the results table.')
+    parser.add_argument('--watch', action='store_true',
+                        help="Evaluate checkpoints as training saves them, into each experiment's evaluations.csv.")
+    parser.add_argument('--poll-interval', type=float, default=10.)
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help='Seconds without new checkpoints after which watching stops.')
+    args = parser.parse_args()
+
+    if args.watch:
+        watchers = [CheckpointWatcher(path, args.seeds, args.environment, args.workers or 1,
+                                      poll_interval=args.poll_interval) for path in args.paths]
+        try:
+            for watcher in watchers:
+                watcher.start(args.idle_timeout)
+            for watcher in watchers:
+                watcher._thread.join()  # pylint: disable=protected-access
+        finally:
+            for watcher in watchers:
+                watcher.close()
+        sys.exit()
+
+    selected = args.checkpoints[0] if args.checkpoints[0] in ('all', 'first', 'last') else [
+        int(step) for step in args.checkpoints]
+    results = evaluate_checkpoints(args.paths, selected, args.seeds, args.environment, args.workers, args.cache)
+    if args.output:
+        results.to_csv(args.output, index=False)
+    summary = results.groupby(['experiment', 'step'])['score'].agg(['mean', 'std', 'count'])
+    print(summary.to_string())
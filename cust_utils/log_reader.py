@@ -0,0 +1,196 @@
+"""
+Incremental reader of the `log.csv` files written by the tonic logger.
+
+Parsed rows are kept in memory per process, column by column, together with the byte offset
+of `log.csv` they cover, so that a refresh only parses the rows appended since the last read.
+They are also appended to a binary sidecar next to the log ('log_cache.bin', float64 rows,
+described by 'log_cache.json'), so that a new process, e.g. a restarted notebook kernel, loads
+them without parsing the CSV again. A log that was rewritten, e.g. by a new run in the same
+directory, is detected from the bytes preceding the cached offset and parsed again.
+"""
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SIDECAR_DATA = 'log_cache.bin'
+SIDECAR_META = 'log_cache.json'
+_CHECK_SIZE = 64  # Bytes before the parsed offset compared to detect a rewritten log.
+_SHORT_TAIL = 256  # Rows below which parsing in Python beats the overhead of pd.read_csv.
+
+# Parsed logs of this process, keyed by the path of their log.csv.
+_LOGS = {}
+
+
+class _LogColumns:
+    """Growing column-major array of the rows of a log parsed so far."""
+
+    def __init__(self, names):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.values = np.empty((len(names), 0))
+        self.n_rows = 0
+        self.offset = 0  # Bytes of log.csv covered by the parsed rows, including the header.
+        self.check = b''  # The last bytes before `offset`.
+
+    def append(self, rows):
+        """Appends `rows`, shape (n, n_columns), doubling the capacity when needed."""
+        n_rows = self.n_rows + len(rows)
+        if n_rows > self.values.shape[1]:
+            values = np.empty((len(self.names), max(n_rows, 2 * self.values.shape[1])))
+            values[:, :self.n_rows] = self.values[:, :self.n_rows]
+            self.values = values
+        self.values[:, self.n_rows:n_rows] = rows.T
+        self.n_rows = n_rows
+
+    def column(self, name):
+        column = self.values[self.index[name], :self.n_rows]
+        column.flags.writeable = False  # Shared with the cache.
+        return column
+
+
+def clear_memory_cache():
+    """Forgets the logs parsed by this process, the sidecars are kept."""
+    _LOGS.clear()
+
+
+def _read_sidecar(directory):
+    try:
+        with open(os.path.join(directory, SIDECAR_META)) as meta_file:
+            meta = json.load(meta_file)
+        count = meta['n_rows'] * len(meta['names'])
+        rows = np.fromfile(os.path.join(directory, SIDECAR_DATA), np.float64, count)
+    except (OSError, ValueError, KeyError):
+        return None
+    if len(rows) != count:
+        return None
+    log = _LogColumns(meta['names'])
+    log.append(rows.reshape(meta['n_rows'], len(meta['names'])))
+    log.offset, log.check = meta['offset'], bytes.fromhex(meta['check'])
+    return log
+
+
+def _write_sidecar(directory, log, rows):
+    """Appends `rows`, the last rows of `log`, to the sidecar and then updates its description."""
+    data_path, meta_path = os.path.join(directory, SIDECAR_DATA), os.path.join(directory, SIDECAR_META)
+    first_row = log.n_rows - len(rows)
+    try:
+        with open(data_path, 'r+b' if first_row and os.path.exists(data_path) else 'wb') as data_file:
+            data_file.seek(first_row * len(log.names) * 8)
+            np.ascontiguousarray(rows, np.float64).tofile(data_file)
+            data_file.truncate()
+        meta = dict(names=log.names, n_rows=log.n_rows, offset=log.offset, check=log.check.hex())
+        tmp_path = '{}.{}.tmp'.format(meta_path, os.getpid())
+        with open(tmp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, meta_path)  # The description never refers to rows not yet written.
+    except OSError:
+        pass  # E.g. a read-only experiment directory, the rows stay cached in memory.
+
+
+def _parse_rows(tail, names):
+    """Parses complete CSV lines into an array of shape (n_lines, n_columns), empty fields are NaN."""
+    lines = tail.decode().splitlines()
+    if len(lines) > _SHORT_TAIL:
+        return pd.read_csv(io.StringIO(tail.decode()), header=None, names=names).to_numpy(np.float64)
+    return np.array([[float(field) if field else np.nan for field in line.split(',')] for line in lines],
+                    np.float64).reshape(len(lines), len(names))
+
+
+def _is_prefix(log_file, log, size):
+    """Returns whether the parsed part of `log` is still the beginning of the open log file."""
+    if log.offset > size:
+        return False
+    log_file.seek(log.offset - len(log.check))
+    return log_file.read(len(log.check)) == log.check
+
+
+def _load(log_path, sidecar, cache=True):
+    """Returns the `_LogColumns` of `log_path`, parsing only the rows written since the last call."""
+    log = _LOGS.get(log_path)
+    size = os.stat(log_path).st_size
+    if log is not None and log.offset == size:
+        return log  # Nothing new.
+    directory = os.path.dirname(log_path)
+    with open(log_path, 'rb') as log_file:
+        if log is None and sidecar:
+            log = _read_sidecar(directory)
+        if log is not None and not _is_prefix(log_file, log, size):
+            log = None
+        if log is None:
+            log_file.seek(0)
+            header = log_file.readline()
+            if not header.endswith(b'\n'):
+                raise ValueError('{} has no complete header yet.'.format(log_path))
+            log = _LogColumns(header.decode().strip().split(','))
+            log.offset, log.check = len(header), header[-_CHECK_SIZE:]
+        log_file.seek(log.offset)
+        tail = log_file.read(size - log.offset)
+
+    # Only complete lines, the logger may be writing the last one.
+    tail = tail[:tail.rfind(b'\n') + 1]
+    if tail:
+        rows = _parse_rows(tail, log.names)
+        log.append(rows)
+        log.offset += len(tail)
+        log.check = (log.check + tail)[-_CHECK_SIZE:]
+        if sidecar:
+            _write_sidecar(directory, log, rows)
+    if cache:
+        _LOGS[log_path] = log
+    return log
+
+
+def read_log(path, columns=None, sidecar=True, cache=True):
+    """
+    Returns the columns of a tonic log, parsing only the rows written since the previous read.
+
+    Parameters:
+    - path (str): Experiment directory containing 'log.csv', or the path of the log file.
+    - columns (list of str): Names of the columns to return, defaults to all columns.
+    - sidecar (bool): Whether to read and update the binary sidecar next to the log.
+    - cache (bool): Whether to keep the parsed columns in memory for the next read. Without it,
+      memory is only used until the returned arrays are released.
+
+    Returns:
+    - dict: Maps each column name to a read-only float64 array with one value per logged epoch.
+    """
+    log_path = os.path.join(path, 'log.csv') if os.path.isdir(path) else path
+    log = _load(os.path.abspath(log_path), sidecar, cache)
+    return {name: log.column(name) for name in (log.names if columns is None else columns)}
+
+
+def downsample(x, y, max_points, log=False):
+    """
+    Averages runs of consecutive points of a curve into at most `max_points` points.
+
+    NaN values of `y`, e.g. epochs without a finished test, are ignored in the averages.
+
+    Parameters:
+    - x, y (np.ndarray): Coordinates of the points of the curve.
+    - max_points (int): Maximum number of points returned, shorter curves are returned unchanged.
+    - log (bool): Whether the x axis is logarithmic. The runs then grow geometrically along the curve,
+      so that early points, spread out on a log axis, are kept.
+
+    Returns:
+    - tuple of np.ndarray: The x and y coordinates of the downsampled curve.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    if log:
+        starts = np.unique(np.floor(np.geomspace(1, n + 1, max_points + 1)).astype(int) - 1)
+        starts = starts[starts < n]
+    else:
+        starts = np.linspace(0, n, max_points, endpoint=False).astype(int)
+    valid = ~np.isnan(y)
+    n_valid = np.add.reduceat(valid.astype(np.int64), starts)
+    # Points are averaged over the same epochs in x and y, runs without a valid y keep their mean x.
+    x_means = np.add.reduceat(x, starts) / np.diff(np.append(starts, n))
+    with np.errstate(invalid='ignore'):
+        y_means = np.add.reduceat(np.where(valid, y, 0.), starts) / n_valid
+        x_means = np.where(n_valid > 0, np.add.reduceat(np.where(valid, x, 0.), starts) / n_valid, x_means)
+    return x_means, y_means
@@ -2,11 +2,24 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 import networkx as nx
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
+import collections
+import functools
 import os
+import sys
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.textpath import TextPath
 
-def plot_performance(paths, ax=None,title='Model Performance'):
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils.aggregation import aggregate_runs, performance_curve
+
+def plot_performance(paths, ax=None,title='Model Performance', max_points=1000):
     """
     Plots the performance of multiple models on the same axes using Seaborn for styling.
 
@@ -15,11 +28,14 @@ def plot_performance(paths, ax=None,title='Model Performance'):
     The plot uses a logarithmic scale for the x-axis to better display the progression
     over a wide range of steps. Each line's legend is set to the name of the last folder
     in the path, representing the model's name. Seaborn styles are applied for enhanced visualization.
+    Logs are read incrementally with `log_reader.read_log`, so refreshing the plot during training
+    only parses the new rows, and curves are averaged down to `max_points` points.
 
     Parameters:
     - paths (list of str): Paths to the experiment directories.
     - ax (matplotlib.axes.Axes, optional): A matplotlib axis object to plot on. If None,
       a new figure and axis are created.
+    - max_points (int): Maximum number of points drawn per curve.
     """
     # Set the Seaborn style
     sns.set(style="whitegrid")
@@ -33,10 +49,7 @@ def plot_performance(paths, ax=None,title='Model Performance'):
         model_name = os.path.basename(path.rstrip('/'))
 
         # Load data
-        df = pd.read_csv(os.path.join(path, 'log.csv'))
-        scores = df['test/episode_score/mean']
-        lengths = df['test/episode_length/mean']
-        steps = np.cumsum(lengths)
+        steps, scores = performance_curve(path, max_points)
         sns.lineplot(x=steps, y=scores, ax=ax, label=model_name, color=colors[index % len(colors)])
 
     ax.set_xscale('log')
@@ -46,7 +59,190 @@ def plot_performance(paths, ax=None,title='Model Performance'):
     ax.set_title(title)
 
 
-def draw_network(mode='NCAP', N=2, include_speed_control=False, include_turn_control=False):
+def plot_aggregated_performance(groups, ax=None, title='Model Performance', band='ci', **kwargs):
+    """
+    Plots the mean performance of groups of runs, e.g. the seeds of each model, with a shaded band.
+
+    Runs of a group are aligned on a common step axis by `aggregation.aggregate_runs`, which reads them
+    one at a time, so comparing many runs stays fast and memory-bounded.
+
+    Parameters:
+    - groups (dict): Maps each label to the experiment directories of its runs, e.g.
+      `{'NCAP': ncap_paths, 'MLP': mlp_paths}`, or to an `aggregation.Aggregate` computed beforehand.
+    - ax (matplotlib.axes.Axes, optional): A matplotlib axis object to plot on. If None,
+      a new figure and axis are created.
+    - band (str): 'ci' shades the bootstrap confidence interval of the mean, 'quantiles' the range
+      between the lowest and highest quantiles of the runs.
+    - **kwargs: Additional keyword arguments passed to `aggregation.aggregate_runs`.
+
+    Returns:
+    - dict: The `aggregation.Aggregate` of each group.
+    """
+    sns.set(style="whitegrid")
+    colors = sns.color_palette("colorblind")
+
+    if ax is None:
+        fig, ax = plt.subplots()
+
+    aggregates = {}
+    for index, (label, runs) in enumerate(groups.items()):
+        aggregate = runs if hasattr(runs, 'quantiles') else aggregate_runs(runs, **kwargs)
+        aggregates[label] = aggregate
+        color = colors[index % len(colors)]
+        if band == 'ci':
+            lower, upper = aggregate.ci_lower, aggregate.ci_upper
+        else:
+            lower, upper = aggregate.quantiles[min(aggregate.quantiles)], aggregate.quantiles[max(aggregate.quantiles)]
+        ax.plot(aggregate.steps, aggregate.mean, label=f'{label} (n={aggregate.n_runs.max()})', color=color)
+        ax.fill_between(aggregate.steps, lower, upper, color=color, alpha=.2, linewidth=0)
+
+    ax.set_xscale('log')
+    ax.set_xlabel('Cumulative Time Steps')
+    ax.set_ylabel('Mean Episode Score')
+    ax.legend()
+    ax.set_title(title)
+    return aggregates
+
+
+# Arrays describing the drawing of a swimmer network: node names (LaTeX, as in the networkx graph, and
+# plain Unicode, much faster to draw), node (x, y) positions, edges as (source, target) node indices,
+# and the color and label of each edge ('' for no label).
+NetworkLayout = collections.namedtuple(
+    'NetworkLayout', ['names', 'plain_names', 'positions', 'edges', 'edge_colors', 'edge_labels'])
+
+# Nodes of each joint i as (name, plain name, x, y offset from 4 * (N - i)), in the order of `draw_network`.
+_JOINT_NODES = [('$q_{i}$', 'q{i}', 1, 1), ('$q^d_{i}$', 'q\u1d48{i}', 1.5, 2), ('$q^v_{i}$', 'q\u1d5b{i}', 1.5, 0),
+                ('$b^d_{i}$', 'b\u1d48{i}', 2, 2), ('$b^v_{i}$', 'b\u1d5b{i}', 2, 0),
+                ('$m^d_{i}$', 'm\u1d48{i}', 2.5, 2), ('$m^v_{i}$', 'm\u1d5b{i}', 2.5, 0),
+                ('$\\overset{..}{q}$$_{i}$', 'q\u0308{i}', 3, 1)]
+_SUBSCRIPTS = str.maketrans('0123456789', '\u2080\u2081\u2082\u2083\u2084\u2085\u2086\u2087\u2088\u2089')
+# NCAP edges of each joint as (source node, target node, target joint offset, color, label), indexing
+# `_JOINT_NODES`. The proprioceptive edges, the first four, only exist for joints before the last one.
+_JOINT_EDGES = [(0, 1, 0, 'green', '+1'), (0, 2, 0, 'orange', '-1'), (1, 3, 1, 'green', 'p'), (2, 4, 1, 'green', 'p'),
+                (3, 5, 0, 'green', 'i'), (3, 6, 0, 'orange', 'c'), (4, 6, 0, 'green', 'i'), (4, 5, 0, 'orange', 'c'),
+                (6, 7, 0, 'orange', '-1'), (5, 7, 0, 'green', '+1')]
+_N_PROPRIOCEPTIVE_EDGES = 4
+
+
+@functools.lru_cache(maxsize=None)
+def network_layout(mode='NCAP', N=2, include_speed_control=False, include_turn_control=False):
+    """
+    Returns the node positions and edges of the network drawn by `draw_network`, as NumPy arrays.
+
+    Layouts are cached per `(mode, N, include_speed_control, include_turn_control)`; their arrays
+    are read-only.
+
+    Parameters:
+    - mode (str): Determines the architecture type ('NCAP' or 'MLP').
+    - N (int): Number of joints in the swimmer model.
+    - include_speed_control (bool): If True, includes nodes for speed control in the graph.
+    - include_turn_control (bool): If True, includes nodes for turn control in the graph.
+
+    Returns:
+    - NetworkLayout: The arrays of the network.
+    """
+    n = 2 + N * 4
+    head = []
+    if include_speed_control:
+      head.append(('1-s', '1-s', 1.5, n + 7))
+    if include_turn_control:
+      head += [('r', 'r', 1.5, n + 5), ('l', 'l', 1.5, n + 3)]
+    head += [('o', 'o', 1, n - 1), ('$o^d$', 'o\u1d48', 1.5, n), ('$o^v$', 'o\u1d5b', 1.5, n - 2)]
+    index = {name: k for k, (name, _, _, _) in enumerate(head)}
+
+    # Joint j = i - 1 has the nodes first + 8 * j + kind.
+    first = len(head)
+    joints = np.arange(N)
+    names = [name for name, _, _, _ in head] + [
+      name.replace('{i}', str(j + 1)) for j in joints for name, _, _, _ in _JOINT_NODES]
+    plain_names = [plain for _, plain, _, _ in head] + [
+      plain.replace('{i}', str(j + 1).translate(_SUBSCRIPTS)) for j in joints for _, plain, _, _ in _JOINT_NODES]
+    joint_x = np.array([x for _, _, x, _ in _JOINT_NODES])
+    joint_y = np.array([y for _, _, _, y in _JOINT_NODES])
+    positions = np.concatenate([
+      np.array([(x, y) for _, _, x, y in head], float).reshape(-1, 2),
+      np.stack([np.broadcast_to(joint_x, (N, len(_JOINT_NODES))),
+                4 * (N - 1 - joints)[:, None] + joint_y], axis=-1).reshape(-1, 2)])
+
+    if mode == 'NCAP':
+      edges = [(index['o'], index['$o^d$']), (index['o'], index['$o^v$']),
+               (index['$o^d$'], first + 3), (index['$o^v$'], first + 4)]
+      colors, labels = ['green', 'orange', 'green', 'green'], ['+1', '-1', 'o', 'o']
+      if include_speed_control:
+        edges.append((index['1-s'], first + 3))
+        colors.append('orange')
+        labels.append('s, to all b')
+      if include_turn_control:
+        edges += [(index['r'], first + 3), (index['l'], first + 4)]
+        colors += ['green', 'green']
+        labels += ['t', 't']
+      edges = [np.array(edges, int).reshape(-1, 2)]
+      for k, (source, target, offset, color, label) in enumerate(_JOINT_EDGES):
+        sources = joints[:N - 1] if k < _N_PROPRIOCEPTIVE_EDGES else joints
+        edges.append(np.stack([first + 8 * sources + source, first + 8 * (sources + offset) + target], axis=-1))
+        colors += [color] * len(sources)
+        labels += [label] * len(sources)
+      edges = np.concatenate(edges)
+
+    elif mode == 'MLP':
+      # Every node of a column is connected to every node of the next column.
+      columns = [np.flatnonzero(positions[:, 0] == x) for x in [1, 1.5, 2, 2.5, 3]]
+      edges = np.concatenate([np.stack(np.meshgrid(sources, targets, indexing='ij'), axis=-1).reshape(-1, 2)
+                              for sources, targets in zip(columns[:-1], columns[1:])])
+      colors, labels = ['gray'] * len(edges), [''] * len(edges)
+
+    layout = NetworkLayout(tuple(names), tuple(plain_names), positions, edges, np.array(colors), np.array(labels))
+    for array in layout[2:]:
+      array.flags.writeable = False
+    return layout
+
+
+@functools.lru_cache(maxsize=16)
+def _label_paths(labels, size):
+    """Returns the outlines of `labels`, centered on the origin and in points of font size `size`."""
+    paths = []
+    for label in labels:
+      path = TextPath((0, 0), label, size=size)
+      extents = path.get_extents()
+      paths.append(path.transformed(matplotlib.transforms.Affine2D().translate(
+        -(extents.x0 + extents.x1) / 2, -(extents.y0 + extents.y1) / 2)))
+    return paths
+
+
+def _spread(indices, maximum):
+    """Returns at most `maximum` of `indices`, evenly spread."""
+    if maximum is None or len(indices) <= maximum:
+      return indices
+    return indices[np.linspace(0, len(indices) - 1, maximum).astype(int)]
+
+
+def _draw_network_arrays(layout, ax, node_size, max_edges, max_edge_labels, math_labels):
+    """Draws a `NetworkLayout` with one LineCollection for the edges and one scatter for the nodes."""
+    positions = layout.positions
+    drawn = _spread(np.arange(len(layout.edges)), max_edges)
+    ax.add_collection(LineCollection(positions[layout.edges[drawn]], colors=layout.edge_colors[drawn], linewidths=1,
+                                     zorder=1))
+    ax.scatter(positions[:, 0], positions[:, 1], s=node_size, c='white', edgecolors='tab:gray', zorder=2)
+    # Node labels are glyph outlines in one collection, drawing a Text per node is ~100 times slower.
+    ax.add_collection(PathCollection(
+      _label_paths(layout.names if math_labels else layout.plain_names, 12), sizes=[1.], offsets=positions,
+      offset_transform=ax.transData, transform=matplotlib.transforms.IdentityTransform(), facecolors='black',
+      edgecolors='none', zorder=3), autolim=False)
+
+    # Edges are grouped by kind, so every kind keeps some labels.
+    labelled = _spread(drawn[layout.edge_labels[drawn] != ''], max_edge_labels)
+    midpoints = positions[layout.edges[labelled]].mean(axis=1)
+    for label, (x, y) in zip(layout.edge_labels[labelled], midpoints):
+      ax.text(x, y, label, ha='center', va='center', fontsize='small', zorder=3,
+              bbox=dict(boxstyle='round', ec='none', fc='white'))
+
+    ax.autoscale_view()
+    ax.margins(.05)
+    ax.set_axis_off()
+
+
+def draw_network(mode='NCAP', N=2, include_speed_control=False, include_turn_control=False, backend='numpy', ax=None,
+                 max_edges=None, max_edge_labels=None, node_size=500, math_labels=None):
 
     """
     Draws a network graph for a swimmer model based on either NCAP or MLP architecture.
@@ -56,7 +252,24 @@ def draw_network(mode='NCAP', N=2, include_speed_control=False, include_turn_con
     - N (int): Number of joints in the swimmer model. Defaults to 2.
     - include_speed_control (bool): If True, includes nodes for speed control in the graph.
     - include_turn_control (bool): If True, includes nodes for turn control in the graph.
+    - backend (str): 'numpy' draws the cached `network_layout` arrays with a single LineCollection and
+      scatter, which stays fast for tens of joints. 'networkx' builds and draws a networkx graph.
+    - ax (matplotlib.axes.Axes, optional): Axis to draw on with the 'numpy' backend, defaults to the current axis.
+    - max_edges (int, optional): Maximum number of edges drawn with the 'numpy' backend, evenly spread
+      over the edges. Fully connected MLP layers look the same with a few thousand of their edges, and
+      drawing each edge takes about 40 us. Defaults to all.
+    - max_edge_labels (int, optional): Maximum number of edge labels drawn with the 'numpy' backend,
+      evenly spread over the edges. Defaults to all.
+    - node_size (float): Area of the nodes in points^2.
+    - math_labels (bool, optional): Whether the 'numpy' backend typesets node labels with mathtext, like the
+      'networkx' backend, rather than as plain Unicode text. Typesetting takes about 10 ms per label the first
+      time a network is drawn, so defaults to True up to 10 joints only.
     """
+    if backend == 'numpy':
+      layout = network_layout(mode, N, include_speed_control, include_turn_control)
+      _draw_network_arrays(layout, ax if ax is not None else plt.gca(), node_size, max_edges, max_edge_labels,
+                           N <= 10 if math_labels is None else math_labels)
+      return
 
 
     G = nx.DiGraph()
@@ -166,7 +379,9 @@ def draw_network(mode='NCAP', N=2, include_speed_control=False, include_turn_con
     G.add_edges_from(edges)
 
     # Draw the graph using the custom node positions
-    options = {"edge_color": edges_colors, "edgecolors": "tab:gray", "node_size": 500, 'node_color':'white'}
+    # Colors are listed in the order of `edges`, not in the adjacency order of G.edges.
+    options = {"edgelist": list(edges), "edge_color": edges_colors, "edgecolors": "tab:gray", "node_size": node_size,
+               'node_color':'white'}
     nx.draw(G, pos=custom_node_positions, with_labels=True, arrowstyle="-", arrowsize=20, **options)
     if mode=='NCAP':
       nx.draw_networkx_edge_labels(G, pos=custom_node_positions, edge_labels=edge_labels)
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Headless batch rendering of review videos, one file per (checkpoint, seed, camera).
+
+Episodes are fanned out over a pool of spawned worker processes rendering with an offscreen
+OpenGL backend (EGL or OSMesa). Each worker builds its environment and `mujoco.Renderer` once
+and reuses them, and the frame buffers, for every episode it is given. Every camera is rendered
+from the same episode, so an episode is simulated once whatever the number of cameras.
+
+Workers are spawned rather than forked, since an OpenGL context does not survive a fork, so the
+environment builder and policy loader must be picklable: module-level functions or
+`functools.partial` objects, not lambdas.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+# State of a worker process, kept between episodes.
+_WORKER = {}
+
+
+def load_checkpoint_policy(checkpoint, observation_space, action_space):
+    """
+    Default policy loader of `render_checkpoints`, restores the agent of a tonic experiment.
+
+    Parameters:
+    - checkpoint (tuple): `(experiment_path, checkpoint_id)`, where `checkpoint_id` is 'last',
+      'first' or a step, as for `video_utils.play_model`.
+    - observation_space, action_space: Spaces of the rendered environment.
+
+    Returns:
+    - The tonic agent, its `test_step` selects the actions.
+    """
+    from cust_utils.video_utils import load_agent
+    path, checkpoint_id = checkpoint
+    return load_agent(path, checkpoint_id, observation_space, action_space)
+
+
+def _initialize_worker(environment_builder, policy_loader, settings):
+    import torch
+    torch.set_num_threads(1)
+    _WORKER.update(environment_builder=environment_builder, policy_loader=policy_loader, settings=settings)
+
+
+def _worker_environment():
+    """Returns the persistent environment, renderer and frame buffers of this worker."""
+    if 'environment' not in _WORKER:
+        import mujoco
+        from tasks.batched_environment import environment_spaces
+        settings = _WORKER['settings']
+        width, height = settings['width'], settings['height']
+        environment = _WORKER['environment_builder']()
+        physics = environment.physics
+        # The offscreen framebuffer must be at least as large as the frames.
+        visual = physics.model.vis.global_
+        visual.offwidth, visual.offheight = max(visual.offwidth, width), max(visual.offheight, height)
+        _WORKER['environment'] = environment
+        _WORKER['spaces'] = environment_spaces(environment, settings['time_feature'])
+        _WORKER['renderer'] = mujoco.Renderer(physics.model.ptr, height, width)
+        _WORKER['frames'] = {}
+    return _WORKER['environment'], _WORKER['renderer']
+
+
+def _worker_policy(label, checkpoint):
+    """Returns the policy of `checkpoint`, reusing the last one loaded by this worker."""
+    if _WORKER.get('policy_label') != label:
+        observation_space, action_space, _ = _WORKER['spaces']
+        _WORKER['policy'] = _WORKER['policy_loader'](checkpoint, observation_space, action_space)
+        _WORKER['policy_label'] = label
+    return _WORKER['policy']
+
+
+def _frame_buffer(camera):
+    settings = _WORKER['settings']
+    if camera not in _WORKER['frames']:
+        _WORKER['frames'][camera] = np.empty((settings['height'], settings['width'], 3), np.uint8)
+    return _WORKER['frames'][camera]
+
+
+def _render_episode(label, checkpoint, seed, paths):
+    """Runs one test episode and writes every camera of it to its path in `paths`, in camera order."""
+    import imageio
+    from dm_control.rl import control
+    from tasks.batched_environment import flatten_observation
+
+    environment, renderer = _worker_environment()
+    policy = _worker_policy(label, checkpoint)
+    settings = _WORKER['settings']
+    _, _, max_episode_steps = _WORKER['spaces']
+    max_steps = min(settings['max_steps'] or max_episode_steps, max_episode_steps)
+    fps = settings['fps'] or 1 / (environment.control_timestep() * settings['frame_skip'])
+    physics = environment.physics
+    cameras = [physics.model.name2id(camera, 'camera') if isinstance(camera, str) else camera
+               for camera in settings['cameras']]
+
+    environment.task._random = np.random.RandomState(seed)  # pylint: disable=protected-access
+    time_step = environment.reset()
+    writers = [imageio.get_writer(path, fps=fps, macro_block_size=None) for path in paths]
+    score, length = 0., 0
+    try:
+        while True:
+            if length % settings['frame_skip'] == 0:
+                for camera, writer in zip(cameras, writers):
+                    frame = _frame_buffer(camera)
+                    renderer.update_scene(physics.data.ptr, camera=camera)
+                    renderer.render(out=frame)
+                    writer.append_data(frame)
+            if time_step.last() or length >= max_steps:
+                break
+            observation = flatten_observation(time_step.observation)
+            if settings['time_feature']:
+                observation = np.append(observation, -1 + 2 * length / max_episode_steps)
+            actions = policy.test_step(observation[None].astype(np.float32), length)
+            try:
+                time_step = environment.step(np.asarray(actions)[0])
+            except control.PhysicsError:
+                break  # Unstable simulation, the video ends with the last stable frame.
+            score += time_step.reward or 0.
+            length += 1
+    finally:
+        for writer in writers:
+            writer.close()
+    return score, length
+
+
+def render_checkpoints(checkpoints, seeds, cameras, output_dir, environment_builder,
+                       policy_loader=load_checkpoint_policy, width=640, height=480, frame_skip=1,
+                       fps=None, n_workers=None, gl_backend='egl', time_feature=True, max_steps=None):
+    """
+    Renders one test episode per checkpoint and seed in worker processes, one video per camera.
+
+    Videos are written to `output_dir` as '{label}_seed{seed}_{camera}.mp4'. Episodes are run like
+    `video_utils.play_model` and the tonic test phase: seed `seed` places the target as row 0 of a
+    distributed environment initialized with `seed` would, and observations are flattened with the
+    optional time feature appended.
+
+    Parameters:
+    - checkpoints (dict): Maps a label used in the file names to a checkpoint passed to
+      `policy_loader`, e.g. `{'step_100000': ('data/swimmer', 100000)}`.
+    - seeds (list of int): Seed of each rendered episode.
+    - cameras (list): Camera names or ids, e.g. `['tracking11', 'tracking12', 'eyes1']`.
+    - output_dir (str): Directory of the videos, created if needed.
+    - environment_builder (callable): Returns a `dm_control.rl.control.Environment`, e.g.
+      `functools.partial(DeepControlSwimmer.swim, n_links=6)`. Must be picklable.
+    - policy_loader (callable): `policy_loader(checkpoint, observation_space, action_space)` returns
+      an object with `test_step(observations, steps)`. Must be picklable.
+    - width, height (int): Resolution of the videos.
+    - frame_skip (int): Render every `frame_skip`-th control step.
+    - fps (float): Frame rate of the videos, defaults to real time.
+    - n_workers (int): Number of worker processes, defaults to the number of episodes up to the CPU count.
+    - gl_backend (str): Offscreen OpenGL backend of the workers, 'egl' or 'osmesa'.
+    - time_feature (bool): Whether the policies expect the episode time feature.
+    - max_steps (int): Optional maximum number of control steps per episode.
+
+    Returns:
+    - dict: Path of each video, keyed by `(label, seed, camera)`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    episodes = [(label, seed) for label in checkpoints for seed in seeds]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(episodes))
+    settings = dict(cameras=list(cameras), width=width, height=height, frame_skip=frame_skip,
+                    fps=fps, time_feature=time_feature, max_steps=max_steps)
+    paths = {(label, seed, camera): os.path.join(output_dir, '{}_seed{}_{}.mp4'.format(label, seed, camera))
+             for label, seed in episodes for camera in cameras}
+
+    # MuJoCo picks its GL backend when first imported, which happens in the workers while they
+    # unpickle the environment builder, so the backend is passed through their inherited environment.
+    previous_backend = os.environ.get('MUJOCO_GL')
+    os.environ['MUJOCO_GL'] = gl_backend
+    try:
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(
+                n_workers, mp_context=context, initializer=_initialize_worker,
+                initargs=(environment_builder, policy_loader, settings)) as pool:
+            # Episodes are submitted checkpoint by checkpoint, so workers mostly reuse the loaded policy.
+            futures = [pool.submit(_render_episode, label, checkpoints[label], seed,
+                                   [paths[label, seed, camera] for camera in cameras])
+                       for label, seed in episodes]
+            for future in futures:
+                future.result()
+    finally:
+        if previous_backend is None:
+            del os.environ['MUJOCO_GL']
+        else:
+            os.environ['MUJOCO_GL'] = previous_backend
+    return paths
@@ -0,0 +1,261 @@
+"""
+Per-stage timing of the control loop, exported as a Chrome trace or as per-stage histograms.
+
+A `Tracer` times named spans around the stages of an environment step (physics substeps,
+observation, reward and its `rewards.tolerance`), the forward passes of the actor and critic, and
+rendering. The stages are timed by wrapping the methods of the given instances, so a disabled
+tracer wraps nothing and the control loop runs the unmodified code.
+
+Spans nest: a span started inside another, e.g. the reward inside the environment step, is part
+of the same tree. In 'sample' mode only every `every`-th tree of each root span is timed, the
+other calls pay for a counter and a thread-local depth only.
+
+Traces open in chrome://tracing or https://ui.perfetto.dev, e.g.
+
+    tracer = Tracer('sample', every=10)
+    tracer.instrument_environment(environment)
+    tracer.instrument_model(agent.model)
+    ...  # Train.
+    tracer.write_chrome_trace('trace.json')
+    tracer.remove()
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from dm_control.utils import rewards
+
+MODES = ('off', 'sample', 'full')
+
+
+class _Span:
+    """Context manager of a manually placed span."""
+
+    def __init__(self, tracer, code):
+        self.tracer = tracer
+        self.code = code
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.tracer._begin(self.code)
+        return self
+
+    def __exit__(self, *exception):
+        self.tracer._end(self.code, self.start)
+
+
+class _NullSpan:
+    """Context manager of the spans of a disabled tracer."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Records the start and end times of named spans of the control loop.
+
+    Modes:
+
+    - 'off': nothing is instrumented and `span` returns a shared no-op context manager.
+    - 'sample': times every `every`-th call of each root span, together with the spans nested in it.
+    - 'full': times every span.
+
+    Parameters:
+    - mode (str): One of `MODES`. Defaults to 'off'.
+    - every (int): Sampling interval in calls of a root span, only used in 'sample' mode.
+    """
+
+    def __init__(self, mode='off', every=100):
+        if mode not in MODES:
+            raise ValueError('Unknown tracer mode {!r}, expected one of {}.'.format(mode, MODES))
+        if every < 1:
+            raise ValueError('every must be positive. Received {}'.format(every))
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.every = every if mode == 'sample' else 1
+        self.names = []
+        self._name_codes = {}
+        self._calls = []  # Calls of each span as a root, for the sampling.
+        self._events = []  # (code, thread id, start ns, end ns), appended when a span ends.
+        self._local = threading.local()  # Depth and sampling decision of the current tree of each thread.
+        self._wrapped = []  # (owner, attribute, original, whether the owner held the attribute itself)
+        self._origin = time.perf_counter_ns()
+
+    def _code(self, name):
+        if name not in self._name_codes:
+            self._name_codes[name] = len(self.names)
+            self.names.append(name)
+            self._calls.append(0)
+        return self._name_codes[name]
+
+    def _begin(self, code):
+        """Enters a span, returns its start time or None if its tree is not sampled."""
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if depth == 0:
+            calls = self._calls[code]
+            self._calls[code] = calls + 1
+            local.sampled = calls % self.every == 0
+        local.depth = depth + 1
+        return time.perf_counter_ns() if local.sampled else None
+
+    def _end(self, code, start):
+        self._local.depth -= 1
+        if start is not None:
+            self._events.append((code, threading.get_ident(), start, time.perf_counter_ns()))
+
+    def span(self, name):
+        """Returns a context manager timing the enclosed code as the span `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._code(name))
+
+    def wrap(self, owner, attribute, name):
+        """
+        Times every call of `owner.attribute` as the span `name`, until `remove` is called.
+
+        Parameters:
+        - owner: An instance, e.g. a Physics or a torch module, or a module of functions.
+        - attribute (str): Name of the method or function of `owner`.
+        - name (str): Name of the span.
+        """
+        if not self.enabled:
+            return
+        original = getattr(owner, attribute)
+        code = self._code(name)
+        begin, end = self._begin, self._end
+
+        @functools.wraps(original)
+        def traced(*args, **kwargs):
+            start = begin(code)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                end(code, start)
+
+        self._wrapped.append((owner, attribute, original, attribute in vars(owner)))
+        setattr(owner, attribute, traced)
+
+    def instrument_environment(self, environment):
+        """
+        Times the stages of the steps of a dm_control environment.
+
+        The spans are 'environment.step', 'environment.reset', 'physics.step' (all substeps of a
+        control step), 'task.observation', 'task.reward', 'reward.tolerance' and 'physics.render'.
+        Accepts a `BatchedSwimEnvironment`, whose environments all report to this tracer.
+        `rewards.tolerance` is wrapped in the `dm_control.utils.rewards` module, so it is timed for
+        every task of the process until `remove` is called.
+
+        Parameters:
+        - environment: A `dm_control.rl.control.Environment`, or an object with a list of them as
+          `environments`.
+        """
+        if not self.enabled:
+            return
+        for single in getattr(environment, 'environments', [environment]):
+            self.wrap(single, 'step', 'environment.step')
+            self.wrap(single, 'reset', 'environment.reset')
+            self.wrap(single.physics, 'step', 'physics.step')
+            self.wrap(single.physics, 'render', 'physics.render')
+            self.wrap(single.task, 'get_observation', 'task.observation')
+            self.wrap(single.task, 'get_reward', 'task.reward')
+        if not any(owner is rewards and attribute == 'tolerance' for owner, attribute, _, _ in self._wrapped):
+            self.wrap(rewards, 'tolerance', 'reward.tolerance')
+
+    def instrument_model(self, model):
+        """
+        Times the forward passes of the actor and the critic of a tonic model, as 'actor.forward'
+        and 'critic.forward', e.g. of `ppo_swimmer_model()` or `agent.model`.
+        """
+        if not self.enabled:
+            return
+        for part in ['actor', 'critic']:
+            module = getattr(model, part, None)
+            if module is not None:
+                self.wrap(module, 'forward', part + '.forward')
+
+    def remove(self):
+        """Restores every wrapped method and function, the recorded spans are kept."""
+        for owner, attribute, original, owned in reversed(self._wrapped):
+            if owned:
+                setattr(owner, attribute, original)
+            else:
+                delattr(owner, attribute)  # Back to the method of the class.
+        self._wrapped = []
+
+    def clear(self):
+        self._events = []
+        self._calls = [0] * len(self.names)
+
+    def __len__(self):
+        return len(self._events)
+
+    def as_array(self):
+        """Returns the recorded spans as rows `(name_code, thread_id, start_ns, end_ns)` sorted by start, shape (n, 4)."""
+        events = np.array(self._events, dtype=np.int64).reshape(-1, 4)
+        return events[np.argsort(events[:, 2], kind='stable')]
+
+    def durations(self):
+        """Returns the durations of the recorded spans in milliseconds, as {name: np.ndarray}."""
+        events = self.as_array()
+        milliseconds = (events[:, 3] - events[:, 2]) / 1e6
+        return {name: milliseconds[events[:, 0] == code] for code, name in enumerate(self.names)
+                if (events[:, 0] == code).any()}
+
+    def summary(self):
+        """
+        Returns statistics of the durations of each span, sorted by total time.
+
+        Returns:
+        - list of dict: One row per span name with its 'count' and its 'total_ms', 'mean_ms',
+          'p50_ms', 'p90_ms', 'p99_ms' and 'max_ms' durations.
+        """
+        rows = []
+        for name, milliseconds in self.durations().items():
+            p50, p90, p99 = np.quantile(milliseconds, [.5, .9, .99])
+            rows.append(dict(name=name, count=len(milliseconds), total_ms=milliseconds.sum(),
+                             mean_ms=milliseconds.mean(), p50_ms=p50, p90_ms=p90, p99_ms=p99,
+                             max_ms=milliseconds.max()))
+        return sorted(rows, key=lambda row: -row['total_ms'])
+
+    def histograms(self, bins=None):
+        """
+        Returns the histogram of the durations of each span.
+
+        Parameters:
+        - bins (np.ndarray): Edges of the bins in milliseconds, defaults to 10 bins per decade
+          from 1 microsecond to 10 seconds.
+
+        Returns:
+        - dict: Maps each span name to its counts per bin, and 'bins' to the edges.
+        """
+        bins = np.geomspace(1e-3, 1e4, 71) if bins is None else np.asarray(bins)
+        histograms = {name: np.histogram(milliseconds, bins)[0] for name, milliseconds in self.durations().items()}
+        histograms['bins'] = bins
+        return histograms
+
+    def chrome_trace(self):
+        """Returns the recorded spans as a Chrome trace / Perfetto dict of complete ('X') events."""
+        pid = os.getpid()
+        threads = {}
+        events = [dict(name='process_name', ph='M', pid=pid, args=dict(name='social-agents'))]
+        for code, thread, start, end in self.as_array().tolist():
+            tid = threads.setdefault(thread, len(threads))  # Small ids, thread idents are addresses.
+            events.append(dict(name=self.names[code], cat='control', ph='X', pid=pid, tid=tid,
+                               ts=(start - self._origin) / 1e3, dur=(end - start) / 1e3))
+        return dict(traceEvents=events, displayTimeUnit='ms')
+
+    def write_chrome_trace(self, path):
+        """Writes the recorded spans as a Chrome trace to `path`, e.g. 'trace.json'."""
+        with open(path, 'w') as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
@@ -0,0 +1,65 @@
+"""
+A `tonic.Trainer` whose test phase runs in background processes, see `evaluation.AsyncEvaluator`.
+
+The trainer extends the test phase of the tonic trainer installed from the repository's tonic
+checkout (version 0.3.0): `Trainer.run` calls `_test` at the end of each epoch when a test
+environment is set. The evaluator takes the place of that test environment, so no blocking test
+environment is built in the training process.
+"""
+import os
+import sys
+
+import tonic
+from tonic import logger
+
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
+
+from cust_utils.evaluation import AsyncEvaluator
+
+if not callable(getattr(tonic.Trainer, '_test', None)):
+    raise ImportError('BackgroundTestTrainer extends the test phase of tonic 0.3.0, '
+                      'the installed tonic.Trainer has no _test method.')
+
+
+class BackgroundTestTrainer(tonic.Trainer):
+    """
+    Trainer submitting a snapshot of the actor to background test workers at the end of each epoch.
+
+    Instead of running the test episodes itself, the trainer logs the oldest finished evaluation at
+    each epoch, see `AsyncEvaluator.log`. Each row of `log.csv` then holds the test scores of one
+    earlier snapshot, and `test/steps` is the training step of that snapshot. After training, the
+    remaining evaluations are awaited and logged, and the workers are stopped.
+
+    Parameters:
+    - environment_builder (callable): Builds a tonic environment in each worker, e.g.
+      `lambda: tonic.environments.distribute(lambda: eval(environment))`.
+    - seeds (list of int): Seed of each test episode, replacing `test_episodes`.
+    - n_workers (int): Number of test worker processes.
+    - **kwargs: Other arguments of `tonic.Trainer`, e.g. `steps`, `epoch_steps` and `save_steps`.
+    """
+
+    def __init__(self, environment_builder, seeds=(0,), n_workers=1, **kwargs):
+        super().__init__(**kwargs)
+        self.environment_builder = environment_builder
+        self.seeds = list(seeds)
+        self.n_workers = n_workers
+        self.evaluator = None
+
+    def initialize(self, agent, environment):
+        """Starts the test workers with the actor of `agent`, after `agent.initialize(...)`."""
+        self.evaluator = AsyncEvaluator(agent.model.actor, self.environment_builder, self.seeds, self.n_workers)
+        super().initialize(agent, environment, test_environment=self.evaluator)
+
+    def run(self):
+        try:
+            super().run()
+            self.evaluator.finish(logger)
+        finally:
+            self.evaluator.close()
+
+    def _test(self):
+        self.evaluator.submit(self.steps)
+        self.evaluator.log(logger)
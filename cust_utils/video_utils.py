@@ -1,16 +1,17 @@
 import numpy as np
+import base64
 import collections
+import itertools
 import argparse
 import os
-# import yaml
+import queue
+import threading
+import yaml
 import typing as T
 import imageio
-import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import pandas as pd
 import seaborn as sns
-from IPython.display import HTML
+from IPython.display import HTML, Video
 
 import dm_control as dm
 import dm_control.suite.swimmer as swimmer
@@ -31,6 +32,7 @@ sys.path.append('tonic')
 import tonic
 from wrappers.ActorCriticMLP import ppo_mlp_model
 from wrappers.ActorNCAP import SwimmerActor, ppo_swimmer_model, d4pg_swimmer_model
+from wrappers.FrozenActor import freeze_actor
 
 def write_video(
   filepath: os.PathLike,
@@ -67,148 +69,289 @@ def write_video(
       video.append_data(frame)
 
 
+class VideoWriter:
+  """
+  Encodes frames on a background thread while the caller keeps rendering.
+
+  Frames pass through a bounded queue to `write_video`, so memory holds at most `queue_size`
+  frames whatever the episode length, and `append` only blocks when the encoder falls behind.
+  Use as a context manager, or call `close` to finish the file.
+
+  Parameters:
+  - filepath (os.PathLike): Path to save the video file.
+  - fps (int, optional): Frames per second, defaults to 60.
+  - queue_size (int, optional): Maximum number of frames waiting to be encoded.
+  - **kwargs: Additional keyword arguments passed to the write_video function.
+  """
+
+  def __init__(self, filepath: os.PathLike, fps: int = 60, queue_size: int = 32, **kwargs):
+    self.filepath = filepath
+    self.n_frames = 0
+    self._queue = queue.Queue(maxsize=queue_size)
+    self._error = None
+    self._thread = threading.Thread(target=self._encode, args=(fps, kwargs), daemon=True)
+    self._thread.start()
+
+  def _frames(self):
+    while True:
+      frame = self._queue.get()
+      if frame is None:
+        return
+      yield frame
+
+  def _encode(self, fps, kwargs):
+    try:
+      write_video(self.filepath, self._frames(), fps=fps, **kwargs)
+    except Exception as error:  # pylint: disable=broad-except
+      self._error = error
+      # Keep consuming so that a producer blocked on a full queue is released.
+      while self._queue.get() is not None:
+        pass
+
+  def append(self, frame: np.ndarray):
+    """Queues a frame, blocking while `queue_size` frames are waiting."""
+    if self._error is not None:
+      raise self._error
+    self._queue.put(frame)
+    self.n_frames += 1
+
+  def close(self):
+    """Waits for the queued frames to be encoded and closes the file."""
+    self._queue.put(None)
+    self._thread.join()
+    if self._error is not None:
+      raise self._error
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
+def embed_video(filepath: os.PathLike, width: T.Optional[int] = None):
+  """
+  Embeds an already encoded video file in a Jupyter Notebook, without decoding or re-encoding it.
+
+  Parameters:
+  - filepath (os.PathLike): Path of the mp4 file.
+  - width (int, optional): Display width in pixels, defaults to the video width.
+
+  Returns:
+  HTML object: An HTML video element that can be displayed in a Jupyter Notebook.
+  """
+  with open(filepath, 'rb') as file:
+    data = base64.b64encode(file.read()).decode('ascii')
+  size = f' width="{width}"' if width else ''
+  return HTML(f'<video{size} controls><source src="data:video/mp4;base64,{data}" type="video/mp4"></video>')
+
+
 def display_video(
   frames: T.Iterable[np.ndarray],
   filename='output_videos/temp.mp4',
   fps=60,
+  every: int = 1,
+  downscale: int = 1,
+  embed: bool = True,
   **kwargs,
 ):
   """
   Displays a video within a Jupyter Notebook from an iterable of frames.
 
+  The frames are encoded once into `filename`, which is then embedded (or linked) as is.
+
   Parameters:
   - frames (Iterable[np.ndarray]): An iterable of frames, where each frame is a numpy array.
   - filename (str, optional): Temporary filename to save the video before display, defaults to 'output_videos/temp.mp4'.
   - fps (int, optional): Frames per second for the video display, defaults to 60.
+  - every (int, optional): Keep only every `every`-th frame; the frame rate is divided accordingly so
+    the video keeps its duration.
+  - downscale (int, optional): Keep only every `downscale`-th pixel row and column.
+  - embed (bool, optional): If True, embeds the video data in the notebook, otherwise links to the file.
   - **kwargs: Additional keyword arguments passed to the write_video function.
 
   Returns:
-  HTML object: An HTML video element that can be displayed in a Jupyter Notebook.
+  HTML or Video object: A video element that can be displayed in a Jupyter Notebook.
   """
 
   # Write video to a temporary file.
   filepath = os.path.abspath(filename)
-  write_video(filepath, frames, fps=fps, verbose=False, **kwargs)
-
-  height, width, _ = frames[0].shape
-  dpi = 70
-  orig_backend = matplotlib.get_backend()
-  matplotlib.use('Agg')  # Switch to headless 'Agg' to inhibit figure rendering.
-  fig, ax = plt.subplots(1, 1, figsize=(width / dpi, height / dpi), dpi=dpi)
-  matplotlib.use(orig_backend)  # Switch back to the original backend.
-  ax.set_axis_off()
-  ax.set_aspect('equal')
-  ax.set_position([0, 0, 1, 1])
-  im = ax.imshow(frames[0])
-  def update(frame):
-    im.set_data(frame)
-    return [im]
-  interval = 1000/fps
-  anim = animation.FuncAnimation(fig=fig, func=update, frames=frames,
-                                  interval=interval, blit=True, repeat=False)
-  return HTML(anim.to_html5_video())
+  frames = itertools.islice(frames, None, None, every)
+  if downscale > 1:
+    frames = (np.ascontiguousarray(frame[::downscale, ::downscale]) for frame in frames)
+  write_video(filepath, frames, fps=fps / every, verbose=False, **kwargs)
+  if embed:
+    return embed_video(filepath)
+  return Video(filename)
 
 
 def render(env):
     """ Renders the current environment state to an image """
     return env.physics.render(camera_id=0, width=640, height=480)
 
-def play_model(path, checkpoint='last',environment='default',seed=None, header=None):
-
+def find_checkpoint(path, checkpoint='last'):
   """
-    Plays a model within an environment and renders the gameplay to a video.
-
-    Parameters:
-    - path (str): Path to the directory containing the model and checkpoints.
-    - checkpoint (str): Specifies which checkpoint to use ('last', 'first', or a specific ID). 'none' indicates no checkpoint.
-    - environment (str): The environment to use. 'default' uses the environment specified in the configuration file.
-    - seed (int): Optional seed for reproducibility.
-    - header (str): Optional Python code to execute before initializing the model, such as importing libraries.
-    """
+  Returns the path of a checkpoint of an experiment, or None if it is not found.
 
+  Parameters:
+  - path (str): Path to the directory containing the model and checkpoints.
+  - checkpoint (str): Specifies which checkpoint to use ('last', 'first', or a specific ID). 'none' indicates no checkpoint.
+  """
   if checkpoint == 'none':
     # Use no checkpoint, the agent is freshly created.
-    checkpoint_path = None
     tonic.logger.log('Not loading any weights')
+    return None
+  checkpoint_path = os.path.join(path, 'checkpoints')
+  if not os.path.isdir(checkpoint_path):
+    tonic.logger.error(f'{checkpoint_path} is not a directory')
+    return None
+
+  # List all the checkpoints.
+  checkpoint_ids = []
+  for file in os.listdir(checkpoint_path):
+    if file[:5] == 'step_':
+      checkpoint_id = file.split('.')[0]
+      checkpoint_ids.append(int(checkpoint_id[5:]))
+
+  if not checkpoint_ids:
+    tonic.logger.error(f'No checkpoint found in {checkpoint_path}')
+    return None
+  if checkpoint == 'last':
+    # Use the last checkpoint.
+    checkpoint_id = max(checkpoint_ids)
+  elif checkpoint == 'first':
+    # Use the first checkpoint.
+    checkpoint_id = min(checkpoint_ids)
   else:
-    checkpoint_path = os.path.join(path, 'checkpoints')
-    if not os.path.isdir(checkpoint_path):
-      tonic.logger.error(f'{checkpoint_path} is not a directory')
-      checkpoint_path = None
-
-    # List all the checkpoints.
-    checkpoint_ids = []
-    for file in os.listdir(checkpoint_path):
-      if file[:5] == 'step_':
-        checkpoint_id = file.split('.')[0]
-        checkpoint_ids.append(int(checkpoint_id[5:]))
-
-    if checkpoint_ids:
-      if checkpoint == 'last':
-        # Use the last checkpoint.
-        checkpoint_id = max(checkpoint_ids)
-        checkpoint_path = os.path.join(checkpoint_path, f'step_{checkpoint_id}')
-      elif checkpoint == 'first':
-        # Use the first checkpoint.
-        checkpoint_id = min(checkpoint_ids)
-        checkpoint_path = os.path.join(checkpoint_path, f'step_{checkpoint_id}')
-      else:
-        # Use the specified checkpoint.
-        checkpoint_id = int(checkpoint)
-        if checkpoint_id in checkpoint_ids:
-          checkpoint_path = os.path.join(checkpoint_path, f'step_{checkpoint_id}')
-        else:
-          tonic.logger.error(f'Checkpoint {checkpoint_id} not found in {checkpoint_path}')
-          checkpoint_path = None
-    else:
-      tonic.logger.error(f'No checkpoint found in {checkpoint_path}')
-      checkpoint_path = None
-
-  # Load the experiment configuration.
+    # Use the specified checkpoint.
+    checkpoint_id = int(checkpoint)
+    if checkpoint_id not in checkpoint_ids:
+      tonic.logger.error(f'Checkpoint {checkpoint_id} not found in {checkpoint_path}')
+      return None
+  return os.path.join(checkpoint_path, f'step_{checkpoint_id}')
+
+
+def load_config(path, header=None):
+  """
+  Loads the configuration of an experiment and runs its header.
+
+  The headers are executed in a namespace of their own, starting from the globals of this module,
+  which is kept as `config.header_namespace` to evaluate the `agent` and `environment` expressions.
+
+  Parameters:
+  - path (str): Path to the directory containing the model and checkpoints.
+  - header (str): Optional Python code to execute after the configuration header, such as importing libraries.
+
+  Returns:
+  argparse.Namespace: The arguments the experiment was trained with.
+  """
   arguments_path = os.path.join(path, 'config.yaml')
   with open(arguments_path, 'r') as config_file:
     config = yaml.load(config_file, Loader=yaml.FullLoader)
   config = argparse.Namespace(**config)
 
   # Run the header first, e.g. to load an ML framework.
+  namespace = dict(globals())
   try:
     if config.header:
-      exec(config.header)
+      exec(config.header, namespace)
     if header:
-      exec(header)
+      exec(header, namespace)
   except:
     pass
+  config.header_namespace = namespace
+  return config
 
-  # Build the agent.
-  agent = eval(config.agent)
 
-  # Build the environment.
-  if environment == 'default':
-    environment  = tonic.environments.distribute(lambda: eval(config.environment))
-  else:
-    environment  = tonic.environments.distribute(lambda: eval(environment))
-  if seed is not None:
-    environment.seed(seed)
+def load_agent(path, checkpoint, observation_space, action_space, config=None, seed=None, header=None):
+  """
+  Builds the agent of an experiment and loads the weights of one of its checkpoints.
+
+  Parameters:
+  - path (str): Path to the directory containing the model and checkpoints.
+  - checkpoint (str): Specifies which checkpoint to use, see `find_checkpoint`.
+  - observation_space, action_space: Spaces of the environment the agent acts in.
+  - config (argparse.Namespace): The experiment configuration, loaded from `path` if None.
+  - seed (int): Optional seed for reproducibility.
+  - header (str): Optional Python code to execute before initializing the model.
+
+  Returns:
+  The initialized tonic agent.
+  """
+  checkpoint_path = find_checkpoint(path, checkpoint)
+  if config is None:
+    config = load_config(path, header)
+
+  # Build the agent.
+  agent = eval(config.agent, config.header_namespace)
 
   # Initialize the agent.
   agent.initialize(
-    observation_space=environment.observation_space,
-    action_space=environment.action_space,
+    observation_space=observation_space,
+    action_space=action_space,
     seed=seed,
   )
 
   # Load the weights of the agent form a checkpoint.
   if checkpoint_path:
     agent.load(checkpoint_path)
+  return agent
+
+
+def build_environment(environment, namespace=None):
+  """
+  Returns the distributed tonic environment of an experiment, built from its configuration string.
+
+  Parameters:
+  - environment (str): Python expression building the environment, e.g. the `environment` entry of `config.yaml`.
+  - namespace (dict): Globals to evaluate `environment` in, e.g. `config.header_namespace`. Defaults to
+    the globals of this module.
+  """
+  namespace = globals() if namespace is None else namespace
+  return tonic.environments.distribute(lambda: eval(environment, namespace))
+
+
+def play_model(path, checkpoint='last',environment='default',seed=None, header=None, frozen=False, stream=False):
+
+  """
+    Plays a model within an environment and renders the gameplay to a video.
+
+    Parameters:
+    - path (str): Path to the directory containing the model and checkpoints.
+    - checkpoint (str): Specifies which checkpoint to use ('last', 'first', or a specific ID). 'none' indicates no checkpoint.
+    - environment (str): The environment to use. 'default' uses the environment specified in the configuration file.
+    - seed (int): Optional seed for reproducibility.
+    - header (str): Optional Python code to execute before initializing the model, such as importing libraries.
+    - frozen (bool): If True, runs the policy through a no-grad, traced snapshot of the actor (see
+      `wrappers.FrozenActor.freeze_actor`) instead of `agent.test_step`.
+    - stream (bool): If True, frames are encoded on a background thread while the episode runs
+      (see `VideoWriter`) instead of being kept in memory until the end.
+    """
+
+  config = load_config(path, header)
+
+  # Build the environment.
+  environment = build_environment(config.environment if environment == 'default' else environment,
+                                  config.header_namespace)
+  if seed is not None:
+    environment.seed(seed)
+
+  agent = load_agent(path, checkpoint, environment.observation_space, environment.action_space,
+                     config=config, seed=seed)
 
   steps = 0
+  video_path = os.path.join(path, 'video.mp4')
   test_observations = environment.start()
-  frames = [environment.render('rgb_array',camera_id=0, width=640, height=480)[0]]
+  frames = VideoWriter(video_path) if stream else []
+  frames.append(environment.render('rgb_array',camera_id=0, width=640, height=480)[0])
   score, length = 0, 0
 
+  # Export the actor once, the frozen policy is a drop-in replacement for agent.test_step.
+  policy = freeze_actor(agent.model.actor, test_observations) if frozen else agent
+
   while True:
       # Select an action.
-      actions = agent.test_step(test_observations, steps)
+      actions = policy.test_step(test_observations, steps)
       assert not np.isnan(actions.sum())
 
       # Take a step in the environment.
@@ -221,6 +364,8 @@ def play_model(path, checkpoint='last',environment='default',seed=None, header=N
 
       if infos['resets'][0]:
           break
-  video_path = os.path.join(path, 'video.mp4')
   print('Reward for the run: ', score)
+  if stream:
+    frames.close()
+    return embed_video(video_path)
   return display_video(frames,video_path)
\ No newline at end of file
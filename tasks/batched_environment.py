@@ -0,0 +1,171 @@
+"""Thread-pool stepping of several swimmer environments behind the tonic interface.
+
+MuJoCo releases the GIL while stepping, so the physics of M environments advance
+concurrently on threads of a single process, without pickling observations
+between processes as `tonic.environments.Parallel` does.
+"""
+import concurrent.futures
+
+import gym
+import numpy as np
+from dm_control.rl import control
+
+
+def flatten_observation(observation):
+  """Concatenates a dm_control observation dict into one vector, as tonic's ControlSuite does."""
+  return np.concatenate([np.asarray(value).ravel() for value in observation.values()])
+
+
+def environment_spaces(environment, time_feature=True):
+  """Returns the tonic observation and action spaces and the episode length of a dm_control environment."""
+  observation_size = sum(int(np.prod(spec.shape)) for spec in environment.observation_spec().values())
+  observation_size += int(time_feature)
+  observation_space = gym.spaces.Box(-np.inf, np.inf, (observation_size,), np.float32)
+  action_spec = environment.action_spec()
+  action_space = gym.spaces.Box(
+    action_spec.minimum.astype(np.float32), action_spec.maximum.astype(np.float32), dtype=np.float32)
+  max_episode_steps = environment._step_limit  # pylint: disable=protected-access
+  return observation_space, action_space, max_episode_steps
+
+
+class EnvironmentGroup:
+  """Steps a group of dm_control environments, reading and writing their rows of stacked arrays.
+
+  Parameters:
+  - environments (list): The `dm_control.rl.control.Environment`s of the group.
+  - indices (np.ndarray): Row of each environment in the stacked arrays.
+  - max_episode_steps (float): Episode length after which environments are reset.
+  - time_feature (bool): Whether to append the episode time feature to observations.
+  """
+
+  def __init__(self, environments, indices, max_episode_steps, time_feature=True):
+    self.environments = environments
+    self.indices = indices
+    self.max_episode_steps = max_episode_steps
+    self.time_feature = time_feature
+    self.lengths = np.zeros(len(environments), int)
+    self._last_observations = [None] * len(environments)
+
+  def seed(self, seed):
+    """Seeds the environment of row i with `seed + i`, like tonic's distributed environments."""
+    for i, environment in zip(self.indices, self.environments):
+      environment.task._random = np.random.RandomState(seed + i)  # pylint: disable=protected-access
+
+  def _observation(self, time_step, length):
+    observation = flatten_observation(time_step.observation)
+    if self.time_feature:
+      observation = np.append(observation, -1 + 2 * length / self.max_episode_steps)
+    return observation
+
+  def reset(self, observations):
+    """Resets every environment of the group into its row of `observations`."""
+    for j, (i, environment) in enumerate(zip(self.indices, self.environments)):
+      self.lengths[j] = 0
+      self._last_observations[j] = observations[i] = self._observation(environment.reset(), 0)
+
+  def step(self, actions, observations, infos):
+    """Steps every environment with its row of `actions`, resetting finished episodes.
+
+    Writes the observations after resets to `observations` and the transition
+    'observations', 'rewards', 'resets' and 'terminations' to `infos`.
+    """
+    for j, (i, environment) in enumerate(zip(self.indices, self.environments)):
+      self.lengths[j] += 1
+      try:
+        time_step = environment.step(actions[i])
+        observation = self._observation(time_step, self.lengths[j])
+        reward = time_step.reward
+        # Episode ends from the time limit are timeouts, not terminations.
+        termination = time_step.last() and time_step.discount == 0
+      except control.PhysicsError:
+        # Unstable simulation, the episode is terminated without reward.
+        observation, reward, termination = self._last_observations[j], 0., True
+      reset = termination or self.lengths[j] >= self.max_episode_steps
+      infos['observations'][i] = observation
+      infos['rewards'][i] = reward
+      infos['resets'][i] = reset
+      infos['terminations'][i] = termination
+      if reset:
+        self.lengths[j] = 0
+        observation = self._observation(environment.reset(), 0)
+      self._last_observations[j] = observations[i] = observation
+
+
+class BatchedSwimEnvironment:
+  """Steps M dm_control environments on a thread pool and returns stacked arrays.
+
+  Exposes the interface of `tonic.environments.distribute` (`initialize`, `start`,
+  `step`, `render`, `observation_space`, `action_space`, `name`), so it can be
+  passed to `tonic.Trainer` in place of a distributed environment. Observations
+  are flattened like tonic's `ControlSuite` builder, with its optional time feature
+  in [-1, 1] appended.
+
+  Parameters:
+  - environment_builder (callable): Returns a `dm_control.rl.control.Environment`,
+    e.g. `lambda: DeepControlSwimmer.swim(n_links=6)`.
+  - n_environments (int): Number M of environments.
+  - n_threads (int): Size of the thread pool, defaults to M. Environments are split
+    into `n_threads` contiguous groups stepped one group per thread.
+  - time_feature (bool): Whether to append the episode time feature to observations.
+  - name (str): Name of the environment, used by the tonic logger.
+  """
+
+  def __init__(self, environment_builder, n_environments, n_threads=None, time_feature=True,
+               name='swimmer-swim'):
+    self.environments = [environment_builder() for _ in range(n_environments)]
+    self.n_environments = n_environments
+    self.name = name
+    self.observation_space, self.action_space, self.max_episode_steps = environment_spaces(
+      self.environments[0], time_feature)
+
+    n_threads = min(n_threads or n_environments, n_environments)
+    self.groups = [
+      EnvironmentGroup([self.environments[i] for i in indices], indices, self.max_episode_steps, time_feature)
+      for indices in np.array_split(np.arange(n_environments), n_threads)]
+    self._pool = concurrent.futures.ThreadPoolExecutor(n_threads) if n_threads > 1 else None
+
+  def initialize(self, seed):
+    """Seeds environment i with `seed + i`, like tonic's distributed environments."""
+    for group in self.groups:
+      group.seed(seed)
+
+  def _map(self, method, *arrays):
+    """Calls `method` of every environment group on `arrays`, concurrently if threaded."""
+    if self._pool is None:
+      for group in self.groups:
+        getattr(group, method)(*arrays)
+      return
+    futures = [self._pool.submit(getattr(group, method), *arrays) for group in self.groups]
+    for future in futures:
+      future.result()
+
+  def start(self):
+    """Resets every environment and returns the first observations, shape (M, observation_size)."""
+    observations = np.empty((self.n_environments,) + self.observation_space.shape, np.float32)
+    self._map('reset', observations)
+    return observations
+
+  def step(self, actions):
+    """Steps every environment with its row of `actions` and resets finished episodes.
+
+    Returns:
+    - np.ndarray: Observations to select the next actions, after resets, shape (M, observation_size).
+    - dict: tonic's `infos` with the transition 'observations' (before resets), 'rewards',
+      'resets' and 'terminations', each stacked over the M environments.
+    """
+    observations = np.empty((self.n_environments,) + self.observation_space.shape, np.float32)
+    infos = dict(
+      observations=np.empty_like(observations),
+      rewards=np.empty(self.n_environments, np.float32),
+      resets=np.empty(self.n_environments, bool),
+      terminations=np.empty(self.n_environments, bool))
+    self._map('step', np.asarray(actions), observations, infos)
+    return observations, infos
+
+  def render(self, mode='rgb_array', *args, **kwargs):
+    """Returns one rendered frame per environment, shape (M, height, width, 3)."""
+    return np.array([environment.physics.render(*args, **kwargs) for environment in self.environments])
+
+  def close(self):
+    if self._pool is not None:
+      self._pool.shutdown()
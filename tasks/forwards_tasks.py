@@ -6,37 +6,117 @@ from dm_control import suite
 from dm_control.suite.wrappers import pixels
 import collections
 
+import numpy as np
+
 # Global parametres
 _SWIM_SPEED = 0.1
 
 class Swim(swimmer.Swimmer):
   """Task to swim forwards at the desired speed."""
-  def __init__(self, desired_speed=_SWIM_SPEED, **kwargs):
-    super().__init__(**kwargs)
+  def __init__(self, desired_speed=_SWIM_SPEED, observe_proximity=False, per_agent=False,
+               observation_views=False, **kwargs):
+    """
+    Parameters:
+    - desired_speed (float): Forward speed at which the reward saturates.
+    - observe_proximity (bool): If True, the observation ends with each swimmer's distance to the
+      nearest other swimmer, shape (n_swimmers,).
+    - per_agent (bool): If True, the observation is `{'agents': array}` with one row per swimmer,
+      shape (n_swimmers, obs_dim), laid out as joints, body velocities and (optionally) proximity.
+      The array is allocated once per episode and overwritten in place at every step, so copy
+      observations that are kept across steps.
+      The reward is then one reward per swimmer, shape (n_swimmers,).
+    - observation_views (bool): With `per_agent`, return the usual 'joints', 'body_velocities' and
+      'proximity' keys instead, each a (n_swimmers, k) view into the same array.
+    """
+    super().__init__(per_agent=per_agent, **kwargs)
     self._desired_speed = desired_speed
+    self._observe_proximity = observe_proximity
+    self._observation_views = observation_views
+    self._layout = None
+    self._layout_model = None  # The MjModel `_layout` was resolved from.
+    self._forward_sensors = None
+    self._agent_observations = None
+    self._observation = None
+    self._gathers = None
 
   def initialize_episode(self, physics):
     super().initialize_episode(physics)
+    if self._layout is None or self._layout_model is not physics.model.ptr:
+      # dm_control's swimmer Physics has no cached layout, resolve it from the model. The per-step
+      # proximity then only gathers the positions of the head bodies.
+      self._layout = getattr(physics, 'layout', None) or swimmer.SwimmerLayout(physics.model)
+      self._layout_model = physics.model.ptr
+      # `sensordata` addresses of the y axis of the head velocimeters, pointing backwards.
+      self._forward_sensors = self._layout.head_vel[:, 1] if self._per_agent else self._layout.head_vel[:1, 1]
+    if self._per_agent:
+      self._allocate_observations(physics)
     # Hide target by setting alpha to 0.
     physics.named.model.mat_rgba['target', 'a'] = 0
     physics.named.model.mat_rgba['target_default', 'a'] = 0
     physics.named.model.mat_rgba['target_highlight', 'a'] = 0
 
+  def _allocate_observations(self, physics):
+    """Preallocates the per-agent observation array and the observation dict around it."""
+    layout = self._layout
+    n_joints = layout.joint_qpos.shape[1]
+    n_velocities = layout.body_velocity_sensors.shape[1]
+    obs_dim = n_joints + n_velocities + int(self._observe_proximity)
+    self._agent_observations = np.zeros((layout.n_swimmers, obs_dim))
+
+    obs = collections.OrderedDict()
+    if self._observation_views:
+      obs['joints'] = self._agent_observations[:, :n_joints]
+      obs['body_velocities'] = self._agent_observations[:, n_joints:n_joints + n_velocities]
+      if self._observe_proximity:
+        obs['proximity'] = self._agent_observations[:, -1]
+    else:
+      obs['agents'] = self._agent_observations
+    self._observation = obs
+    # Gathers land in contiguous scratch arrays (gathering straight into strided columns is
+    # buffered by NumPy and slower), then are copied into their columns.
+    self._gathers = [
+      (physics.data.qpos, layout.joint_qpos, np.empty((layout.n_swimmers, n_joints)),
+       self._agent_observations[:, :n_joints]),
+      (physics.data.sensordata, layout.body_velocity_sensors, np.empty((layout.n_swimmers, n_velocities)),
+       self._agent_observations[:, n_joints:n_joints + n_velocities]),
+    ]
+
+  @property
+  def agent_observations(self):
+    """The per-agent observation array of the current episode, shape (n_swimmers, obs_dim)."""
+    return self._agent_observations
+
   def get_observation(self, physics):
     """Returns an observation of joint angles and body velocities."""
+    if self._per_agent:
+      return self._write_observations(physics)
     obs = collections.OrderedDict()
     obs['joints'] = physics.joints()
     obs['body_velocities'] = physics.body_velocities()
+    if self._observe_proximity:
+      obs['proximity'] = swimmer.head_proximities(physics, self._layout.head_bodies)
     return obs
 
+  def _write_observations(self, physics):
+    """Gathers every swimmer's observation into the preallocated array."""
+    for source, indices, scratch, columns in self._gathers:
+      # The indices are always valid, mode='wrap' skips the bounds-checked buffered path.
+      source.take(indices, out=scratch, mode='wrap')
+      np.copyto(columns, scratch)
+    if self._observe_proximity:
+      self._agent_observations[:, -1] = swimmer.head_proximities(physics, self._layout.head_bodies)
+    return self._observation
+
   def get_reward(self, physics):
     """Returns a smooth reward that is 0 when stopped or moving backwards, and rises linearly to 1
-    when moving forwards at the desired speed."""
-    forward_velocity = -physics.named.data.sensordata['head_vel'][1]
-    return rewards.tolerance(
-      forward_velocity,
+    when moving forwards at the desired speed. With `per_agent`, one reward per swimmer, shape
+    (n_swimmers,), otherwise the reward of the first swimmer."""
+    forward_velocities = -physics.data.sensordata[self._forward_sensors]
+    agent_rewards = rewards.tolerance(
+      forward_velocities,
       bounds=(self._desired_speed, float('inf')),
       margin=self._desired_speed,
       value_at_margin=0.,
       sigmoid='linear',
-    )
\ No newline at end of file
+    )
+    return agent_rewards if self._per_agent else float(agent_rewards[0])
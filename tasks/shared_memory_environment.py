@@ -0,0 +1,215 @@
+"""Process-pool swimmer environments exchanging arrays through shared memory.
+
+Workers step their group of environments and write observations, rewards and
+reset flags straight into `multiprocessing.shared_memory` arrays, reading their
+actions from a shared action array. Only one-byte commands and acknowledgements
+go through the pipes, so nothing is pickled per step. Workers are forked so that
+environment builders may be lambdas, as in the notebooks' `train()` helper.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import warnings
+
+import numpy as np
+
+from tasks.batched_environment import EnvironmentGroup, environment_spaces
+
+_STEP, _RESET, _SEED, _CLOSE = b's', b'r', b'd', b'c'
+
+
+def _allocate(shapes_and_dtypes):
+  """Returns a `SharedMemory` block and named NumPy views into it, one per `(name, shape, dtype)`."""
+  sizes = [int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in shapes_and_dtypes]
+  offsets = np.concatenate([[0], np.cumsum([-(-size // 8) * 8 for size in sizes])])  # 8-byte aligned.
+  block = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+  arrays = {name: np.ndarray(shape, dtype, buffer=block.buf, offset=int(offset))
+            for (name, shape, dtype), offset in zip(shapes_and_dtypes, offsets)}
+  return block, arrays
+
+
+def _worker(environment_builder, indices, max_episode_steps, time_feature, arrays, connection):
+  """Runs a group of environments on the shared `arrays` until told to close."""
+  group = EnvironmentGroup([environment_builder() for _ in indices], indices, max_episode_steps, time_feature)
+  infos = {key: arrays[key] for key in ['rewards', 'resets', 'terminations']}
+  infos['observations'] = arrays['next_observations']
+  connection.send_bytes(b'')  # Ready.
+  while True:
+    command = connection.recv_bytes()
+    if command == _STEP:
+      group.step(arrays['actions'], arrays['observations'], infos)
+    elif command == _RESET:
+      group.reset(arrays['observations'])
+    elif command[:1] == _SEED:
+      group.seed(int(command[1:]))
+    else:
+      break
+    connection.send_bytes(b'')
+
+
+class SharedMemorySwimEnvironment:
+  """Steps M dm_control environments in worker processes through shared memory arrays.
+
+  Has the same interface as `tasks.batched_environment.BatchedSwimEnvironment`
+  and `tonic.environments.distribute` (`initialize`, `start`, `step`,
+  `observation_space`, `action_space`, `name`). A worker that dies is restarted
+  with freshly built and reset environments; its environments report a reset
+  (but no termination) for that step.
+
+  Parameters:
+  - environment_builder (callable): Returns a `dm_control.rl.control.Environment`,
+    e.g. `lambda: DeepControlSwimmer.swim(n_links=12)`.
+  - n_environments (int): Number M of environments.
+  - n_workers (int): Number of worker processes, defaults to M. Environments are split
+    into `n_workers` contiguous groups.
+  - time_feature (bool): Whether to append the episode time feature to observations.
+  - name (str): Name of the environment, used by the tonic logger.
+  - poll_interval (float): Seconds between liveness checks of a worker while waiting for it.
+  - max_restarts (int): Attempts to restart a dead worker before giving up with a `RuntimeError`,
+    e.g. when its environment builder fails at every start.
+  """
+
+  def __init__(self, environment_builder, n_environments, n_workers=None, time_feature=True,
+               name='swimmer-swim', poll_interval=1., max_restarts=3):
+    self.environment_builder = environment_builder
+    self.n_environments = n_environments
+    self.time_feature = time_feature
+    self.name = name
+    self.poll_interval = poll_interval
+    self.max_restarts = max_restarts
+    self.observation_space, self.action_space, self.max_episode_steps = environment_spaces(
+      environment_builder(), time_feature)
+
+    observation_shape = (n_environments,) + self.observation_space.shape
+    self._block, self._arrays = _allocate([
+      ('actions', (n_environments,) + self.action_space.shape, np.float32),
+      ('observations', observation_shape, np.float32),
+      ('next_observations', observation_shape, np.float32),
+      ('rewards', (n_environments,), np.float32),
+      ('resets', (n_environments,), bool),
+      ('terminations', (n_environments,), bool),
+    ])
+
+    self._context = multiprocessing.get_context('fork')
+    self._groups = np.array_split(np.arange(n_environments), min(n_workers or n_environments, n_environments))
+    self._workers = [None] * len(self._groups)
+    self._connections = [None] * len(self._groups)
+    self._seed = 0
+    self.restarts = 0
+    for k in range(len(self._groups)):
+      if not self._start_worker(k):
+        raise RuntimeError('Environment worker {} died while building its environments (exit code {}).'.format(
+          k, self._stop_worker(k)))
+
+  def _start_worker(self, k):
+    """Starts worker `k`, returns False if it died while building its environments."""
+    parent_connection, child_connection = self._context.Pipe()
+    worker = self._context.Process(
+      target=_worker, daemon=True,
+      args=(self.environment_builder, self._groups[k], self.max_episode_steps, self.time_feature,
+            self._arrays, child_connection))
+    worker.start()
+    child_connection.close()
+    self._workers[k], self._connections[k] = worker, parent_connection
+    return self._wait(k)
+
+  def _wait(self, k):
+    """Waits for the acknowledgement of worker `k`, returns False if it died instead."""
+    connection, worker = self._connections[k], self._workers[k]
+    try:
+      while not connection.poll(self.poll_interval):
+        if not worker.is_alive():
+          return False
+      connection.recv_bytes()
+      return True
+    except (EOFError, OSError):
+      return False
+
+  def _command(self, k, command):
+    """Sends `command` to worker `k` and waits for it, returns False if the worker died."""
+    try:
+      self._connections[k].send_bytes(command)
+    except (BrokenPipeError, OSError):
+      return False
+    return self._wait(k)
+
+  def _stop_worker(self, k):
+    """Closes the connection of the dead worker `k` and returns its exit code."""
+    self._connections[k].close()
+    self._workers[k].join(timeout=self.poll_interval)
+    return self._workers[k].exitcode
+
+  def _restart_worker(self, k):
+    """Replaces the dead worker `k` by a new one with new episodes, trying up to `max_restarts` times."""
+    for _ in range(self.max_restarts):
+      self.restarts += 1
+      warnings.warn('Environment worker {} (exit code {}) died, restarting it.'.format(k, self._stop_worker(k)))
+      # Reseed differently from the crashed episode, then start new episodes.
+      seed = self._seed + self.restarts * self.n_environments
+      if self._start_worker(k) and self._command(k, _SEED + str(seed).encode()) and self._command(k, _RESET):
+        return
+    raise RuntimeError('Environment worker {} died {} times in a row while restarting (exit code {}).'.format(
+      k, self.max_restarts, self._stop_worker(k)))
+
+  def _broadcast(self, command):
+    """Sends `command` to every worker and waits for all of them, returns the restarted groups."""
+    alive = []
+    for connection in self._connections:
+      try:
+        connection.send_bytes(command)
+        alive.append(True)
+      except (BrokenPipeError, OSError):
+        alive.append(False)
+    restarted = []
+    for k, sent in enumerate(alive):
+      if not (sent and self._wait(k)):
+        self._restart_worker(k)
+        restarted.append(self._groups[k])
+    return restarted
+
+  def initialize(self, seed):
+    """Seeds environment i with `seed + i`, like tonic's distributed environments."""
+    self._seed = seed
+    self._broadcast(_SEED + str(seed).encode())
+
+  def start(self):
+    """Resets every environment and returns the first observations, shape (M, observation_size)."""
+    self._broadcast(_RESET)
+    return self._arrays['observations'].copy()
+
+  def step(self, actions):
+    """Steps every environment with its row of `actions` and resets finished episodes.
+
+    Returns:
+    - np.ndarray: Observations to select the next actions, after resets, shape (M, observation_size).
+    - dict: tonic's `infos` with the transition 'observations' (before resets), 'rewards',
+      'resets' and 'terminations', each stacked over the M environments.
+    """
+    arrays = self._arrays
+    previous_observations = arrays['observations'].copy()
+    arrays['actions'][:] = actions
+    for indices in self._broadcast(_STEP):
+      # The crashed episodes end here, with the last observations of the aborted step.
+      arrays['next_observations'][indices] = previous_observations[indices]
+      arrays['rewards'][indices] = 0
+      arrays['resets'][indices] = True
+      arrays['terminations'][indices] = False
+    infos = dict(
+      observations=arrays['next_observations'].copy(),
+      rewards=arrays['rewards'].copy(),
+      resets=arrays['resets'].copy(),
+      terminations=arrays['terminations'].copy())
+    return arrays['observations'].copy(), infos
+
+  def close(self):
+    for connection, worker in zip(self._connections, self._workers):
+      try:
+        connection.send_bytes(_CLOSE)
+      except (BrokenPipeError, OSError):
+        pass
+      worker.join(timeout=self.poll_interval)
+      if worker.is_alive():
+        worker.terminate()
+      connection.close()
+    self._arrays = None
+    self._block.close()
+    self._block.unlink()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import torch
+
+from Agents.NCAPSwimmer import SwimmerModule
+from cust_utils.activity_recorder import ActivityRecorder
+
+ENTRIES = [('exc', 'bneuron_d_prop_1'), ('exc', 'bneuron_v_prop_1'), ('inh', 'bneuron_d_speed_0')]
+
+
+def test_off_records_nothing():
+    recorder = ActivityRecorder('off')
+    codes = recorder.register(ENTRIES)
+    recorder.record(0, codes)
+    assert len(recorder) == 0
+    assert recorder.as_array().shape == (0, 3)
+
+
+def test_full_grows_past_capacity():
+    recorder = ActivityRecorder('full', capacity=4)
+    codes = recorder.register(ENTRIES)
+    for timestep in range(5):
+        recorder.record(timestep, codes)
+    data = recorder.as_array()
+    assert data.shape == (15, 3)
+    np.testing.assert_array_equal(recorder.timesteps, np.repeat(np.arange(5), 3))
+    np.testing.assert_array_equal(data[:3, 1:], [[0, 0], [0, 1], [1, 2]])
+    assert recorder.names == ['bneuron_d_prop_1', 'bneuron_v_prop_1', 'bneuron_d_speed_0']
+    assert recorder.to_records()[2] == (0, 'inh', 'bneuron_d_speed_0')
+
+
+def test_ring_keeps_most_recent_rows_in_order():
+    recorder = ActivityRecorder('ring', capacity=7)
+    codes = recorder.register(ENTRIES)
+    for timestep in range(10):
+        recorder.record(timestep, codes)
+    assert len(recorder) == 7
+    np.testing.assert_array_equal(recorder.timesteps, [7, 8, 8, 8, 9, 9, 9])
+    np.testing.assert_array_equal(recorder.neurons, [2, 0, 1, 2, 0, 1, 2])
+
+
+def test_sample_records_every_k_steps():
+    recorder = ActivityRecorder('sample', capacity=2, every=3)
+    codes = recorder.register(ENTRIES)
+    for timestep in range(10):
+        recorder.record(timestep, codes)
+    np.testing.assert_array_equal(np.unique(recorder.timesteps), [0, 3, 6, 9])
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        ActivityRecorder('sometimes')
+
+
+def test_swimmer_module_logging():
+    swimmer = SwimmerModule(n_joints=3)
+    swimmer(torch.zeros(3))
+    assert swimmer.connections_log == []
+
+    swimmer = SwimmerModule(n_joints=3, activity_recorder=ActivityRecorder('full'))
+    swimmer(torch.zeros(3))
+    swimmer(torch.zeros(3), log_activity=False)
+    swimmer(torch.zeros(3))
+    assert swimmer.connections_log[:3] == [
+        (0, 'exc', 'bneuron_d_osc_0'), (0, 'exc', 'bneuron_v_osc_0'), (0, 'exc', 'bneuron_d_prop_1')]
+    np.testing.assert_array_equal(np.unique(swimmer.recorder.timesteps), [0, 2])
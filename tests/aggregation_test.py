@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cust_utils.aggregation import aggregate_runs, bootstrap_mean_ci, performance_curve
+
+
+def write_run(path, lengths, scores):
+    os.makedirs(path, exist_ok=True)
+    pd.DataFrame({'test/episode_score/mean': scores, 'test/episode_length/mean': lengths}).to_csv(
+        os.path.join(path, 'log.csv'), index=False)
+
+
+def make_runs(directory, offsets, epochs=300):
+    """Runs scoring `offset + steps / 1000`, evaluated on different step grids."""
+    paths = []
+    for seed, offset in enumerate(offsets):
+        lengths = np.full(epochs + seed * 50, 1000. + 100. * seed)
+        steps = np.cumsum(lengths)
+        scores = offset + steps / 1000
+        scores[::10] = np.nan  # Epochs logged before their test finished.
+        paths.append(os.path.join(directory, f'seed_{seed}'))
+        write_run(paths[-1], lengths, scores)
+    return paths
+
+
+def test_aggregate_runs_aligns_runs_on_common_steps(tmp_path):
+    paths = make_runs(str(tmp_path), offsets=[0., 10., 20., 30.])
+    aggregate = aggregate_runs(iter(paths), n_points=50, quantiles=(0., .5, 1.), n_bootstrap=500)
+
+    assert aggregate.steps.shape == aggregate.mean.shape == (50,)
+    assert np.all(np.diff(aggregate.steps) > 0)
+    assert aggregate.n_runs.max() == 4 and aggregate.n_runs[-1] == 1  # Only the longest run goes that far.
+    shared = aggregate.n_runs == 4
+    # Averaged down runs are linear in the steps, so the interpolation is exact up to the averaging.
+    np.testing.assert_allclose(aggregate.mean[shared], 15. + aggregate.steps[shared] / 1000, rtol=1e-2)
+    np.testing.assert_allclose(aggregate.quantiles[0.][shared], aggregate.steps[shared] / 1000, rtol=1e-2)
+    np.testing.assert_allclose(aggregate.quantiles[1.][shared], 30. + aggregate.steps[shared] / 1000, rtol=1e-2)
+    assert np.all(aggregate.ci_lower[shared] < aggregate.mean[shared])
+    assert np.all(aggregate.mean[shared] < aggregate.ci_upper[shared])
+
+
+def test_bootstrap_mean_ci_ignores_missing_runs():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(40, 3))
+    values[:20, 1] = np.nan
+    values[:, 2] = np.nan
+    lower, upper = bootstrap_mean_ci(values, confidence=.9, n_bootstrap=2000)
+    for column in range(2):
+        present = values[~np.isnan(values[:, column]), column]
+        standard_error = present.std() / np.sqrt(len(present))
+        np.testing.assert_allclose([lower[column], upper[column]],
+                                   present.mean() + np.array([-1.645, 1.645]) * standard_error, atol=.4 * standard_error)
+    assert np.isnan(lower[2]) and np.isnan(upper[2])
+
+
+def test_performance_curve_matches_plot_convention(tmp_path):
+    write_run(str(tmp_path), [10., 20., 30.], [1., 2., 3.])
+    steps, scores = performance_curve(str(tmp_path))
+    np.testing.assert_array_equal(steps, [10., 30., 60.])
+    np.testing.assert_array_equal(scores, [1., 2., 3.])
+    with pytest.raises(ValueError):
+        write_run(str(tmp_path / 'empty'), [10.], [np.nan])
+        aggregate_runs([str(tmp_path / 'empty')])
+
+
+def test_performance_curve_skips_pending_tests(tmp_path):
+    # NaN rows are stored by AsyncEvaluator.log while a test is still running.
+    write_run(str(tmp_path), [np.nan, 10., np.nan, 20., 30.], [np.nan, 1., np.nan, 2., 3.])
+    steps, scores = performance_curve(str(tmp_path))
+    np.testing.assert_array_equal(steps, [10., 30., 60.])
+    np.testing.assert_array_equal(scores, [1., 2., 3.])
+    aggregate = aggregate_runs([str(tmp_path)], n_points=3, n_bootstrap=10, log_steps=False)
+    np.testing.assert_allclose(aggregate.mean, np.interp(aggregate.steps, steps, scores))
+
+
+def test_plot_aggregated_performance(tmp_path):
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    pytest.importorskip('seaborn')
+    pytest.importorskip('networkx')
+    from cust_utils.plot import plot_aggregated_performance
+
+    groups = {'NCAP': make_runs(str(tmp_path / 'ncap'), [0., 1., 2.]),
+              'MLP': make_runs(str(tmp_path / 'mlp'), [5., 6.])}
+    aggregates = plot_aggregated_performance(groups, n_points=20)
+    assert [aggregates[label].n_runs.max() for label in groups] == [3, 2]
+    plot_aggregated_performance(aggregates, band='quantiles')
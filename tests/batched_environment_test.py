@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+
+from Agents import DeepControlSwimmer
+from tasks.batched_environment import BatchedSwimEnvironment
+
+
+def make_environment(n_environments=3, n_threads=None, time_limit=0.09):
+    return BatchedSwimEnvironment(
+        lambda: DeepControlSwimmer.swim(n_links=4, time_limit=time_limit), n_environments, n_threads)
+
+
+def test_start_and_step_shapes():
+    environment = make_environment()
+    environment.initialize(seed=0)
+    observations = environment.start()
+    assert observations.shape == (3,) + environment.observation_space.shape
+    assert environment.action_space.shape == (3,)
+    np.testing.assert_array_equal(observations[:, -1], -1)
+
+    observations, infos = environment.step(np.zeros((3, 3)))
+    assert infos['observations'].shape == observations.shape
+    assert infos['rewards'].shape == infos['resets'].shape == infos['terminations'].shape == (3,)
+    np.testing.assert_allclose(observations[:, -1], -1 + 2 / 3)
+
+
+def test_threads_match_sequential_stepping():
+    results = []
+    for n_threads in [1, 3]:
+        environment = make_environment(n_threads=n_threads)
+        environment.initialize(seed=1)
+        rollout = [environment.start()]
+        actions = np.random.RandomState(0).uniform(-1, 1, (5, 3, 3))
+        for action in actions:
+            observations, infos = environment.step(action)
+            rollout += [observations, infos['observations'], infos['rewards']]
+        environment.close()
+        results.append(rollout)
+    for sequential, threaded in zip(*results):
+        np.testing.assert_array_equal(sequential, threaded)
+
+
+def test_timeouts_reset_without_termination():
+    environment = make_environment(n_environments=2)
+    environment.initialize(seed=0)
+    environment.start()
+    for step in range(1, 4):
+        observations, infos = environment.step(np.zeros((2, 3)))
+        assert infos['resets'].all() == (step == 3)
+        assert not infos['terminations'].any()
+    np.testing.assert_array_equal(infos['observations'][:, -1], 1)
+    np.testing.assert_array_equal(observations[:, -1], -1)
@@ -0,0 +1,26 @@
+import json
+
+from benchmarks import suite
+
+
+def test_quick_run_is_json_serializable():
+    results = suite.run_suite(['forward', 'task'], quick=True)
+    loaded = json.loads(json.dumps(results))
+    ids = [case['id'] for case in loaded['results']]
+    assert len(ids) == len(set(ids))
+    assert 'forward/n_joints=5,batch_size=64,flags=default' in ids
+    assert 'task/environment=swim,stage=reward' in ids
+    for case in loaded['results']:
+        assert case['min_ms'] <= case['median_ms'] <= case['p90_ms']
+        assert case['throughput'] > 0
+    assert loaded['metadata']['versions']['numpy']
+
+
+def test_compare_results_flags_regressions():
+    run = lambda **medians: dict(results=[dict(id=case_id, median_ms=value) for case_id, value in medians.items()]
+                                 + [dict(id='ppo/skipped', skipped='tonic is not installed')])
+    baseline = run(a=1., b=1., c=1., gone=1.)
+    rows = suite.compare_results(run(a=1.05, b=1.5, c=.5, added=1.), baseline, threshold=.1)
+    status = {row['id']: row['status'] for row in rows}
+    assert status == dict(a='unchanged', b='regression', c='improvement', added='new', gone='missing')
+    assert [row['ratio'] for row in rows if row['id'] == 'b'] == [1.5]
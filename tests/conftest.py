@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def model_cache_dir(tmp_path_factory, monkeypatch):
+    """Keeps the on-disk compiled model cache of every test out of the home directory."""
+    cache_dir = tmp_path_factory.mktemp('model_cache')
+    monkeypatch.setenv('SWIMMER_MODEL_CACHE', str(cache_dir))
+    return cache_dir
@@ -0,0 +1,41 @@
+import numpy as np
+import torch
+
+import Agents.swimmer as swimmer
+from cust_utils.damping_utils import NCAP_damping, calculate_damping, set_joint_damping, set_swimmer_damping
+
+
+def test_calculate_damping_is_elementwise():
+    proximity = np.array([0., 2., 5., 7.])
+    expected = [calculate_damping(0.1, p) for p in proximity]
+    np.testing.assert_allclose(calculate_damping(0.1, proximity), expected)
+    np.testing.assert_allclose(calculate_damping(0.1, torch.as_tensor(proximity)).numpy(), expected)
+
+
+def test_ncap_damping_is_elementwise():
+    proximity = np.array([0., 1., 5., 5.5, 100.])
+    expected = [NCAP_damping(1, proximity=p) for p in proximity]
+    assert expected[-1] == 0.
+    np.testing.assert_allclose(NCAP_damping(1, proximity=proximity), expected)
+    torch_damping = NCAP_damping(1, proximity=torch.as_tensor(proximity, dtype=torch.float32))
+    assert torch.is_tensor(torch_damping)
+    np.testing.assert_allclose(torch_damping.numpy(), expected, rtol=1e-6)
+
+
+def test_bulk_swimmer_damping():
+    model_string, assets = swimmer.get_model_and_assets(4)
+    physics = swimmer.Physics.from_xml_string(model_string, assets=assets)
+    dof_indices = physics.layout.joint_dofs
+    assert dof_indices.shape == (2, 3)
+
+    set_joint_damping(physics, 0.)
+    set_swimmer_damping(physics, dof_indices, [0.5, 2.])
+    named_damping = physics.named.model.dof_damping
+    for swimmer_id, value in enumerate([0.5, 2.]):
+        for index in range(3):
+            assert named_damping[f'joint_{swimmer_id}_{index}'] == value
+    for root in ['rootx1', 'rooty1', 'rootz1', 'rootx2', 'rooty2', 'rootz2']:
+        assert named_damping[root] == 0.
+
+    set_swimmer_damping(physics, dof_indices, 3.)
+    assert (physics.model.dof_damping[dof_indices] == 3.).all()
@@ -1,16 +1,18 @@
 from cust_utils.video_utils import render
 from acme import wrappers
-from cust_utils.video_utils import display_video
+from cust_utils.video_utils import display_video, embed_video, VideoWriter
 import numpy as np
 
 """ Tests a DeepMind control suite environment by executing a series of random actions """
-def test_dm_control(env):
+def test_dm_control(env, stream=False, filename='output_videos/temp.mp4'):
     env = wrappers.CanonicalSpecWrapper(env, clip=True)
     env = wrappers.SinglePrecisionWrapper(env)
 
     spec = env.action_spec()
     timestep = env.reset()
-    frames = [render(env)]
+    # Streamed frames are encoded while the episode runs instead of being kept in memory.
+    frames = VideoWriter(filename) if stream else []
+    frames.append(render(env))
 
     for _ in range(60):
         action = np.random.uniform(low=spec.minimum, high=spec.maximum, size=spec.shape)
@@ -18,4 +20,7 @@ def test_dm_control(env):
         # set_joint_damping(physics, damping_value)
         timestep = env.step(action)
         frames.append(render(env))
-    return display_video(frames)
\ No newline at end of file
+    if stream:
+        frames.close()
+        return embed_video(filename)
+    return display_video(frames, filename)
\ No newline at end of file
@@ -0,0 +1,173 @@
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+pytest.importorskip('gym')
+
+from Agents import DeepControlSwimmer
+from cust_utils.evaluation import (AsyncEvaluator, CheckpointWatcher, evaluate_checkpoints, list_checkpoints,
+                                   run_test_episode)
+from tasks.batched_environment import BatchedSwimEnvironment
+from wrappers.FrozenActor import ActorMean, FrozenPolicy
+
+
+def environment_builder():
+    return BatchedSwimEnvironment(lambda: DeepControlSwimmer.swim(n_links=4, time_limit=0.3), 1)
+
+
+def make_actor():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Linear(3 + 12 + 1, 3), torch.nn.Tanh())
+
+
+class Logger:
+    def __init__(self):
+        self.rows = [{}]
+
+    def store(self, key, value, stats=False):
+        self.rows[-1].setdefault(key, []).append(value)
+
+    def dump(self):
+        self.rows.append({})
+
+
+def test_background_evaluation_matches_blocking_test():
+    actor = make_actor()
+    evaluator = AsyncEvaluator(actor, environment_builder, seeds=[0, 1], n_workers=2)
+    try:
+        snapshots = {}
+        for step in [100, 200]:
+            evaluator.submit(step)
+            snapshots[step] = copy.deepcopy(actor)
+            with torch.no_grad():
+                for parameter in actor.parameters():
+                    parameter.add_(1.)  # Training continues after the snapshot.
+
+        evaluations = evaluator.wait(timeout=60)
+        assert [evaluation.step for evaluation in evaluations] == [100, 200]
+        for evaluation in evaluations:
+            policy = FrozenPolicy(ActorMean(snapshots[evaluation.step]))
+            expected = [run_test_episode(policy, environment_builder(), seed) for seed in [0, 1]]
+            np.testing.assert_allclose(evaluation.scores, [score for score, _ in expected], rtol=1e-6)
+            np.testing.assert_array_equal(evaluation.lengths, [10, 10])
+            assert not evaluation.errors
+        assert evaluator.n_pending == 0
+    finally:
+        evaluator.close()
+
+
+def test_log_tags_scores_with_snapshot_step():
+    evaluator = AsyncEvaluator(make_actor(), environment_builder, seeds=[0, 1, 2])
+    try:
+        logger = Logger()
+        evaluator.log(logger)
+        assert np.isnan(logger.rows[0]['test/steps'][0])
+        logger.dump()
+
+        evaluator.submit(50)
+        evaluator.submit(150)
+        evaluator.finish(logger, timeout=60)
+    finally:
+        evaluator.close()
+    assert [row['test/steps'] for row in logger.rows[1:-1]] == [[50], [150]]
+    assert all(len(row['test/episode_score']) == 3 for row in logger.rows[1:-1])
+    assert not np.isnan(logger.rows[1]['test/episode_score']).any()
+
+
+class ConstantPolicy:
+    def __init__(self, value):
+        self.value = value
+
+    def test_step(self, observations, steps):
+        return np.full((len(observations), 3), self.value, np.float32)
+
+
+def load_constant_policy(path, step, observation_space, action_space):
+    with open(os.path.join(path, 'checkpoints', 'step_{}.pt'.format(step))) as checkpoint_file:
+        return ConstantPolicy(float(checkpoint_file.read()))
+
+
+def load_only_step_30(path, step, observation_space, action_space):
+    assert step == 30, 'step {} should come from the cache'.format(step)
+    return load_constant_policy(path, step, observation_space, action_space)
+
+
+def save_checkpoint(path, step, value):
+    os.makedirs(os.path.join(path, 'checkpoints'), exist_ok=True)
+    with open(os.path.join(path, 'checkpoints', 'step_{}.pt'.format(step)), 'w') as checkpoint_file:
+        checkpoint_file.write(str(value))
+
+
+def test_evaluate_checkpoints_caches_results_by_checkpoint_content(tmp_path):
+    path, cache_path = str(tmp_path / 'experiment'), str(tmp_path / 'evaluations.csv')
+    save_checkpoint(path, 10, 0.)
+    save_checkpoint(path, 20, .5)
+    with open(os.path.join(path, 'checkpoints', 'notes.txt'), 'w') as notes:
+        notes.write('not a checkpoint')
+    assert list(list_checkpoints(path)) == [10, 20]
+
+    def evaluate(policy_loader, checkpoints='all'):
+        return evaluate_checkpoints(
+            path, checkpoints, seeds=[0, 1], environment='swim-4', n_workers=2, cache_path=cache_path,
+            environment_builder=lambda environment: environment_builder(), policy_loader=policy_loader)
+
+    first = evaluate(load_constant_policy)
+    assert list(zip(first['step'], first['seed'])) == [(10, 0), (10, 1), (20, 0), (20, 1)]
+    assert (first['error'] == '').all() and (first['length'] == 10).all()
+    expected = run_test_episode(ConstantPolicy(.5), environment_builder(), 1)[0]
+    np.testing.assert_allclose(first['score'].iloc[3], expected, rtol=1e-6)
+
+    # Known checkpoints are read from the cache, only the new one is evaluated.
+    save_checkpoint(path, 30, 1.)
+    second = evaluate(load_only_step_30)
+    assert (second['error'] == '').all()
+    np.testing.assert_allclose(second['score'].iloc[:4], first['score'])
+    assert len(pd.read_csv(cache_path)) == 6
+
+    assert list(evaluate(load_only_step_30, 'last')['step']) == [30, 30]
+
+
+def test_checkpoint_watcher_evaluates_new_checkpoints_once(tmp_path):
+    path = str(tmp_path / 'experiment')
+
+    def make_watcher(policy_loader):
+        return CheckpointWatcher(path, seeds=[0, 1], environment='swim-4', poll_interval=.05,
+                                 environment_builder=lambda environment: environment_builder(),
+                                 policy_loader=policy_loader)
+
+    watcher = make_watcher(load_constant_policy)
+    try:
+        assert watcher.poll() == []  # Training has not saved anything yet.
+        save_checkpoint(path, 10, 0.)
+        assert watcher.poll() == []  # Not settled until unchanged at a second scan.
+        rows = watcher.wait(timeout=60)
+        assert [(row['step'], row['seed'], row['error']) for row in rows] == [(10, 0, ''), (10, 1, '')]
+
+        save_checkpoint(path, 20, .5)
+        watcher.close()
+        watcher.start()
+        workers = set(watcher._pool._processes)  # Forked before the thread, reused by its polls.
+        assert len(workers) == 1
+        watcher.stop()
+        assert set(watcher._pool._processes) == workers
+        assert watcher.n_pending == 0
+        results = watcher.results()
+        assert list(zip(results['step'], results['seed'])) == [(10, 0), (10, 1), (20, 0), (20, 1)]
+        assert (results['length'] == 10).all()
+    finally:
+        watcher.close()
+
+    # A restarted watcher reads the evaluated checkpoints from its results file.
+    save_checkpoint(path, 30, 1.)
+    watcher = make_watcher(load_only_step_30)
+    try:
+        rows = watcher.wait(timeout=60)
+    finally:
+        watcher.close()
+    assert [row['step'] for row in rows] == [10, 10, 20, 20, 30, 30]
+    assert all(row['error'] == '' for row in rows)
+    assert len(watcher.results()) == 6
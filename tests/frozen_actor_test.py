@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import torch
+
+tonic = pytest.importorskip('tonic.torch')
+
+from Agents.NCAPSwimmer import SwimmerModule
+from wrappers.ActorNCAP import SwimmerActor
+from wrappers.FrozenActor import freeze_actor
+
+
+class Space:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+@pytest.mark.parametrize('swimmer_kwargs', [
+    dict(),
+    dict(use_weight_sharing=False, use_weight_constant_init=False),
+    dict(use_weight_constraints=False, include_speed_control=False),
+])
+def test_frozen_swimmer_actor_matches_eager(swimmer_kwargs):
+    torch.manual_seed(0)
+    n_joints = 5
+    actor = SwimmerActor(
+        swimmer=SwimmerModule(n_joints=n_joints, **swimmer_kwargs),
+        distribution=lambda x: torch.distributions.normal.Normal(x, 0.1),
+    )
+    actor.initialize(Space((3 * n_joints + 1,)), Space((n_joints,)))
+
+    observations = np.random.RandomState(0).uniform(-1, 1, size=(4, 3 * n_joints + 1)).astype(np.float32)
+    policy = freeze_actor(actor, observations[:1])
+
+    with torch.no_grad():
+        expected = actor(torch.as_tensor(observations)).loc.numpy()
+    np.testing.assert_allclose(policy.test_step(observations, steps=0), expected, rtol=1e-6, atol=1e-6)
+
+
+def test_freeze_leaves_training_actor_untouched():
+    actor = SwimmerActor(swimmer=SwimmerModule(n_joints=4))
+    actor.initialize(Space((13,)), Space((4,)))
+    freeze_actor(actor, np.zeros((1, 13), np.float32))
+    assert actor.swimmer.timestep == 0
+    assert all(parameter.requires_grad for parameter in actor.parameters())
+
+
+def test_frozen_mlp_actor_matches_eager():
+    from wrappers.ActorCriticMLP import ppo_mlp_model
+
+    torch.manual_seed(0)
+    model = ppo_mlp_model()
+    model.initialize(Space((16,)), Space((5,)))
+
+    observations = np.random.RandomState(0).normal(size=(4, 16)).astype(np.float32)
+    policy = freeze_actor(model.actor, observations[:1])
+
+    with torch.no_grad():
+        expected = model.actor(torch.as_tensor(observations)).loc.numpy()
+    np.testing.assert_allclose(policy.test_step(observations, steps=0), expected, rtol=1e-6, atol=1e-6)
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cust_utils import log_reader
+from cust_utils.log_reader import downsample, read_log
+
+COLUMNS = ['test/episode_score/mean', 'test/episode_length/mean', 'train/steps']
+
+
+def write_rows(path, rows, mode='a'):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(
+        os.path.join(path, 'log.csv'), mode=mode, index=False, header=mode == 'w')
+
+
+def make_rows(start, n):
+    return [[float(i) if i % 7 else np.nan, 1000., 1000. * (i + 1)] for i in range(start, start + n)]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    log_reader.clear_memory_cache()
+    yield
+    log_reader.clear_memory_cache()
+
+
+def assert_matches_csv(path):
+    expected = pd.read_csv(os.path.join(path, 'log.csv'))
+    columns = read_log(str(path))
+    assert list(columns) == COLUMNS
+    for name in COLUMNS:
+        np.testing.assert_array_equal(columns[name], expected[name].to_numpy(float))
+
+
+def test_read_log_parses_only_new_rows(tmp_path):
+    write_rows(tmp_path, make_rows(0, 10), mode='w')
+    assert_matches_csv(tmp_path)
+
+    write_rows(tmp_path, make_rows(10, 5))
+    with open(tmp_path / 'log.csv', 'a') as log_file:
+        log_file.write('15.0,1000')  # The logger is still writing this row.
+    columns = read_log(str(tmp_path), ['train/steps'])
+    np.testing.assert_array_equal(columns['train/steps'], 1000. * np.arange(1, 16))
+    with pytest.raises(ValueError):
+        columns['train/steps'][0] = 0.
+
+    with open(tmp_path / 'log.csv', 'a') as log_file:
+        log_file.write('.0,16000.0\n')
+    assert read_log(str(tmp_path))['test/episode_score/mean'][-1] == 15.
+
+
+def test_read_log_restores_rows_from_sidecar(tmp_path, monkeypatch):
+    write_rows(tmp_path, make_rows(0, 20), mode='w')
+    read_log(str(tmp_path))
+    assert os.path.getsize(tmp_path / log_reader.SIDECAR_DATA) == 20 * len(COLUMNS) * 8
+
+    # A new process reads the cached rows from the sidecar and only parses the new ones.
+    log_reader.clear_memory_cache()
+    write_rows(tmp_path, make_rows(20, 3))
+    parsed = []
+    parse_rows = log_reader._parse_rows
+    monkeypatch.setattr(log_reader, '_parse_rows', lambda tail, names: parsed.append(parse_rows(tail, names)) or parsed[-1])
+    assert_matches_csv(tmp_path)
+    assert [len(rows) for rows in parsed] == [3]
+    assert os.path.getsize(tmp_path / log_reader.SIDECAR_DATA) == 23 * len(COLUMNS) * 8
+
+
+def test_read_log_detects_rewritten_log(tmp_path):
+    write_rows(tmp_path, make_rows(0, 20), mode='w')
+    read_log(str(tmp_path))
+    write_rows(tmp_path, make_rows(100, 30), mode='w')  # A new run in the same directory.
+    assert_matches_csv(tmp_path)
+    log_reader.clear_memory_cache()
+    write_rows(tmp_path, make_rows(200, 4), mode='w')
+    assert_matches_csv(tmp_path)
+
+
+def test_downsample_averages_runs_of_points():
+    x = np.arange(1, 10001, dtype=float)
+    y = np.where(np.arange(10000) % 2, np.nan, 1.)
+    short = x[:50]
+    assert downsample(short, y[:50], 100)[0] is short
+    for log in [False, True]:
+        x_down, y_down = downsample(x, y, 100, log=log)
+        assert len(x_down) <= 100
+        assert np.all(np.diff(x_down) > 0)
+        np.testing.assert_array_equal(y_down[np.isfinite(y_down)], 1.)
+    x_down, _ = downsample(x, y, 100, log=True)
+    assert x_down[0] == 1. and x_down[-1] > 9000.
+    np.testing.assert_allclose(downsample(x, x, 100)[0], downsample(x, x, 100)[1])
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+
+import Agents.swimmer as swimmer
+from Agents import model_cache
+
+
+def test_physics_from_cache_matches_xml(tmp_path):
+    model_cache.clear_memory_cache()
+    physics = swimmer.get_physics(5, cache_dir=str(tmp_path))
+    model_string, assets = swimmer.get_model_and_assets(5)
+    reference = swimmer.Physics.from_xml_string(model_string, assets=assets)
+    assert physics.model.nq == reference.model.nq
+    assert physics.named.data.xpos.axes.row.names == reference.named.data.xpos.axes.row.names
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_disk_cache_is_reused(tmp_path):
+    model_cache.clear_memory_cache()
+    swimmer.get_physics(4, cache_dir=str(tmp_path))
+    (cached_file,) = tmp_path.iterdir()
+
+    # A fresh process only has the on-disk model.
+    model_cache.clear_memory_cache()
+    calls = []
+    def get_model_and_assets():
+        calls.append(1)
+        return swimmer.get_model_and_assets(4)
+    physics = model_cache.load_physics(swimmer.Physics, 'fresh', get_model_and_assets, cache_dir=str(tmp_path))
+    assert calls == [1]
+    assert list(tmp_path.iterdir()) == [cached_file]
+    assert physics.model.nu == 6
+
+
+def test_cached_physics_have_independent_models(tmp_path):
+    model_cache.clear_memory_cache()
+    first = swimmer.get_physics(4, cache_dir=str(tmp_path))
+    second = swimmer.get_physics(4, cache_dir=str(tmp_path))
+    first.model.dof_damping[:] = 3.
+    np.testing.assert_array_equal(second.model.dof_damping, 0.)
+
+
+def test_disk_cache_follows_environment_variable(tmp_path, monkeypatch):
+    model_cache.clear_memory_cache()
+    monkeypatch.setenv('SWIMMER_MODEL_CACHE', str(tmp_path))
+    swimmer.get_physics(4)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    model_cache.clear_memory_cache()
+    monkeypatch.delenv('SWIMMER_MODEL_CACHE')
+    assert model_cache.default_cache_dir() is None
+    swimmer.get_physics(5)
+    assert len(list(tmp_path.iterdir())) == 1
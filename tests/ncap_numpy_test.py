@@ -0,0 +1,108 @@
+import itertools
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+from Agents.NCAPSwimmer import SwimmerModule
+from Agents.NCAPSwimmerNumpy import NumpySwimmerActor, NumpySwimmerModule
+from wrappers.ActorNCAP import SwimmerActor
+
+FLAGS = ('use_weight_sharing', 'use_weight_constraints', 'include_proprioception',
+         'include_head_oscillators', 'include_speed_control', 'include_turn_control')
+
+
+def make_inputs(n_joints, batch_size=8, seed=0):
+    random = np.random.RandomState(seed)
+    return dict(
+        joint_pos=random.uniform(-1.2, 1.2, (batch_size, n_joints)).astype(np.float32),
+        right_control=random.uniform(0, 1, (batch_size, 1)).astype(np.float32),
+        left_control=random.uniform(0, 1, (batch_size, 1)).astype(np.float32),
+        speed_control=random.uniform(0, 1, (batch_size, 1)).astype(np.float32),
+        timesteps=random.uniform(0, 1000, (batch_size, 1)).astype(np.float32),
+    )
+
+
+@pytest.mark.parametrize('flags', list(itertools.product([False, True], repeat=len(FLAGS))))
+@pytest.mark.parametrize('n_joints, n_turn_joints', [(2, 1), (6, 2)])
+def test_numpy_module_matches_torch(flags, n_joints, n_turn_joints):
+    torch.manual_seed(0)
+    swimmer = SwimmerModule(n_joints, n_turn_joints=n_turn_joints, use_weight_constant_init=False,
+                            **dict(zip(FLAGS, flags)))
+    numpy_swimmer = NumpySwimmerModule.from_torch(swimmer)
+    inputs = make_inputs(n_joints)
+    for proximity, use_timesteps in [(1, True), (0.5, False), (3, False), (1, True)]:
+        kwargs = dict(inputs, proximity=proximity)
+        if not use_timesteps:
+            kwargs['timesteps'] = None
+        with torch.no_grad():
+            expected = swimmer(**{k: torch.as_tensor(v) if isinstance(v, np.ndarray) else v
+                                  for k, v in kwargs.items()}).numpy()
+        np.testing.assert_allclose(numpy_swimmer(**kwargs), expected, rtol=1e-6, atol=1e-6)
+    assert numpy_swimmer.timestep == swimmer.timestep
+
+
+def test_numpy_module_matches_torch_with_proximity_per_row():
+    torch.manual_seed(0)
+    swimmer = SwimmerModule(5, use_weight_constant_init=False)
+    numpy_swimmer = NumpySwimmerModule.from_torch(swimmer)
+    inputs = make_inputs(5)
+    # Continuous distances, including some beyond the damping threshold.
+    proximity = np.linspace(.5, 7, 8).astype(np.float32)
+    for timesteps in [inputs['timesteps'], None]:
+        kwargs = dict(inputs, timesteps=timesteps)
+        with torch.no_grad():
+            expected = swimmer(**{k: torch.as_tensor(v) for k, v in kwargs.items() if v is not None},
+                               proximity=torch.as_tensor(proximity)).numpy()
+        np.testing.assert_allclose(numpy_swimmer(**kwargs, proximity=proximity), expected, rtol=1e-6, atol=1e-6)
+
+
+def test_load_state_dict_of_numpy_arrays():
+    swimmer = SwimmerModule(4, use_weight_sharing=False, use_weight_constant_init=False)
+    state_dict = {k: v.numpy() for k, v in swimmer.state_dict().items()}
+    numpy_swimmer = NumpySwimmerModule(4, use_weight_sharing=False, state_dict=state_dict)
+    joint_pos = np.linspace(-1, 1, 4, dtype=np.float32)
+    with torch.no_grad():
+        expected = swimmer(torch.as_tensor(joint_pos)).numpy()
+    np.testing.assert_allclose(numpy_swimmer(joint_pos), expected, rtol=1e-6, atol=1e-6)
+
+
+class Space:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+@pytest.mark.parametrize('proximity_index', [None, -2])
+def test_numpy_actor_matches_torch_actor(proximity_index):
+    torch.manual_seed(0)
+    actor = SwimmerActor(swimmer=SwimmerModule(5, use_weight_constant_init=False), proximity_index=proximity_index)
+    actor.initialize(Space((17,)), Space((5,)))
+    numpy_actor = NumpySwimmerActor.from_torch(actor)
+
+    observations = np.random.RandomState(0).uniform(-1, 1, (4, 17)).astype(np.float32)
+    # Proximities of the agents, below and beyond the damping threshold.
+    observations[:, -2] = [.5, 2, 4, 8]
+    with torch.no_grad():
+        expected = actor(torch.as_tensor(observations)).numpy()
+    np.testing.assert_allclose(numpy_actor.test_step(observations), expected, rtol=1e-6, atol=1e-6)
+    if proximity_index is not None:
+        # Ignoring the observed proximity gives other actions.
+        ignoring = NumpySwimmerActor(NumpySwimmerModule.from_torch(actor.swimmer), action_size=5)
+        assert not np.allclose(ignoring.test_step(observations), expected)
+
+
+def test_controllers_are_not_exported():
+    actor = SwimmerActor(swimmer=SwimmerModule(5, include_speed_control=True), controller=torch.nn.Identity())
+    actor.initialize(Space((17,)), Space((5,)))
+    with pytest.raises(ValueError, match='controller'):
+        NumpySwimmerActor.from_torch(actor)
+    # Without the controller's signals, the controlled circuit cannot run either.
+    with pytest.raises(ValueError, match='speed_control'):
+        NumpySwimmerModule.from_torch(actor.swimmer)(np.zeros(5, np.float32))
+
+
+def test_numpy_module_does_not_import_torch():
+    code = 'import sys, Agents.NCAPSwimmerNumpy; assert "torch" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], check=True)
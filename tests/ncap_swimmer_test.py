@@ -0,0 +1,106 @@
+import itertools
+
+import numpy as np
+import pytest
+import torch
+
+from Agents.NCAPSwimmer import SwimmerModule
+from cust_utils.activity_recorder import ActivityRecorder
+
+FLAGS = ('use_weight_sharing', 'use_weight_constraints', 'use_weight_constant_init', 'include_proprioception',
+         'include_head_oscillators', 'include_speed_control', 'include_turn_control')
+
+
+def make_pair(n_joints, **kwargs):
+    """Returns a loop and a vectorized SwimmerModule with identical weights."""
+    loop = SwimmerModule(n_joints, vectorized=False, activity_recorder=ActivityRecorder('full'), **kwargs)
+    vectorized = SwimmerModule(n_joints, vectorized=True, activity_recorder=ActivityRecorder('full'), **kwargs)
+    vectorized.load_state_dict(loop.state_dict())
+    return loop, vectorized
+
+
+def make_inputs(n_joints, batch_size=(8,), seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    rand = lambda *shape: torch.rand(*batch_size, *shape, generator=generator)
+    return dict(
+        joint_pos=rand(n_joints) * 2.4 - 1.2,
+        right_control=rand(1),
+        left_control=rand(1),
+        speed_control=rand(1),
+        timesteps=rand(1) * 1000,
+    )
+
+
+@pytest.mark.parametrize('flags', list(itertools.product([False, True], repeat=len(FLAGS))))
+@pytest.mark.parametrize('n_joints, n_turn_joints', [(2, 1), (5, 2), (12, 1)])
+def test_vectorized_forward_matches_loop(flags, n_joints, n_turn_joints):
+    torch.manual_seed(0)
+    loop, vectorized = make_pair(n_joints, n_turn_joints=n_turn_joints, **dict(zip(FLAGS, flags)))
+    inputs = make_inputs(n_joints)
+    for use_timesteps in (True, False, False):
+        kwargs = dict(inputs) if use_timesteps else dict(inputs, timesteps=None)
+        expected = loop(**kwargs)
+        actual = vectorized(**kwargs)
+        assert actual.shape == expected.shape
+        assert torch.equal(actual, expected)
+    assert vectorized.timestep == loop.timestep
+    np.testing.assert_array_equal(vectorized.recorder.as_array(), loop.recorder.as_array())
+
+
+def test_vectorized_gradients_match_loop():
+    torch.manual_seed(0)
+    loop, vectorized = make_pair(6, use_weight_sharing=False, use_weight_constant_init=False,
+                                 include_speed_control=True, include_turn_control=True)
+    inputs = make_inputs(6, batch_size=(4, 3))
+    loop(**inputs).square().sum().backward()
+    vectorized(**inputs).square().sum().backward()
+    # Batch reductions in the backward pass may be summed in a different order.
+    for (name, expected), actual in zip(loop.named_parameters(), vectorized.parameters()):
+        torch.testing.assert_close(actual.grad, expected.grad, msg=name)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('use_weight_sharing', [False, True])
+def test_shared_weights_across_agents(vectorized, use_weight_sharing):
+    torch.manual_seed(0)
+    n_agents, n_joints = 3, 5
+    swimmer = SwimmerModule(n_joints, use_weight_sharing=use_weight_sharing, use_weight_constant_init=False,
+                            vectorized=vectorized)
+    inputs = make_inputs(n_joints, batch_size=(4, n_agents))
+    proximity = torch.tensor([0.5, 1., 4.])
+
+    actual = swimmer(proximity=proximity, **inputs)
+    assert actual.shape == (4, n_agents, n_joints)
+    for agent in range(n_agents):
+        expected = swimmer(proximity=proximity[agent].item(),
+                           **{key: value[:, agent] for key, value in inputs.items()})
+        torch.testing.assert_close(actual[:, agent], expected)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('use_weight_sharing', [False, True])
+def test_per_agent_weights(vectorized, use_weight_sharing):
+    torch.manual_seed(0)
+    n_agents, n_joints = 3, 4
+    kwargs = dict(use_weight_sharing=use_weight_sharing, use_weight_constant_init=False,
+                  include_speed_control=True, include_turn_control=True, vectorized=vectorized)
+    swimmer = SwimmerModule(n_joints, n_agents=n_agents, **kwargs)
+    inputs = make_inputs(n_joints, batch_size=(2, n_agents))
+    proximity = torch.tensor([1., 2., 3.])
+
+    actual = swimmer(proximity=proximity, **inputs)
+    assert actual.shape == (2, n_agents, n_joints)
+    for agent in range(n_agents):
+        single = SwimmerModule(n_joints, **kwargs)
+        single.load_state_dict({key: value[agent] for key, value in swimmer.state_dict().items()})
+        expected = single(proximity=proximity[agent].item(), **{key: value[:, agent] for key, value in inputs.items()})
+        torch.testing.assert_close(actual[:, agent], expected)
+
+
+def test_no_damping_above_threshold():
+    swimmer = SwimmerModule(3)
+    far = swimmer(torch.zeros(2, 3), proximity=torch.tensor([1., 6.]))
+    swimmer.reset()
+    undamped = swimmer(torch.zeros(3), proximity=float('inf'))
+    assert not torch.equal(far[0], undamped)
+    assert torch.equal(far[1], undamped)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+pytest.importorskip('networkx')
+pytest.importorskip('seaborn')
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.colors import to_hex
+
+from cust_utils.plot import draw_network, network_layout
+
+
+def drawn_edges(ax):
+    """Returns {((x0, y0), (x1, y1)): color} of the edges drawn on `ax`."""
+    edges = {}
+    for patch in ax.patches:  # The arrows of networkx.
+        key = tuple(map(tuple, np.round(patch._posA_posB, 6)))
+        edges[key] = to_hex(patch.get_edgecolor())
+    for collection in ax.collections:
+        if isinstance(collection, LineCollection):
+            colors = collection.get_edgecolors()
+            for k, segment in enumerate(collection.get_segments()):
+                key = tuple(map(tuple, np.round(segment[[0, -1]], 6)))
+                edges[key] = to_hex(colors[k % len(colors)])
+    return edges
+
+
+@pytest.mark.parametrize('mode', ['NCAP', 'MLP'])
+@pytest.mark.parametrize('flags', [(False, False), (True, True)])
+def test_network_layout_matches_networkx_drawing(mode, flags):
+    fig, ax = plt.subplots()
+    draw_network(mode, 3, *flags, backend='networkx')
+    nodes = [collection for collection in ax.collections if isinstance(collection, PathCollection)][0]
+    expected_edges = drawn_edges(ax)
+    plt.close(fig)
+
+    layout = network_layout(mode, 3, *flags)
+    assert len(layout.names) == len(layout.plain_names) == len(layout.positions)
+    assert sorted(map(tuple, nodes.get_offsets())) == sorted(map(tuple, layout.positions))
+    edges = {tuple(map(tuple, np.round(layout.positions[edge], 6))): to_hex(color)
+             for edge, color in zip(layout.edges, layout.edge_colors)}
+    assert edges == expected_edges
+
+
+def test_draw_network_caches_layout_and_decimates():
+    assert network_layout('MLP', 20, True, False) is network_layout('MLP', 20, True, False)
+    layout = network_layout('NCAP', 20, True, True)
+    with pytest.raises(ValueError):
+        layout.positions[0, 0] = 0.
+
+    assert layout.plain_names[:8] == ('1-s', 'r', 'l', 'o', 'oᵈ', 'oᵛ', 'q₁', 'qᵈ₁')
+    assert layout.plain_names[-1] == 'q̈₂₀'
+
+    fig, ax = plt.subplots()
+    draw_network('NCAP', 20, True, True, ax=ax, max_edge_labels=30)
+    assert len(ax.texts) == 30
+    labels = ax.collections[-1]
+    assert len(labels.get_paths()) == len(layout.names)
+    np.testing.assert_array_equal(labels.get_offsets(), layout.positions)
+    x_min, x_max = ax.get_xlim()
+    assert x_min < 1 and 3 < x_max < 4  # Label outlines do not count in the data limits.
+    plt.close(fig)
+
+    fig, ax = plt.subplots()
+    draw_network('MLP', 20, ax=ax, max_edges=500, math_labels=True)
+    assert len(ax.collections[0].get_segments()) == 500
+    assert not ax.texts
+    fig.canvas.draw()
+    plt.close(fig)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import torch
+
+import Agents.swimmer as swimmer
+from Agents.NCAPSwimmer import SwimmerModule
+from tasks.forwards_tasks import Swim
+
+
+def make_physics(n_bodies=4):
+    model_string, assets = swimmer.get_model_and_assets(n_bodies)
+    return swimmer.Physics.from_xml_string(model_string, assets=assets)
+
+
+def test_nearest_neighbour_distances():
+    positions = np.array([[0., 0., 0.], [3., 4., 0.], [0., 1., 0.]])
+    np.testing.assert_allclose(swimmer.nearest_neighbour_distances(positions), [1., np.sqrt(18.), 1.])
+    np.testing.assert_allclose(swimmer.nearest_neighbour_distances(positions[:1]), [swimmer._MAX_PROXIMITY])
+
+
+def test_physics_proximities():
+    physics = make_physics()
+    physics.forward()
+    head_ids = physics.layout.head_bodies
+    assert [physics.model.id2name(body_id, 'body') for body_id in head_ids] == ['head1', 'head2']
+    np.testing.assert_allclose(physics.proximities(), [0.5, 0.5])
+
+
+def test_swim_observes_proximity():
+    physics = make_physics()
+    task = Swim(observe_proximity=True, random=0)
+    task.initialize_episode(physics)
+    observation = task.get_observation(physics)
+    assert list(observation) == ['joints', 'body_velocities', 'proximity']
+    np.testing.assert_allclose(observation['proximity'], physics.proximities())
+    assert 'proximity' not in Swim(random=0).get_observation(physics)
+
+
+def test_actor_reads_proximity_from_observations():
+    ActorNCAP = pytest.importorskip('wrappers.ActorNCAP')
+
+    class Space:
+        def __init__(self, shape):
+            self.shape = shape
+
+    actor = ActorNCAP.SwimmerActor(swimmer=SwimmerModule(n_joints=3), proximity_index=-2)
+    actor.initialize(Space((8,)), Space((3,)))
+    observations = torch.zeros(2, 8)
+    observations[:, -2] = torch.tensor([1., 8.])
+    actions = actor(observations)
+    far = actor(observations[1:], proximity=float('inf'))
+    assert not torch.equal(actions[0], far[0])
+    assert torch.equal(actions[1], far[0])
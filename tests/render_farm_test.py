@@ -0,0 +1,46 @@
+import functools
+import os
+
+import imageio
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+
+if os.environ.get('MUJOCO_GL') not in ('egl', 'osmesa'):
+    pytest.skip('Rendering workers need MUJOCO_GL=egl or osmesa.', allow_module_level=True)
+
+from Agents import DeepControlSwimmer
+from cust_utils.render_farm import render_checkpoints
+
+
+class ConstantPolicy:
+    def __init__(self, value, action_space):
+        self.action = np.full(action_space.shape, value, np.float32)
+
+    def test_step(self, observations, steps):
+        return np.tile(self.action, (len(observations), 1))
+
+
+def load_constant_policy(checkpoint, observation_space, action_space):
+    return ConstantPolicy(checkpoint, action_space)
+
+
+def test_render_checkpoints_writes_one_video_per_checkpoint_seed_and_camera(tmp_path):
+    cameras = ['tracking1', 'eyes']
+    paths = render_checkpoints(
+        {'still': 0., 'bent': .5}, seeds=[0, 1], cameras=cameras, output_dir=str(tmp_path),
+        environment_builder=functools.partial(DeepControlSwimmer.swim, n_links=4, time_limit=.3),
+        policy_loader=load_constant_policy, width=96, height=64, frame_skip=2, n_workers=2,
+        gl_backend=os.environ['MUJOCO_GL'])
+
+    assert sorted(paths) == sorted((label, seed, camera) for label in ['still', 'bent']
+                                   for seed in [0, 1] for camera in cameras)
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths.values())
+    assert paths['bent', 1, 'eyes'] == os.path.join(str(tmp_path), 'bent_seed1_eyes.mp4')
+    steps = int(round(.3 / DeepControlSwimmer.swim(n_links=4).control_timestep()))
+    for path in paths.values():
+        with imageio.get_reader(path) as reader:
+            frames = [frame for frame in reader]
+        assert len(frames) == len(range(0, steps + 1, 2))
+        assert frames[0].shape == (64, 96, 3)
@@ -0,0 +1,76 @@
+import functools
+import os
+import signal
+
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+
+from Agents import DeepControlSwimmer
+from tasks.batched_environment import BatchedSwimEnvironment
+from tasks.shared_memory_environment import SharedMemorySwimEnvironment
+
+
+def builder():
+    return DeepControlSwimmer.swim(n_links=4, time_limit=0.09)
+
+
+@pytest.fixture
+def environment():
+    environment = SharedMemorySwimEnvironment(builder, 4, n_workers=2, poll_interval=.1)
+    yield environment
+    environment.close()
+
+
+def test_matches_batched_environment(environment):
+    reference = BatchedSwimEnvironment(builder, 4)
+    environment.initialize(seed=3)
+    reference.initialize(seed=3)
+    np.testing.assert_array_equal(environment.start(), reference.start())
+    for actions in np.random.RandomState(0).uniform(-1, 1, (4, 4, 3)).astype(np.float32):
+        observations, infos = environment.step(actions)
+        expected_observations, expected_infos = reference.step(actions)
+        np.testing.assert_array_equal(observations, expected_observations)
+        for key in expected_infos:
+            np.testing.assert_array_equal(infos[key], expected_infos[key])
+
+
+def test_crashed_worker_is_restarted(environment):
+    environment.initialize(seed=0)
+    environment.start()
+    environment.step(np.zeros((4, 3)))
+    os.kill(environment._workers[1].pid, signal.SIGKILL)
+    with pytest.warns(UserWarning, match='worker 1'):
+        observations, infos = environment.step(np.zeros((4, 3)))
+    assert environment.restarts == 1
+    np.testing.assert_array_equal(infos['resets'], [False, False, True, True])
+    assert not infos['terminations'].any()
+    np.testing.assert_array_equal(observations[2:, -1], -1)
+
+    observations, infos = environment.step(np.zeros((4, 3)))
+    assert infos['resets'].tolist() == [True, True, False, False]
+
+
+def failing_builder(flag_path):
+    """Builds environments until `flag_path` exists, then exits like a crashed worker."""
+    if os.path.exists(flag_path):
+        os._exit(3)
+    return builder()
+
+
+def test_restarts_are_bounded(tmp_path):
+    flag_path = str(tmp_path / 'fail')
+    environment = SharedMemorySwimEnvironment(functools.partial(failing_builder, flag_path), 2, n_workers=2,
+                                              poll_interval=.1, max_restarts=2)
+    try:
+        environment.initialize(seed=0)
+        environment.start()
+        open(flag_path, 'w').close()
+        os.kill(environment._workers[0].pid, signal.SIGKILL)
+        with pytest.warns(UserWarning, match='worker 0'):
+            with pytest.raises(RuntimeError, match='worker 0 died 2 times.*exit code 3'):
+                environment.step(np.zeros((2, 3)))
+        assert environment.restarts == 2
+    finally:
+        environment.close()
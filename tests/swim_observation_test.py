@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from dm_control.rl import control
+from dm_control.suite import swimmer as dm_swimmer
+from dm_control.utils import rewards
+
+import Agents.swimmer as swimmer
+from Agents import DeepControlSwimmer
+from tasks.forwards_tasks import Swim, _SWIM_SPEED
+
+
+def make_physics(n_bodies=4, scene='swimmer.xml'):
+    model_string, assets = swimmer.get_model_and_assets(n_bodies, scene)
+    return swimmer.Physics.from_xml_string(model_string, assets=assets)
+
+
+@pytest.mark.parametrize('observe_proximity', [False, True])
+def test_per_agent_observations_match_scene_observation(observe_proximity):
+    physics = make_physics(4, swimmer.SwimmerScene(3))
+    task = Swim(observe_proximity=observe_proximity, per_agent=True, random=0)
+    task.initialize_episode(physics)
+    physics.data.qvel[:] = np.random.RandomState(0).randn(physics.model.nv)
+    physics.step()
+    observation = task.get_observation(physics)
+
+    reference = Swim(random=0).get_observation(physics)
+    expected = [reference['joints'].reshape(3, -1), reference['body_velocities'].reshape(3, -1)]
+    if observe_proximity:
+        expected.append(physics.proximities()[:, None])
+    assert list(observation) == ['agents']
+    np.testing.assert_array_equal(observation['agents'], np.concatenate(expected, axis=1))
+
+
+def test_per_agent_buffer_is_reused_within_episode():
+    physics = make_physics()
+    task = Swim(per_agent=True, observation_views=True, observe_proximity=True, random=0)
+    task.initialize_episode(physics)
+    first = task.get_observation(physics)
+    physics.step()
+    second = task.get_observation(physics)
+    assert first is second
+    assert list(second) == ['joints', 'body_velocities', 'proximity']
+    assert second['joints'].shape == (2, 3) and second['body_velocities'].shape == (2, 12)
+    for view in second.values():
+        assert np.shares_memory(view, task.agent_observations)
+    np.testing.assert_array_equal(second['joints'].ravel(), physics.joints())
+
+
+def test_per_agent_dm_control_environment():
+    physics = dm_swimmer.Physics.from_xml_string(*dm_swimmer.get_model_and_assets(5))
+    env = control.Environment(physics, Swim(per_agent=True, random=0))
+    time_step = env.reset()
+    assert env.observation_spec()['agents'].shape == (1, 4 + 15)
+    np.testing.assert_array_equal(time_step.observation['agents'][0, :4], physics.joints())
+    np.testing.assert_array_equal(time_step.observation['agents'][0, 4:], physics.body_velocities())
+
+
+def swim_reward(forward_velocity):
+    return rewards.tolerance(forward_velocity, bounds=(_SWIM_SPEED, float('inf')), margin=_SWIM_SPEED,
+                             value_at_margin=0., sigmoid='linear')
+
+
+def test_per_agent_rewards_match_each_swimmer():
+    physics = make_physics(4, swimmer.SwimmerScene(5))
+    task = Swim(per_agent=True, random=0)
+    task.initialize_episode(physics)
+    physics.data.qvel[:] = np.random.RandomState(0).randn(physics.model.nv) * .3
+    physics.forward()
+    agent_rewards = task.get_reward(physics)
+    assert agent_rewards.shape == (5,)
+    sensordata = physics.named.data.sensordata
+    expected = [swim_reward(-sensordata['head{}_vel'.format(k)][1]) for k in range(1, 6)]
+    np.testing.assert_allclose(agent_rewards, expected)
+    assert len(set(agent_rewards.round(6))) > 1
+
+    # Without per_agent, the reward of the first swimmer.
+    scalar_task = Swim(random=0)
+    scalar_task.initialize_episode(physics)
+    assert scalar_task.get_reward(physics) == agent_rewards[0]
+
+
+def test_scalar_reward_of_dm_control_swimmer_is_unchanged():
+    physics = dm_swimmer.Physics.from_xml_string(*dm_swimmer.get_model_and_assets(5))
+    env = control.Environment(physics, Swim(random=0))
+    env.reset()
+    for _ in range(5):
+        time_step = env.step(np.full(4, .5))
+        assert isinstance(time_step.reward, float)
+        assert time_step.reward == swim_reward(-physics.named.data.sensordata['head_vel'][1])
+
+
+def test_per_agent_target_rewards():
+    physics = make_physics(4, swimmer.SwimmerScene(3))
+    task = swimmer.Swimmer(per_agent=True, random=0)
+    task.initialize_episode(physics)
+    agent_rewards = task.get_reward(physics)
+
+    # Swimmers move in the plane, so the distance in the head frame is the planar distance.
+    geom_xpos = physics.named.data.geom_xpos
+    target_size = physics.named.model.geom_size['target', 0]
+    expected = [rewards.tolerance(np.linalg.norm((geom_xpos['target'] - geom_xpos['nose{}'.format(k)])[:2]),
+                                  bounds=(0, target_size), margin=5 * target_size, sigmoid='long_tail')
+                for k in range(1, 4)]
+    assert agent_rewards.shape == (3,)
+    np.testing.assert_allclose(agent_rewards, expected)
+    assert len(set(agent_rewards.round(6))) > 1
+    assert swimmer.Swimmer(random=0).get_reward(physics) == agent_rewards[0]
+
+
+def test_reward_spec_matches_rewards():
+    environment = swimmer.swimmer(4, scene=swimmer.SwimmerScene(3), per_agent=True, random=0)
+    environment.reset()
+    time_step = environment.step(np.zeros(environment.action_spec().shape))
+    assert environment.reward_spec().shape == time_step.reward.shape == (3,)
+    environment.reward_spec().validate(time_step.reward)
+
+    # Swim on the dm_control swimmer, without and with per_agent.
+    assert DeepControlSwimmer.swim(n_links=5).reward_spec().shape == ()
+    environment = DeepControlSwimmer.swim(n_links=5, per_agent=True, random=0)
+    environment.reset()
+    time_step = environment.step(np.zeros(4))
+    assert environment.reward_spec().shape == time_step.reward.shape == (1,)
@@ -0,0 +1,63 @@
+import numpy as np
+from dm_control.suite import swimmer as dm_swimmer
+
+import Agents.swimmer as swimmer
+
+
+def make_physics(n_bodies=4, scene='swimmer.xml'):
+    model_string, assets = swimmer.get_model_and_assets(n_bodies, scene)
+    physics = swimmer.Physics.from_xml_string(model_string, assets=assets)
+    random = np.random.RandomState(0)
+    physics.data.qpos[:] = random.uniform(-.3, .3, physics.model.nq)
+    physics.data.qvel[:] = random.randn(physics.model.nv)
+    physics.forward()
+    return physics
+
+
+def test_layout_indices_every_swimmer():
+    physics = make_physics(4, swimmer.SwimmerScene(3, 'grid'))
+    layout = physics.layout
+    assert (layout.n_swimmers, layout.n_joints) == (3, 3)
+    np.testing.assert_array_equal(
+        layout.joint_dofs, [[physics.named.model.jnt_dofadr[f'joint_{b}_{i}'] for i in range(3)] for b in range(3)])
+    for b in range(3):
+        k = b + 1
+        np.testing.assert_array_equal(
+            physics.joints().reshape(3, -1)[b],
+            [physics.named.data.qpos[f'joint_{b}_{i}'][0] for i in range(3)])
+        np.testing.assert_array_equal(physics.data.sensordata[layout.head_vel[b]],
+                                      physics.named.data.sensordata[f'head{k}_vel'])
+        expected = physics.named.data.geom_xpos['target'] - physics.named.data.geom_xpos[f'nose{k}']
+        expected = expected.dot(physics.named.data.xmat[f'head{k}'].reshape(3, 3))[:2]
+        np.testing.assert_allclose(physics.nose_to_target()[b], expected)
+
+        velocities = physics.body_velocities().reshape(3, 4, 3)[b]
+        names = [(f'head{k}_vel', f'head{k}_gyro')] + [(f'velocimeter_{b}_{i}', f'gyro_{b}_{i}') for i in range(3)]
+        for body, (velocimeter, gyro) in enumerate(names):
+            np.testing.assert_array_equal(velocities[body, :2], physics.named.data.sensordata[velocimeter][:2])
+            assert velocities[body, 2] == physics.named.data.sensordata[gyro][2]
+
+
+def test_joints_exclude_second_swimmer_root():
+    physics = make_physics()
+    assert physics.joints().shape == (6,)
+    root_qpos = [physics.model.jnt_qposadr[physics.model.name2id(f'root{axis}2', 'joint')] for axis in 'xyz']
+    assert not set(root_qpos) & set(physics.layout.joint_qpos.ravel())
+
+
+def test_layout_matches_dm_control_swimmer():
+    reference = dm_swimmer.Physics.from_xml_string(*dm_swimmer.get_model_and_assets(5))
+    reference.data.qvel[:] = np.random.RandomState(0).randn(reference.model.nv)
+    reference.forward()
+    physics = swimmer.Physics.from_model(reference.model)
+    physics.data.qvel[:] = reference.data.qvel
+    physics.forward()
+    np.testing.assert_array_equal(physics.joints(), reference.joints())
+    np.testing.assert_array_equal(physics.body_velocities(), reference.body_velocities())
+    np.testing.assert_allclose(physics.nose_to_target()[0], reference.nose_to_target())
+
+
+def test_get_physics_shares_layout(tmp_path):
+    first = swimmer.get_physics(4, cache_dir=str(tmp_path))
+    second = swimmer.get_physics(4, cache_dir=str(tmp_path))
+    assert first.layout is second.layout
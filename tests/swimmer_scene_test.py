@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import Agents.swimmer as swimmer
+
+
+def make_physics(scene, n_bodies=4):
+    model_string, assets = swimmer.get_model_and_assets(n_bodies, scene)
+    return swimmer.Physics.from_xml_string(model_string, assets=assets)
+
+
+@pytest.mark.parametrize('layout', ['line', 'grid', 'circle'])
+def test_spawn_positions_are_spaced(layout):
+    positions = swimmer.spawn_positions(9, layout, spacing=.5)
+    assert positions.shape == (9, 2)
+    nearest = swimmer.nearest_neighbour_distances(np.pad(positions, ((0, 0), (0, 1))))
+    np.testing.assert_allclose(nearest, .5)
+
+
+def test_spawn_positions_rejects_unknown_layout():
+    with pytest.raises(ValueError):
+        swimmer.spawn_positions(2, 'spiral')
+
+
+def test_generated_scene_matches_swimmer_xml():
+    physics = make_physics(swimmer.SwimmerScene(2, lights=True, cameras=True))
+    reference = make_physics('swimmer.xml')
+    physics.forward()
+    reference.forward()
+    for axis, size in [('body', 'nbody'), ('geom', 'ngeom'), ('joint', 'njnt'), ('actuator', 'nu'),
+                       ('camera', 'ncam'), ('light', 'nlight')]:
+        names = [physics.model.id2name(i, axis) for i in range(getattr(physics.model, size))]
+        assert names == [reference.model.id2name(i, axis) for i in range(getattr(reference.model, size))]
+    np.testing.assert_allclose(physics.data.xpos, reference.data.xpos)
+
+
+def test_generated_scene_names_and_sensors():
+    n_swimmers = 5
+    physics = make_physics(swimmer.SwimmerScene(n_swimmers, 'grid'))
+    head_ids = physics.layout.head_bodies
+    assert [physics.model.id2name(i, 'body') for i in head_ids] == [f'head{k}' for k in range(1, n_swimmers + 1)]
+    assert physics.layout.joint_dofs.shape == (n_swimmers, 3)
+    assert physics.model.nlight == 1 and physics.model.ncam == 1
+
+    sensors = [physics.model.id2name(i, 'sensor') for i in range(physics.model.nsensor)]
+    head_sensors = [name for k in range(1, n_swimmers + 1)
+                    for name in [f'nose{k}_pos', f'head{k}_xaxis', f'head{k}_yaxis', f'head{k}_vel', f'head{k}_gyro']]
+    segment_sensors = [f'{kind}_{b}_{i}' for b in range(n_swimmers) for i in range(3) for kind in ['velocimeter', 'gyro']]
+    assert sensors == ['target_pos'] + head_sensors + segment_sensors
+
+
+def test_generated_scene_physics_is_cached(tmp_path):
+    scene = swimmer.SwimmerScene(3, 'circle')
+    physics = swimmer.get_physics(4, scene, cache_dir=str(tmp_path))
+    physics.forward()
+    np.testing.assert_allclose(physics.proximities(), .5)
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+import torch
+from dm_control.utils import rewards
+
+from Agents import DeepControlSwimmer
+from cust_utils.tracer import Tracer
+
+STAGES = ['environment.step', 'physics.step', 'task.reward', 'reward.tolerance', 'task.observation']
+
+
+def run_steps(environment, n_steps):
+    environment.reset()
+    for _ in range(n_steps):
+        environment.step(np.zeros(environment.action_spec().shape))
+
+
+def test_off_wraps_nothing():
+    environment = DeepControlSwimmer.swim(n_links=4, random=0)
+    tolerance = rewards.tolerance
+    tracer = Tracer('off')
+    tracer.instrument_environment(environment)
+    assert 'step' not in vars(environment) and rewards.tolerance is tolerance
+    with tracer.span('update'):
+        run_steps(environment, 3)
+    assert len(tracer) == 0 and tracer.summary() == []
+
+
+def test_full_times_nested_stages_and_restores_methods():
+    environment = DeepControlSwimmer.swim(n_links=4, random=0)
+    tolerance = rewards.tolerance
+    tracer = Tracer('full')
+    tracer.instrument_environment(environment)
+    run_steps(environment, 5)
+    tracer.remove()
+    run_steps(environment, 5)  # Not timed anymore.
+
+    counts = {row['name']: row['count'] for row in tracer.summary()}
+    # The reset also builds an observation.
+    assert counts == dict(zip(STAGES, [5] * 4 + [6]), **{'environment.reset': 1})
+    assert rewards.tolerance is tolerance and 'step' not in vars(environment.physics)
+
+    # Every stage lies within its environment step.
+    events = tracer.as_array()
+    roots = np.isin(events[:, 0], [tracer.names.index('environment.step'), tracer.names.index('environment.reset')])
+    steps = events[roots]
+    for code, _, start, end in events:
+        assert ((steps[:, 2] <= start) & (end <= steps[:, 3])).any()
+
+
+def test_sample_times_whole_trees_of_every_nth_root():
+    environment = DeepControlSwimmer.swim(n_links=4, random=0)
+    tracer = Tracer('sample', every=3)
+    tracer.instrument_environment(environment)
+    run_steps(environment, 7)
+    tracer.remove()
+    # Steps 0, 3 and 6 are timed with all their stages, and the first reset.
+    counts = {row['name']: row['count'] for row in tracer.summary()}
+    assert counts == dict(zip(STAGES, [3] * 4 + [4]), **{'environment.reset': 1})
+
+
+def test_model_spans_and_exports(tmp_path):
+    model = torch.nn.Module()
+    model.actor, model.critic = torch.nn.Linear(3, 2), torch.nn.Linear(3, 1)
+    tracer = Tracer('full')
+    tracer.instrument_model(model)
+    with tracer.span('update'):
+        model.actor(torch.zeros(1, 3))
+        model.critic(torch.zeros(1, 3))
+    with pytest.raises(ValueError):
+        with tracer.span('update'):
+            raise ValueError()
+    tracer.remove()
+    assert 'forward' not in vars(model.actor)
+
+    assert sorted(tracer.durations()) == ['actor.forward', 'critic.forward', 'update']
+    assert len(tracer.durations()['update']) == 2
+    histograms = tracer.histograms()
+    assert histograms['actor.forward'].sum() == 1 and len(histograms['bins']) == 71
+
+    tracer.write_chrome_trace(str(tmp_path / 'trace.json'))
+    with open(tmp_path / 'trace.json') as trace_file:
+        events = json.load(trace_file)['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert [event['name'] for event in complete] == ['update', 'actor.forward', 'critic.forward', 'update']
+    assert all(event['dur'] >= 0 and event['tid'] == 0 for event in complete)
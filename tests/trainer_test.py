@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('tonic.torch.agents')
+
+import tonic
+import tonic.torch
+
+from Agents import DeepControlSwimmer
+from cust_utils.trainer import BackgroundTestTrainer
+from tasks.batched_environment import BatchedSwimEnvironment
+from wrappers.ActorNCAP import ppo_swimmer_model
+
+
+def environment_builder():
+    return BatchedSwimEnvironment(lambda: DeepControlSwimmer.swim(n_links=4, time_limit=0.3), 1)
+
+
+def test_background_test_phase_logs_every_epoch(tmp_path):
+    environment = environment_builder()
+    agent = tonic.torch.agents.PPO(model=ppo_swimmer_model(n_joints=3),
+                                   replay=tonic.replays.Segment(size=20, batch_size=10))
+    agent.initialize(observation_space=environment.observation_space, action_space=environment.action_space, seed=0)
+    tonic.logger.initialize(str(tmp_path), script_path=None, config={})
+
+    trainer = BackgroundTestTrainer(environment_builder, seeds=[0, 1], steps=60, epoch_steps=20, save_steps=60,
+                                    show_progress=False)
+    trainer.initialize(agent=agent, environment=environment)
+    trainer.run()
+
+    log = pd.read_csv(tmp_path / 'log.csv')
+    # Epochs log the evaluation of an earlier snapshot, the last ones are logged after training.
+    steps = log['test/steps'].dropna()
+    assert list(steps) == sorted(steps) and set(steps) == {20, 40, 60}
+    assert np.isfinite(log.loc[log['test/steps'].notna(), 'test/episode_score/mean']).all()
@@ -0,0 +1,60 @@
+import os
+
+import imageio
+import numpy as np
+import pytest
+import yaml
+
+pytest.importorskip('tonic')
+
+from cust_utils.video_utils import VideoWriter, display_video, embed_video, load_agent
+
+
+def frames(n_frames=40, height=48, width=64):
+    random = np.random.RandomState(0)
+    return [random.randint(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(n_frames)]
+
+
+def test_streamed_video_has_every_frame(tmp_path):
+    filepath = str(tmp_path / 'video.mp4')
+    with VideoWriter(filepath, fps=30, queue_size=4) as writer:
+        for frame in frames():
+            writer.append(frame)
+    assert writer.n_frames == 40
+    with imageio.get_reader(filepath) as reader:
+        decoded = [frame for frame in reader]
+    assert len(decoded) == 40
+    assert decoded[0].shape == (48, 64, 3)
+    assert '<video' in embed_video(filepath).data
+
+
+def test_encoder_errors_reach_the_caller(tmp_path):
+    writer = VideoWriter(str(tmp_path / 'missing' / 'video.mp4'), queue_size=2)
+    with pytest.raises(Exception):
+        for frame in frames():
+            writer.append(frame)
+        writer.close()
+
+
+def test_display_video_encodes_once(tmp_path):
+    filepath = str(tmp_path / 'video.mp4')
+    html = display_video(iter(frames(40, 96, 128)), filepath, fps=30, every=2, downscale=2)
+    with imageio.get_reader(filepath) as reader:
+        assert reader.get_meta_data()['fps'] == 15
+        decoded = [frame for frame in reader]
+    assert len(decoded) == 20
+    assert decoded[0].shape == (48, 64, 3)
+    assert '<video' in html.data
+
+
+def test_agent_is_built_with_the_names_of_the_header(tmp_path):
+    # `Agent` only exists in the namespace of the header.
+    config = dict(header='from types import SimpleNamespace as Agent',
+                  agent='Agent(initialize=lambda **kwargs: None, load=lambda path: None)', environment='None')
+    with open(tmp_path / 'config.yaml', 'w') as config_file:
+        yaml.dump(config, config_file)
+    os.makedirs(tmp_path / 'checkpoints')
+    open(tmp_path / 'checkpoints' / 'step_10.pt', 'w').close()
+
+    agent = load_agent(str(tmp_path), 'last', None, None)
+    assert type(agent).__name__ == 'SimpleNamespace'
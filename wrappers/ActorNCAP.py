@@ -3,12 +3,13 @@ import torch
 import numpy as np
 import sys
 import os
-import sys
-sys.path.insert(0, 'Agents/NCAPSwimmer')
 
-from NCAPSwimmer import SwimmerModule
+# Add the parent directory to sys.path to resolve the relative imports
+script_dir = os.path.dirname(__file__)  # Gets the directory where the script is located
+parent_dir = os.path.dirname(script_dir)  # Gets the parent directory
+sys.path.append(parent_dir)
 
-from tonic.torch import models, normalizers
+from Agents.NCAPSwimmer import SwimmerModule
 
 
 class SwimmerActor(nn.Module):
@@ -18,6 +19,7 @@ class SwimmerActor(nn.Module):
             controller=None,
             distribution=None,
             timestep_transform=(-1, 1, 0, 1000),
+            proximity_index=None,
     ):
         super().__init__()
         self.swimmer = swimmer
@@ -25,6 +27,10 @@ class SwimmerActor(nn.Module):
         self.distribution = distribution
         self.timestep_transform = timestep_transform
 
+        # Position of the proximity feature in the observations (see Swim(observe_proximity=True)),
+        # e.g. -2 when followed by the time feature. None keeps the default proximity.
+        self.proximity_index = proximity_index
+
     def initialize(
             self,
             observation_space,
@@ -33,10 +39,16 @@ class SwimmerActor(nn.Module):
     ):
         self.action_size = action_space.shape[0]
 
-    def forward(self, observations):
+    def forward(self, observations, proximity=1):
+        """Maps observations of shape (..., obs_dim), or (..., n_agents, obs_dim) together with one
+        proximity per agent of shape (..., n_agents), to actions."""
         joint_pos = observations[..., :self.action_size]
         timesteps = observations[..., -1, None]
 
+        # Proximity to the other swimmers, observed from the physics.
+        if self.proximity_index is not None:
+            proximity = observations[..., self.proximity_index]
+
         # Normalize joint positions by max joint angle (in radians).
         joint_limit = 2 * np.pi / (self.action_size + 1)  # In dm_control, calculated with n_bodies.
         joint_pos = torch.clamp(joint_pos / joint_limit, min=-1, max=1)
@@ -55,6 +67,7 @@ class SwimmerActor(nn.Module):
         # Generate low-level action signals.
         actions = self.swimmer(
             joint_pos,
+            proximity=proximity,
             timesteps=timesteps,
             right_control=right,
             left_control=left,
@@ -73,12 +86,16 @@ def ppo_swimmer_model(
         action_noise=0.1,
         critic_sizes=(64, 64),
         critic_activation=nn.Tanh,
+        proximity_index=None,
         **swimmer_kwargs,
 ):
+    # Imported here, so that SwimmerActor does not need tonic, e.g. to convert trained actors.
+    from tonic.torch import models, normalizers
     return models.ActorCritic(
         actor=SwimmerActor(
             swimmer=SwimmerModule(n_joints=n_joints, **swimmer_kwargs),
             distribution=lambda x: torch.distributions.normal.Normal(x, action_noise),
+            proximity_index=proximity_index,
         ),
         critic=models.Critic(
             encoder=models.ObservationEncoder(),
@@ -93,10 +110,13 @@ def d4pg_swimmer_model(
   n_joints=5,
   critic_sizes=(256, 256),
   critic_activation=nn.ReLU,
+  proximity_index=None,
   **swimmer_kwargs,
 ):
+  from tonic.torch import models, normalizers
   return models.ActorCriticWithTargets(
-    actor=SwimmerActor(swimmer=SwimmerModule(n_joints=n_joints, **swimmer_kwargs),),
+    actor=SwimmerActor(swimmer=SwimmerModule(n_joints=n_joints, **swimmer_kwargs),
+                       proximity_index=proximity_index),
     critic=models.Critic(
       encoder=models.ObservationActionEncoder(),
       torso=models.MLP(critic_sizes, critic_activation),
@@ -0,0 +1,67 @@
+import copy
+
+import numpy as np
+import torch
+from torch import nn
+
+
+class ActorMean(nn.Module):
+    """Deterministic view of an actor: the mean of its policy distribution, or its actions."""
+
+    def __init__(self, actor):
+        super().__init__()
+        self.actor = actor
+
+    def forward(self, observations):
+        out = self.actor(observations)
+        if isinstance(out, torch.distributions.Distribution):
+            return out.loc
+        return out
+
+
+class FrozenPolicy:
+    """No-grad, traced snapshot of an actor, used in place of `agent.test_step` at evaluation time."""
+
+    def __init__(self, module):
+        self.module = module
+
+    def __call__(self, observations):
+        observations = torch.as_tensor(observations, dtype=torch.float32)
+        with torch.inference_mode():
+            return self.module(observations)
+
+    def test_step(self, observations, steps=None):
+        return self(observations).numpy()
+
+
+def freeze_actor(actor, example_observations):
+    """
+    Exports an actor (`SwimmerActor` or the `ppo_mlp_model` actor) as a frozen inference callable.
+
+    The actor is copied, so the training model is left untouched, and traced on the example
+    observations. Freezing inlines the parameters and observation normalizer statistics as
+    constants and folds the NCAP weight constraints into them, so each call only runs the
+    remaining arithmetic without autograd.
+
+    Parameters:
+    - actor (nn.Module): An initialized actor, e.g. `agent.model.actor`.
+    - example_observations (np.ndarray or torch.Tensor): A batch of observations with the shape
+      used at evaluation time, e.g. the output of `environment.start()`.
+
+    Returns:
+    - FrozenPolicy: A callable mapping observations to deterministic actions.
+    """
+    actor = copy.deepcopy(actor)
+    for parameter in actor.parameters():
+        parameter.requires_grad_(False)
+    example_observations = torch.as_tensor(np.asarray(example_observations), dtype=torch.float32)
+
+    # Distribution argument checks are Python-level and cannot be traced.
+    validate_args = torch.distributions.Distribution._validate_args
+    torch.distributions.Distribution.set_default_validate_args(False)
+    try:
+        with torch.no_grad():
+            traced = torch.jit.trace(ActorMean(actor).eval(), example_observations, check_trace=False)
+    finally:
+        torch.distributions.Distribution.set_default_validate_args(validate_args)
+    return FrozenPolicy(torch.jit.freeze(traced))